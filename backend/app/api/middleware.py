@@ -0,0 +1,118 @@
+import asyncio
+import functools
+import time
+
+from fastapi.routing import APIRoute
+
+from app.core.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS
+from app.services.profiler import profile_thread
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and count of /api requests.
+
+    Requests are labelled with the matched route template (e.g.
+    `/api/reports/{job_id}`), not the raw path, to keep label sets bounded.
+    Latency runs until the last body chunk is sent, so streamed downloads
+    are measured in full.
+    """
+
+    def __init__(self, app, prefix: str = "/api"):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            labels = {
+                "method": scope["method"],
+                "route": getattr(route, "path", "unmatched"),
+                "status": str(status)
+            }
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, **labels)
+            HTTP_REQUESTS.inc(**labels)
+
+
+def _wants_profile(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            return value.lower() in (b"1", b"true", b"yes")
+    for pair in scope.get("query_string", b"").split(b"&"):
+        name, _, value = pair.partition(b"=")
+        if name == b"profile":
+            return value.lower() in (b"1", b"true", b"yes")
+    return False
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that runs one request under cProfile when it carries an
+    `X-Profile: 1` header or a `profile=1` query parameter.
+
+    The profile ID is returned in the `X-Profile-Id` response header. The
+    profiler sees everything on the event loop thread while the request is
+    in flight, so profile one request at a time; sync handlers running in
+    the thread pool are profiled there by `ProfiledRoute`. Paths in `skip_paths`
+    treat `profile` as their own parameter (report jobs profile the build
+    instead of the request) and are passed through.
+    """
+
+    def __init__(self, app, store, prefix: str = "/api", skip_paths=()):
+        self.app = app
+        self.store = store
+        self.prefix = prefix
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or not scope["path"].startswith(self.prefix)
+                or scope["path"] in self.skip_paths or not _wants_profile(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        with self.store.capture(f"{scope['method']} {scope['path']}") as profile_id:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start" and profile_id is not None:
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-profile-id", profile_id.encode())
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Route that runs a sync endpoint under `profile_thread`, so a request
+    captured by `ProfilingMiddleware` includes the work done in the thread
+    pool. Outside a capture the wrapper only checks a context variable.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        if not asyncio.iscoroutinefunction(endpoint):
+            endpoint = _profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _profiled(endpoint):
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        with profile_thread():
+            return endpoint(*args, **kwargs)
+    return wrapper
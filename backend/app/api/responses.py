@@ -0,0 +1,12 @@
+from typing import Any
+
+from fastapi.responses import ORJSONResponse
+
+
+class PreEncodedJSONResponse(ORJSONResponse):
+    """orjson response that passes already-encoded bytes through untouched"""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return super().render(content)
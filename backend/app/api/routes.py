@@ -1,133 +1,463 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
-import json
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse, ORJSONResponse, PlainTextResponse, Response
+import asyncio
 import os
+import tempfile
+from typing import List, Optional
 from dotenv import load_dotenv
 from app.services.process_data import (
     get_data, 
     get_top_impact_variables,
     get_scenarios,
     get_setpoint_impacts,
-    get_top_scenarios_temperatures
+    get_top_scenarios_temperatures,
+    get_dataset,
+    get_dataset_path,
+    get_cache_stats,
+    list_datasets,
+    upload_dataset,
+    get_correlations,
+    get_sensitivity,
+    get_kpi_stats,
+    append_scenarios,
+    get_encoded,
+    impact_keep_rule,
+    top_rows_unchanged
 )
-from app.services.data_processor import DataProcessor
-from app.services.chart_generator import ChartGenerator
-from app.services.report_generator import ReportGenerator
-from app.services.pdf_service import PDFService
+from app.api.middleware import ProfiledRoute
+from app.api.responses import PreEncodedJSONResponse
+from app.models.schemas import Scenario
+from app.core.config import (
+    DATA_FILE, OUTPUT_DIR, PROFILES_DIR, PROFILES_MAX_FILES, PROFILING_ENABLED,
+    REPORT_MAX_CONCURRENT_JOBS
+)
+from app.services.encoded_json import EncodedJSON
+from app.services.llm_cache import get_llm_cache
+from app.services.llm_client import get_connection_stats
+from app.services.profiler import ProfileStore
+from app.services.report_jobs import ReportJob, ReportJobManager, FAILED
+from app.services.report_pipeline import REPORT_STAGES, run_report_pipeline
+from app.services.report_store import ReportArtifact, ReportStore
+from app.services.upload_ingest import UploadTooLargeError
 
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
     print("WARNING: OPENAI_API_KEY not found in environment variables")
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse, route_class=ProfiledRoute)
 
-OUTPUT_DIR = "./output"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
-PDF_PATH = os.path.join(OUTPUT_DIR, "process_analysis_report.pdf")
 CHARTS_DIR = os.path.join(OUTPUT_DIR, "charts")
 os.makedirs(CHARTS_DIR, exist_ok=True)
+REPORTS_DIR = os.path.join(OUTPUT_DIR, "reports")
+report_store = ReportStore(REPORTS_DIR)
+profile_store = ProfileStore(PROFILES_DIR, max_files=PROFILES_MAX_FILES)
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+def _accepts_gzip(request: Request) -> bool:
+    """Whether Accept-Encoding allows gzip, honouring q=0 refusals"""
+    allowed = {}
+    for entry in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = entry.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            allowed[coding.strip().lower()] = quality > 0
+    return allowed.get("gzip", allowed.get("*", False))
+
+def _require_dataset(dataset_id: Optional[str]) -> str:
+    """Path of the dataset's results file; 404 when it has none"""
+    path = get_dataset_path(dataset_id)
+    if path is None:
+        detail = (f"Dataset {dataset_id} not found" if dataset_id
+                  else f"Data file not found at {DATA_FILE}. Please upload data first.")
+        raise HTTPException(status_code=404, detail=detail)
+    return path
+
+def _encoded_response(request: Request, payload: EncodedJSON, headers: Optional[dict] = None) -> Response:
+    """
+    Serve a pre-encoded JSON body: the cached gzip variant when the client
+    accepts it, and 304 when the client's ETag matches either variant.
+    """
+    compressed = _accepts_gzip(request)
+    etag = payload.gzip_etag if compressed else payload.etag
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if _etag_matches(request, payload.etag) or _etag_matches(request, payload.gzip_etag):
+        return Response(status_code=304, headers=headers)
+    if compressed:
+        return PreEncodedJSONResponse(payload.gzip_body, headers={**headers, "Content-Encoding": "gzip"})
+    return PreEncodedJSONResponse(payload.body, headers=headers)
 
 # Task 4
 @router.get("/process-data")
-async def process_data():
+def process_data(request: Request, dataset_id: Optional[str] = None):
     """Return the full process data."""
+    _require_dataset(dataset_id)
     try:
-        return get_data()
+        return _encoded_response(request, get_encoded("process-data", get_data, get_dataset(dataset_id)))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving process data: {str(e)}")
 
 @router.get("/top-impact")
-async def top_impact():
+def top_impact(request: Request, dataset_id: Optional[str] = None):
     """Return top impact variables."""
+    _require_dataset(dataset_id)
     try:
-        return get_top_impact_variables()
+        dataset = get_dataset(dataset_id)
+        return _encoded_response(request, get_encoded(
+            "top-impact", get_top_impact_variables, dataset, keep=impact_keep_rule(dataset)
+        ))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving top impact: {str(e)}")
 
 @router.get("/scenarios")
-async def scenarios():
-    """Return all scenarios with their KPI values."""
+def scenarios(
+    request: Request,
+    response: Response,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=0),
+    variables: Optional[List[str]] = Query(None),
+    kpi_min: Optional[float] = None,
+    kpi_max: Optional[float] = None,
+    sort: Optional[str] = Query(None, pattern="^-?kpi$"),
+    dataset_id: Optional[str] = None
+):
+    """
+    Return scenarios with their KPI values.
+
+    Without parameters every scenario is returned. `offset`/`limit` page
+    through them, `variables` (repeatable) selects the elements to include,
+    `kpi_min`/`kpi_max` filter by KPI and `sort` orders by KPI ("kpi" or
+    "-kpi"). The number of matching scenarios is sent in X-Total-Count.
+    """
+    _require_dataset(dataset_id)
     try:
-        return get_scenarios()
+        dataset = get_dataset(dataset_id)
+        if offset == 0 and limit is None and variables is None and kpi_min is None and kpi_max is None and sort is None:
+            payload = get_encoded("scenarios", lambda d: get_scenarios(dataset=d)[0], dataset)
+            return _encoded_response(request, payload, {"X-Total-Count": str(len(dataset.store))})
+        result, total = get_scenarios(
+            offset=offset, limit=limit, variables=variables,
+            kpi_min=kpi_min, kpi_max=kpi_max, sort=sort, dataset=dataset
+        )
+        response.headers["X-Total-Count"] = str(total)
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving scenarios: {str(e)}")
 
+@router.post("/scenarios", status_code=201)
+def add_scenarios(scenarios: List[Scenario], dataset_id: Optional[str] = None):
+    """
+    Append a batch of scenarios as a new dataset version.
+
+    The batch is journaled next to the data file and added to the loaded
+    store; KPI statistics are updated from the new rows only, and cached
+    views the batch cannot change are kept.
+    """
+    _require_dataset(dataset_id)
+    try:
+        return append_scenarios([scenario.model_dump() for scenario in scenarios], dataset_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error appending scenarios: {str(e)}")
+
+@router.get("/kpi-stats")
+def kpi_stats(dataset_id: Optional[str] = None):
+    """Return KPI min, max, mean, std, range and median for the current version."""
+    _require_dataset(dataset_id)
+    try:
+        return get_kpi_stats(get_dataset(dataset_id))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving KPI statistics: {str(e)}")
+
 @router.get("/top-scenarios-temperatures")
-async def top_scenarios_temperatures():
-    """Return only temperature values from top performing scenarios."""
+def top_scenarios_temperatures(
+    request: Request,
+    n: int = Query(5, ge=0),
+    families: Optional[List[str]] = Query(None),
+    dataset_id: Optional[str] = None
+):
+    """
+    Return only temperature values from the `n` top performing scenarios.
+
+    `families` (repeatable) returns other variable families instead, e.g.
+    `heat_transfer_coefficient`.
+    """
+    _require_dataset(dataset_id)
     try:
-        return get_top_scenarios_temperatures()
+        dataset = get_dataset(dataset_id)
+        if n == 5 and families is None:
+            return _encoded_response(
+                request,
+                get_encoded(
+                    "top-scenarios-temperatures",
+                    lambda d: get_top_scenarios_temperatures(dataset=d),
+                    dataset,
+                    keep=top_rows_unchanged(5)
+                )
+            )
+        return get_top_scenarios_temperatures(n=n, families=families, dataset=dataset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving top scenarios temperatures: {str(e)}")
 
 @router.get("/setpoint-impacts")
-async def setpoint_impacts():
+def setpoint_impacts(request: Request, dataset_id: Optional[str] = None):
     """Return setpoint impact summary."""
+    _require_dataset(dataset_id)
     try:
-        return get_setpoint_impacts()
+        dataset = get_dataset(dataset_id)
+        return _encoded_response(request, get_encoded(
+            "setpoint-impacts", get_setpoint_impacts, dataset, keep=impact_keep_rule(dataset)
+        ))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving setpoint impacts: {str(e)}")
 
+@router.get("/correlations")
+def correlations(request: Request, method: str = Query("pearson", pattern="^(pearson|spearman)$"),
+                dataset_id: Optional[str] = None):
+    """
+    Return the correlation matrix of all variables and the KPI (`kpi_value`)
+    with pair counts, p-values and 95% confidence intervals.
+    """
+    _require_dataset(dataset_id)
+    try:
+        return _encoded_response(
+            request,
+            get_encoded(f"correlations-{method}", lambda d: get_correlations(method, dataset=d),
+                        get_dataset(dataset_id))
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing correlations: {str(e)}")
+
+@router.get("/sensitivity")
+def sensitivity(request: Request, dataset_id: Optional[str] = None):
+    """
+    Return each variable's KPI sensitivity computed from the simulated data:
+    standardized regression coefficients, first-order Sobol indices and
+    weightages, with bootstrap confidence intervals.
+    """
+    _require_dataset(dataset_id)
+    try:
+        return _encoded_response(request, get_encoded(
+            "sensitivity", lambda d: get_sensitivity(d).to_dict(), get_dataset(dataset_id)
+        ))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing sensitivity: {str(e)}")
+
+@router.get("/cache-stats")
+def cache_stats(dataset_id: Optional[str] = None):
+    """Return dataset cache hit/miss counters."""
+    _require_dataset(dataset_id)
+    return get_cache_stats(dataset_id)
+
+@router.get("/datasets")
+def datasets():
+    """Return the available dataset IDs and the loaded datasets with their estimated sizes."""
+    return list_datasets()
+
+@router.post("/datasets", status_code=201)
+async def upload(request: Request, dataset_id: Optional[str] = None, overwrite: bool = False):
+    """
+    Upload a results file as a new dataset, streamed straight into the
+    columnar `.pfsc` format without buffering the request.
+
+    Send multipart/form-data with the file in the `file` field, or the JSON
+    document itself as application/json. Returns the dataset ID (generated
+    unless `dataset_id` is given) with ingestion throughput stats.
+    """
+    try:
+        return await upload_dataset(
+            request.stream(), request.headers.get("content-type", ""), dataset_id, overwrite
+        )
+    except FileExistsError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error ingesting upload: {str(e)}")
+
+@router.get("/llm-cache-stats")
+async def llm_cache_stats():
+    """Return LLM response cache hit/miss counters and latency saved."""
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@router.get("/llm-client-stats")
+async def llm_client_stats():
+    """Return LLM request and connection reuse counters."""
+    return get_connection_stats()
+
+def _require_profiling():
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled. Set PROFILING_ENABLED=true.")
+
+@router.get("/profiles")
+def list_profiles():
+    """Return the saved request and report job profiles, newest first."""
+    _require_profiling()
+    return profile_store.list()
+
+@router.get("/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    format: str = Query("text", pattern="^(text|prof)$"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|calls|ncalls)$"),
+    limit: int = Query(50, ge=1, le=1000)
+):
+    """
+    Return one profile as a pstats text report (`format=text`), or the raw
+    `.prof` file for snakeviz / `python -m pstats` (`format=prof`).
+    """
+    _require_profiling()
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    if format == "prof":
+        return FileResponse(path=path, filename=f"{profile_id}.prof", media_type="application/octet-stream")
+    return PlainTextResponse(profile_store.summary(profile_id, sort=sort, limit=limit))
+
+def _run_report(job: ReportJob) -> ReportArtifact:
+    with tempfile.TemporaryDirectory(prefix=f"{job.id}-", dir=CHARTS_DIR) as charts_dir:
+        pdf_bytes = run_report_pipeline(
+            charts_dir, api_key=api_key, stage=job.stage, dataset_id=job.dataset_id
+        )
+    return report_store.save(job.id, pdf_bytes)
+
+def _build_report(job: ReportJob) -> ReportArtifact:
+    """
+    Run the report pipeline for one job with private chart files, storing the
+    PDF under the job ID. Profiled jobs record the worker thread's profile;
+    charts rendered in the process pool are not included.
+    """
+    if not (job.profile and PROFILING_ENABLED):
+        return _run_report(job)
+    with profile_store.capture(f"report {job.id}") as profile_id:
+        job.profile_id = profile_id
+        return _run_report(job)
+
+report_jobs = ReportJobManager(
+    _build_report,
+    stages=REPORT_STAGES,
+    max_concurrent_jobs=REPORT_MAX_CONCURRENT_JOBS,
+    discard=report_store.delete
+)
+
+def _get_job(job_id: str) -> ReportJob:
+    job = report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Report job {job_id} not found")
+    return job
+
+def _pdf_response(request: Request, artifact: ReportArtifact) -> Response:
+    """
+    Serve a stored report: 304 when the client's ETag matches, otherwise a
+    streamed file response that also answers Range / If-Range requests.
+    """
+    headers = {"ETag": artifact.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, artifact.etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(
+        path=artifact.path,
+        filename="process_analysis_report.pdf",
+        media_type="application/pdf",
+        headers=headers
+    )
+
 # Task 3
-@router.get("/generate-report")
-async def generate_report():
+@router.post("/reports", status_code=202)
+async def submit_report(profile: bool = False, dataset_id: Optional[str] = None):
+    """
+    Queue a report build and return its job ID immediately.
+    With `profile=true` (and PROFILING_ENABLED) the build is profiled.
     """
-    Generate a PDF report from uploaded JSON data
+    _require_dataset(dataset_id)
+    job = report_jobs.submit(profile=profile, dataset_id=dataset_id)
+    return job.to_dict()
+
+@router.get("/reports")
+async def list_reports():
+    """Return all known report jobs, oldest first."""
+    return [job.to_dict() for job in report_jobs.list()]
+
+@router.get("/reports/{job_id}")
+async def report_status(job_id: str):
+    """Return the status and per-stage progress of a report job."""
+    return _get_job(job_id).to_dict()
+
+@router.get("/reports/{job_id}/download")
+def download_job_report(job_id: str, request: Request):
+    """Download the PDF produced by a finished report job."""
+    job = _get_job(job_id)
+    if job.status == FAILED:
+        raise HTTPException(status_code=409, detail=f"Report job failed: {job.error}")
+    if not job.finished:
+        raise HTTPException(status_code=409, detail=f"Report job is {job.status}")
+    return _pdf_response(request, job.artifact)
+
+@router.get("/generate-report")
+async def generate_report(request: Request, download: bool = False, profile: bool = False,
+                          dataset_id: Optional[str] = None):
     """
-    data_file_path = "./data/mock_results.json"
+    Generate a PDF report from uploaded JSON data (`dataset_id`, or DATA_FILE).
 
+    Runs as a background job and waits for it without blocking the event loop.
+    With `download=true` the PDF is returned directly instead of the job ID;
+    `profile=true` profiles the build like `POST /reports?profile=true`.
+    """
     try:
         # Validate that the data file exists
-        if not os.path.exists(data_file_path):
-            raise HTTPException(
-                status_code=404, 
-                detail=f"Data file not found at {data_file_path}. Please upload data first."
-            )
-            
-        # Load the JSON data
-        with open(data_file_path, "r") as file:
-            json_data = json.load(file)
-        
-        # Process the data
-        data_processor = DataProcessor(json_data)
-        processed_data = data_processor.process_all()
-        
-        # Generate charts
-        chart_generator = ChartGenerator(processed_data)
-        chart_paths = chart_generator.save_charts_to_files(directory=CHARTS_DIR)
+        _require_dataset(dataset_id)
         
-        # Generate report content using LLM
-        report_generator = ReportGenerator(processed_data, api_key=api_key)
-        report_content = report_generator.get_report_content()
+        job = report_jobs.submit(profile=profile, dataset_id=dataset_id)
+        artifact = await asyncio.wrap_future(job.future)
         
-        # Generate the PDF report
-        pdf_service = PDFService(report_content, chart_paths, processed_data)
-        pdf_service.generate_pdf(output_path=PDF_PATH)
-        
-        return {"message": "Report generated successfully"}
+        if download:
+            return _pdf_response(request, artifact)
+        return {
+            "message": "Report generated successfully",
+            "job_id": job.id,
+            "profile_id": job.profile_id,
+            "stages": {stage["name"]: stage["seconds"] for stage in job.to_dict()["stages"]}
+        }
     
     except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
         raise HTTPException(status_code=500, detail=f"Error generating report: {str(e)}")
 
-PDF_PATH = "./output/process_analysis_report.pdf"
 @router.get("/download-report")
-async def download_report():
+def download_report(request: Request):
     """
-    Download the generated PDF report
+    Download the most recently generated PDF report
     """
     try:
-        if not os.path.exists(PDF_PATH):
+        latest = report_jobs.latest_succeeded
+        if latest is None or not os.path.exists(latest.artifact.path):
             raise HTTPException(
                 status_code=404,
                 detail="Report not found. Please generate the report first."
             )
         
-        return FileResponse(
-            path=PDF_PATH,
-            filename="process_analysis_report.pdf",
-            media_type="application/pdf"
-        )
+        return _pdf_response(request, latest.artifact)
     except Exception as e:
         if isinstance(e, HTTPException):
             raise e
@@ -2,6 +2,82 @@
 Core configuration module
 """
 
-from app.core.config import DATA_DIR, BASE_DIR
+from app.core.config import (
+    DATA_DIR,
+    BASE_DIR,
+    DATA_FILE,
+    DATASETS_DIR,
+    DATASET_CACHE_MAX_BYTES,
+    UPLOAD_MAX_BYTES,
+    STREAMING_MIN_BYTES,
+    OUTPUT_DIR,
+    REPORT_MAX_CONCURRENT_JOBS,
+    REPORT_PREWARM,
+    CHART_FORMAT,
+    CHART_DPI,
+    CHART_PARALLEL,
+    CHART_WORKERS,
+    CHART_CACHE_ENABLED,
+    CHART_CACHE_DIR,
+    CHART_CACHE_MAX_BYTES,
+    METRICS_ENABLED,
+    PROFILING_ENABLED,
+    PROFILES_DIR,
+    PROFILES_MAX_FILES,
+    LLM_MODEL,
+    LLM_TEMPERATURE,
+    LLM_BASE_URL,
+    LLM_MAX_CONNECTIONS,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_MAX_CONCURRENCY,
+    LLM_TIMEOUT_SECONDS,
+    SCENARIO_MEMORY_LEAN,
+    SCENARIO_FLOAT32,
+    SENSITIVITY_BINS,
+    SENSITIVITY_BOOTSTRAP,
+    SENSITIVITY_WORKERS,
+    IMPACT_SOURCE
+)
 
-__all__ = ["DATA_DIR", "BASE_DIR"]
\ No newline at end of file
+__all__ = [
+    "DATA_DIR",
+    "BASE_DIR",
+    "DATA_FILE",
+    "DATASETS_DIR",
+    "DATASET_CACHE_MAX_BYTES",
+    "UPLOAD_MAX_BYTES",
+    "STREAMING_MIN_BYTES",
+    "OUTPUT_DIR",
+    "REPORT_MAX_CONCURRENT_JOBS",
+    "REPORT_PREWARM",
+    "CHART_FORMAT",
+    "CHART_DPI",
+    "CHART_PARALLEL",
+    "CHART_WORKERS",
+    "CHART_CACHE_ENABLED",
+    "CHART_CACHE_DIR",
+    "CHART_CACHE_MAX_BYTES",
+    "METRICS_ENABLED",
+    "PROFILING_ENABLED",
+    "PROFILES_DIR",
+    "PROFILES_MAX_FILES",
+    "LLM_MODEL",
+    "LLM_TEMPERATURE",
+    "LLM_BASE_URL",
+    "LLM_MAX_CONNECTIONS",
+    "LLM_CACHE_ENABLED",
+    "LLM_CACHE_PATH",
+    "LLM_CACHE_TTL_SECONDS",
+    "LLM_CACHE_MAX_ENTRIES",
+    "LLM_MAX_CONCURRENCY",
+    "LLM_TIMEOUT_SECONDS",
+    "SCENARIO_MEMORY_LEAN",
+    "SCENARIO_FLOAT32",
+    "SENSITIVITY_BINS",
+    "SENSITIVITY_BOOTSTRAP",
+    "SENSITIVITY_WORKERS",
+    "IMPACT_SOURCE"
+]
\ No newline at end of file
@@ -2,4 +2,78 @@ import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
-DATA_DIR = os.path.join(BASE_DIR, "data")
\ No newline at end of file
+DATA_DIR = os.path.join(BASE_DIR, "data")
+DATA_FILE = os.getenv("DATA_FILE", os.path.join(DATA_DIR, "mock_results.json"))
+
+# Datasets other than DATA_FILE are `<dataset_id>.pfsc` / `<dataset_id>.json` files here
+DATASETS_DIR = os.getenv("DATASETS_DIR", DATA_DIR)
+# Loaded datasets are evicted, least recently used first, above this estimated size
+DATASET_CACHE_MAX_BYTES = int(os.getenv("DATASET_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+
+# Uploads to POST /api/datasets larger than this are rejected; 0 means no limit
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 0))
+
+# Files at least this large are parsed incrementally into the scenario store
+STREAMING_MIN_BYTES = int(os.getenv("STREAMING_MIN_BYTES", 64 * 1024 * 1024))
+
+OUTPUT_DIR = os.getenv("OUTPUT_DIR", os.path.join(BASE_DIR, "output"))
+
+# Upper bound on report builds running at the same time; extra jobs queue
+REPORT_MAX_CONCURRENT_JOBS = int(os.getenv("REPORT_MAX_CONCURRENT_JOBS", 2))
+
+# Import the report stack in a background thread once the server has started
+REPORT_PREWARM = os.getenv("REPORT_PREWARM", "true").lower() in ("1", "true", "yes")
+
+# "png" (raster, CHART_DPI) or "svg" (vector drawings embedded natively; needs svglib)
+CHART_FORMAT = os.getenv("CHART_FORMAT", "png").lower()
+CHART_DPI = int(os.getenv("CHART_DPI", 300))
+
+# Render report charts in separate worker processes (pyplot is not thread-safe)
+CHART_PARALLEL = os.getenv("CHART_PARALLEL", "false").lower() in ("1", "true", "yes")
+# Chart worker processes; 0 means one per chart, capped at the CPU count
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", 0))
+
+# Reuse rendered chart files whose inputs have not changed
+CHART_CACHE_ENABLED = os.getenv("CHART_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CHART_CACHE_DIR = os.getenv("CHART_CACHE_DIR", os.path.join(OUTPUT_DIR, "chart_cache"))
+CHART_CACHE_MAX_BYTES = int(os.getenv("CHART_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Chat model used for report prompts; LLM_BASE_URL points at any OpenAI-compatible server
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4-turbo")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", 0.2))
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None
+# Pooled keep-alive connections shared by all reports
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 10))
+
+# Record latency histograms and counters, exposed on /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Opt-in cProfile captures of single requests (X-Profile header or ?profile=1) and report jobs
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILES_DIR = os.getenv("PROFILES_DIR", os.path.join(OUTPUT_DIR, "profiles"))
+PROFILES_MAX_FILES = int(os.getenv("PROFILES_MAX_FILES", 100))
+
+# Persistent LLM response cache shared by the report and section-summary prompts
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(OUTPUT_DIR, "llm_cache.sqlite3"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1000))
+
+# Report LLM prompts run concurrently, at most this many at once, each bounded by the timeout
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 120))
+
+# Memory-lean processed data: categorical string columns, display strings formatted on
+# demand and no long-format scenario frame; SCENARIO_FLOAT32 halves scenario value storage
+SCENARIO_MEMORY_LEAN = os.getenv("SCENARIO_MEMORY_LEAN", "false").lower() in ("1", "true", "yes")
+SCENARIO_FLOAT32 = os.getenv("SCENARIO_FLOAT32", "false").lower() in ("1", "true", "yes")
+
+# Sensitivity engine: bins per variable (0 = about sqrt(scenarios)), bootstrap replicates
+# for the confidence intervals (0 = none) and worker processes running them. Worker
+# processes are opt-in: the default of 1 runs the replicates in the request's thread
+SENSITIVITY_BINS = int(os.getenv("SENSITIVITY_BINS", 0))
+SENSITIVITY_BOOTSTRAP = int(os.getenv("SENSITIVITY_BOOTSTRAP", 200))
+SENSITIVITY_WORKERS = int(os.getenv("SENSITIVITY_WORKERS", 1))
+# Where top_impact/setpoint_impact_summary come from: "file" (computed only when the
+# results file has none) or "computed" (always derived from the simulated data)
+IMPACT_SOURCE = os.getenv("IMPACT_SOURCE", "file").lower()
@@ -4,16 +4,32 @@ Service modules containing business logic
 
 from app.services.process_data import (
     get_data,
+    get_dataset,
     get_top_impact_variables,
     get_scenarios,
     get_setpoint_impacts,
-    get_top_scenarios_temperatures
+    get_top_scenarios_temperatures,
+    get_cache_stats,
+    get_correlations,
+    get_sensitivity,
+    get_kpi_stats,
+    append_scenarios,
+    upload_dataset,
+    get_encoded
 )
 
 __all__ = [
     "get_data",
+    "get_dataset",
     "get_top_impact_variables",
     "get_scenarios",
     "get_setpoint_impacts",
-    "get_top_scenarios_temperatures"
+    "get_top_scenarios_temperatures",
+    "get_cache_stats",
+    "get_correlations",
+    "get_sensitivity",
+    "get_kpi_stats",
+    "append_scenarios",
+    "upload_dataset",
+    "get_encoded"
 ]
\ No newline at end of file
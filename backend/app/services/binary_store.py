@@ -0,0 +1,194 @@
+"""
+Compact binary scenario format.
+
+Layout (all integers little-endian):
+
+    MAGIC (4 bytes) | format version (uint32) | header length (uint64)
+    header: UTF-8 JSON with the document header fields, the variable
+            catalog and the offset/dtype/shape of every array
+    arrays: raw little-endian arrays, each aligned to ARRAY_ALIGNMENT
+
+The loader memory-maps the file read-only and wraps the arrays with
+`np.frombuffer`, so opening a file costs a header parse regardless of the
+number of scenarios, and every process that opens the same file shares its
+pages through the OS page cache. Files must be replaced atomically (the
+converter writes to a temporary file and renames it), never rewritten in
+place, because live mappings would see the change.
+
+    python -m scripts.convert_to_binary data/mock_results.json data/mock_results.pfsc
+"""
+
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+
+from app.services.scenario_store import ScenarioStore
+from app.services.streaming_loader import load_streaming
+
+MAGIC = b"PFSC"
+FORMAT_VERSION = 1
+BINARY_EXTENSION = ".pfsc"
+ARRAY_ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct("<4sIQ")
+
+
+class PackedStrings:
+    """Read-only sequence of strings stored as UTF-8 bytes plus an offset table"""
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("string index out of range")
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return self._blob[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        blob = self._blob.tobytes()
+        offsets = self._offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield blob[start:end].decode("utf-8")
+
+    def tolist(self):
+        return list(self)
+
+    @property
+    def nbytes(self) -> int:
+        return self._offsets.nbytes + self._blob.nbytes
+
+
+def _pack_strings(strings) -> Tuple[np.ndarray, np.ndarray]:
+    # One joined blob and 8 bytes per string, not a bytes object per string
+    offsets = np.zeros(len(strings) + 1, dtype="<i8")
+    lengths = (len(s) if s.isascii() else len(s.encode("utf-8")) for s in strings)
+    np.cumsum(np.fromiter(lengths, dtype="<i8", count=len(strings)), out=offsets[1:])
+    return offsets, np.frombuffer("".join(strings).encode("utf-8"), dtype=np.uint8)
+
+
+def write_binary(header: Dict, store: ScenarioStore, path: str, exclusive: bool = False) -> str:
+    """
+    Write a header document and scenario store to `path` atomically. With
+    `exclusive`, raises FileExistsError instead of replacing an existing file.
+    """
+    id_offsets, id_blob = _pack_strings(store.scenario_ids)
+    arrays = {
+        "values": np.ascontiguousarray(store.values, dtype="<f8"),
+        "kpi": np.ascontiguousarray(store.kpi, dtype="<f8"),
+        "id_offsets": id_offsets,
+        "id_bytes": id_blob,
+    }
+
+    meta = {
+        "document": header,
+        "n_scenarios": len(store),
+        "kpi_name": store.kpi_name,
+        "variables": store.variables,
+        "raw_names": store.raw_names,
+        "raw_units": store.raw_units,
+        "var_equipment": store.var_equipment.tolist(),
+        "var_type": store.var_type.tolist(),
+        "var_unit": store.var_unit.tolist(),
+        "equipment": store.equipment,
+        "types": store.types,
+        "units": store.units,
+        "arrays": {},
+    }
+
+    # Offsets depend on the header length, which depends on the offsets; lay
+    # out the arrays after a header padded to a fixed, generous size
+    def layout(header_size: int) -> int:
+        offset = _PREAMBLE.size + header_size
+        for name, array in arrays.items():
+            offset += -offset % ARRAY_ALIGNMENT
+            meta["arrays"][name] = {
+                "offset": offset,
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+            }
+            offset += array.nbytes
+        return offset
+
+    header_size = 0
+    while True:
+        layout(header_size)
+        encoded = json.dumps(meta).encode("utf-8")
+        if len(encoded) <= header_size:
+            break
+        header_size = len(encoded) + 1024
+    encoded = encoded.ljust(header_size, b" ")
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, header_size))
+        f.write(encoded)
+        for name, array in arrays.items():
+            f.write(b"\0" * (meta["arrays"][name]["offset"] - f.tell()))
+            # Write the array's own buffer; tobytes() would copy every column first
+            f.write(memoryview(array.reshape(-1)).cast("B"))
+    if exclusive:
+        # link() fails if `path` exists, so the check and the publish are one step
+        try:
+            os.link(tmp_path, path)
+        finally:
+            os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, path)
+    return path
+
+
+def convert_json_to_binary(json_path: str, output_path: str) -> str:
+    """Convert a `mock_results.json`-shaped file, streaming it to bound memory"""
+    header, store = load_streaming(json_path)
+    return write_binary(header, store, output_path)
+
+
+def load_binary(path: str) -> Tuple[Dict, ScenarioStore]:
+    """Memory-map a binary scenario file into a zero-copy `ScenarioStore`"""
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, header_size = _PREAMBLE.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a binary scenario file")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported binary scenario format version {version}")
+    meta = json.loads(buffer[_PREAMBLE.size:_PREAMBLE.size + header_size])
+
+    def array(name: str) -> np.ndarray:
+        spec = meta["arrays"][name]
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"]))
+        return np.frombuffer(buffer, dtype=dtype, count=count, offset=spec["offset"]).reshape(spec["shape"])
+
+    store = ScenarioStore(
+        scenario_ids=PackedStrings(array("id_offsets"), array("id_bytes")),
+        kpi=array("kpi"),
+        values=array("values"),
+        variables=meta["variables"],
+        var_equipment=np.asarray(meta["var_equipment"], dtype=np.int32),
+        var_type=np.asarray(meta["var_type"], dtype=np.int32),
+        var_unit=np.asarray(meta["var_unit"], dtype=np.int32),
+        equipment=meta["equipment"],
+        types=meta["types"],
+        units=meta["units"],
+        raw_names=meta["raw_names"],
+        raw_units=meta["raw_units"],
+        kpi_name=meta["kpi_name"],
+    )
+    return meta["document"], store
+
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def _feed(digest, value: Any):
+    """Feed a canonical byte encoding of `value` into `digest`"""
+    if isinstance(value, pd.DataFrame):
+        digest.update(b"DataFrame")
+        _feed(digest, [str(c) for c in value.columns])
+        _feed(digest, [str(t) for t in value.dtypes])
+        digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        digest.update(b"Series")
+        _feed(digest, [str(value.name), str(value.dtype)])
+        digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(b"ndarray")
+        _feed(digest, [str(value.dtype), list(value.shape)])
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        digest.update(b"dict")
+        for key in sorted(value, key=str):
+            _feed(digest, key)
+            _feed(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"list%d" % len(value))
+        for item in value:
+            _feed(digest, item)
+    else:
+        digest.update(type(value).__name__.encode())
+        digest.update(repr(value).encode())
+    digest.update(b";")
+
+
+def content_key(*parts: Any) -> str:
+    """Stable hash of everything that determines a rendered chart"""
+    digest = hashlib.sha256()
+    for part in parts:
+        _feed(digest, part)
+    return digest.hexdigest()
+
+
+class ChartCache:
+    """
+    Content-addressed store of rendered chart files.
+
+    Files are named after the hash of their inputs. A hit refreshes the
+    file's mtime, and after every insert the least recently used files are
+    deleted until the directory fits in `max_bytes`. Several processes may
+    share one directory; files are published with an atomic rename.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{key}{extension}")
+
+    def fetch(self, key: str, extension: str, destination: str) -> bool:
+        """Copy the cached file for `key` to `destination` if there is one"""
+        cached = self._path(key, extension)
+        try:
+            shutil.copyfile(cached, destination)
+            os.utime(cached)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store(self, key: str, extension: str, source: str):
+        """Add a freshly rendered file to the cache"""
+        tmp_path = os.path.join(self.directory, f".{uuid.uuid4().hex}.tmp")
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, self._path(key, extension))
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used files until the cache fits in max_bytes"""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.startswith("."):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+_chart_cache: Optional[ChartCache] = None
+_chart_cache_lock = threading.Lock()
+
+
+def get_chart_cache(directory: str, max_bytes: int) -> ChartCache:
+    """Process-wide chart cache, created on first use"""
+    global _chart_cache
+    with _chart_cache_lock:
+        if _chart_cache is None or _chart_cache.directory != directory:
+            _chart_cache = ChartCache(directory, max_bytes)
+        return _chart_cache
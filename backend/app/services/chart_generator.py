@@ -1,19 +1,119 @@
 import os
+import pickle
+import importlib.util
+import threading
+import time
+from concurrent.futures import wait
+from concurrent.futures.process import BrokenProcessPool
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import seaborn as sns
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 import pandas as pd
 import numpy as np
 from matplotlib.colors import LinearSegmentedColormap
+from app.core.config import (
+    CHART_FORMAT,
+    CHART_DPI,
+    CHART_PARALLEL,
+    CHART_WORKERS,
+    CHART_CACHE_ENABLED,
+    CHART_CACHE_DIR,
+    CHART_CACHE_MAX_BYTES
+)
+from app.core.metrics import CHART_RENDER_SECONDS
+from app.services.chart_cache import content_key, get_chart_cache
+from app.services.correlation_engine import format_p_value
+from app.services.worker_processes import discard_pool, shared_pool
+
+# pyplot keeps global state, so only one thread may draw at a time
+RENDER_LOCK = threading.Lock()
+
+# Part of every chart cache key; bump it whenever the drawing code changes
+CHART_STYLE_VERSION = "ggplot-deep-1"
+
+# (method, file name without extension) for every chart in the report
+CHARTS = [
+    ('generate_top_impact_pie', 'top_impact_pie'),
+    ('generate_setpoint_impact_bar', 'setpoint_impact_bar'),
+    ('generate_kpi_distribution', 'kpi_distribution'),
+    ('generate_variable_comparison', 'variable_comparison'),
+    ('generate_top_scenarios', 'top_scenarios'),
+]
+
+RASTER_FORMAT = "png"
+VECTOR_FORMAT = "svg"
+
+# In vector output, scatter plots with more points than this are embedded as
+# an image layer; thousands of individual SVG markers are slower and larger
+VECTOR_POINT_LIMIT = 2000
+
+def resolve_chart_format(chart_format: str) -> str:
+    """Fall back to raster output when vector charts cannot be embedded in the PDF"""
+    if chart_format == VECTOR_FORMAT and importlib.util.find_spec("svglib") is None:
+        print("WARNING: svglib is not installed, falling back to PNG charts")
+        return RASTER_FORMAT
+    if chart_format not in (RASTER_FORMAT, VECTOR_FORMAT):
+        raise ValueError(f"Unsupported chart format: {chart_format}")
+    return chart_format
+
+# Chart inputs file written next to the charts for the workers of one report
+CHART_INPUTS_FILE = ".chart_inputs.pickle"
+
+def _render_chart(inputs_path: str, dpi: int, chart_format: str, use_cache: bool,
+                  method_name: str, save_path: str) -> Tuple[Optional[str], float]:
+    """Draw one chart in a worker; the duration is returned so the parent can record it"""
+    with open(inputs_path, 'rb') as f:
+        generator = ChartGenerator(pickle.load(f), dpi=dpi, chart_format=chart_format, use_cache=use_cache)
+    start = time.perf_counter()
+    path = getattr(generator, method_name)(save_path)
+    return path, time.perf_counter() - start
 
 class ChartGenerator:
-    def __init__(self, processed_data: Dict):
+    def __init__(self, processed_data: Dict, dpi: Optional[int] = None,
+                 chart_format: Optional[str] = None, use_cache: Optional[bool] = None):
         self.data = processed_data
         self.chart_paths = {}
+        self.dpi = dpi or CHART_DPI
+        self.chart_format = resolve_chart_format(chart_format or CHART_FORMAT)
+        use_cache = CHART_CACHE_ENABLED if use_cache is None else use_cache
+        self.cache = get_chart_cache(CHART_CACHE_DIR, CHART_CACHE_MAX_BYTES) if use_cache else None
         
         # Set custom styling
         self.setup_styles()
     
+    def _chart_key(self, chart: str, *inputs) -> Optional[str]:
+        """Hash of a chart's exact inputs plus everything that affects how it is drawn"""
+        if self.cache is None:
+            return None
+        return content_key(
+            chart, CHART_STYLE_VERSION, matplotlib.__version__, sns.__version__,
+            self.dpi, self.chart_format, *inputs
+        )
+    
+    def _from_cache(self, chart: str, save_path: Optional[str], cache_key: Optional[str]) -> bool:
+        """Copy a previously rendered chart to save_path instead of drawing it"""
+        if not save_path or cache_key is None:
+            return False
+        if not self.cache.fetch(cache_key, os.path.splitext(save_path)[1], save_path):
+            return False
+        self.chart_paths[chart] = save_path
+        return True
+    
+    def _save_figure(self, chart: str, save_path: Optional[str], cache_key: Optional[str]) -> Optional[str]:
+        """Save and close the current figure, adding it to the chart cache"""
+        if not save_path:
+            plt.close()
+            return None
+        # In vector output dpi only applies to rasterized layers
+        plt.savefig(save_path, bbox_inches='tight', dpi=self.dpi, format=self.chart_format)
+        self.chart_paths[chart] = save_path
+        plt.close()
+        if cache_key is not None:
+            self.cache.store(cache_key, os.path.splitext(save_path)[1], save_path)
+        return save_path
+    
     def setup_styles(self):
         """Set up custom styles for charts"""
         plt.style.use('ggplot')
@@ -31,6 +131,10 @@ class ChartGenerator:
         if impact_df is None or impact_df.empty:
             return None
         
+        cache_key = self._chart_key('top_impact_pie', impact_df)
+        if self._from_cache('top_impact_pie', save_path, cache_key):
+            return save_path
+        
         plt.figure(figsize=(10, 8))
         wedges, texts, autotexts = plt.pie(
             impact_df['Impact'], 
@@ -49,14 +153,7 @@ class ChartGenerator:
         plt.title('Top Variables Impact Distribution', fontsize=16, fontweight='bold')
         plt.axis('equal')  # Equal aspect ratio ensures the pie chart is circular
         
-        if save_path:
-            plt.savefig(save_path, bbox_inches='tight', dpi=300)
-            self.chart_paths['top_impact_pie'] = save_path
-            plt.close()
-            return save_path
-        else:
-            plt.close()
-            return None
+        return self._save_figure('top_impact_pie', save_path, cache_key)
     
     def generate_setpoint_impact_bar(self, save_path: str = None) -> str:
         """Generate a bar chart of setpoint impacts"""
@@ -65,6 +162,10 @@ class ChartGenerator:
         if setpoint_df is None or setpoint_df.empty:
             return None
         
+        cache_key = self._chart_key('setpoint_impact_bar', setpoint_df)
+        if self._from_cache('setpoint_impact_bar', save_path, cache_key):
+            return save_path
+        
         plt.figure(figsize=(12, 7))
         # Create labels by combining equipment and setpoint
         labels = [f"{row['equipment']}.{row['setpoint']}" for _, row in setpoint_df.iterrows()]
@@ -93,14 +194,7 @@ class ChartGenerator:
         plt.grid(axis='y', linestyle='--', alpha=0.7)
         plt.tight_layout()
         
-        if save_path:
-            plt.savefig(save_path, bbox_inches='tight', dpi=300)
-            self.chart_paths['setpoint_impact_bar'] = save_path
-            plt.close()
-            return save_path
-        else:
-            plt.close()
-            return None
+        return self._save_figure('setpoint_impact_bar', save_path, cache_key)
     
     def generate_kpi_distribution(self, save_path: str = None) -> str:
         """Generate a histogram of KPI values"""
@@ -109,6 +203,10 @@ class ChartGenerator:
         if pivot_df is None or pivot_df.empty or 'kpi_value' not in pivot_df.columns:
             return None
         
+        cache_key = self._chart_key('kpi_distribution', pivot_df['kpi_value'], self.data.get('kpi_stats', {}))
+        if self._from_cache('kpi_distribution', save_path, cache_key):
+            return save_path
+        
         plt.figure(figsize=(12, 7))
         
         # Create distribution plot with kernel density estimate
@@ -153,14 +251,7 @@ class ChartGenerator:
         plt.grid(linestyle='--', alpha=0.7)
         plt.tight_layout()
         
-        if save_path:
-            plt.savefig(save_path, bbox_inches='tight', dpi=300)
-            self.chart_paths['kpi_distribution'] = save_path
-            plt.close()
-            return save_path
-        else:
-            plt.close()
-            return None
+        return self._save_figure('kpi_distribution', save_path, cache_key)
  
     def generate_variable_comparison(self, save_path: str = None) -> str:
         """Generate a scatter plot matrix of key variables against KPI"""
@@ -182,6 +273,16 @@ class ChartGenerator:
         if not key_vars:
             return None
         
+        cache_key = self._chart_key(
+            'variable_comparison',
+            pivot_df[key_vars + ['kpi_value']],
+            top_vars_df,
+            correlations[correlations['variable'].isin(key_vars)]
+            if correlations is not None and not correlations.empty else None
+        )
+        if self._from_cache('variable_comparison', save_path, cache_key):
+            return save_path
+        
         # Create a subset of the dataframe with key variables and KPI
         plt.figure(figsize=(12, 4 * len(key_vars)))
         fig, axes = plt.subplots(len(key_vars), 1, figsize=(12, 4 * len(key_vars)))
@@ -192,12 +293,19 @@ class ChartGenerator:
         for i, var in enumerate(key_vars):
             ax = axes[i] if len(key_vars) > 1 else axes
             
-            # Get correlation value
-            corr_val = 0
+            # Get correlation value and its significance
+            corr_text = 'Correlation: 0.000'
             if correlations is not None and not correlations.empty:
                 corr_row = correlations[correlations['variable'] == var]
                 if not corr_row.empty:
-                    corr_val = corr_row.iloc[0]['correlation']
+                    corr = corr_row.iloc[0]
+                    corr_text = f"Correlation: {corr['correlation']:.3f}"
+                    if 'p_value' in corr:
+                        corr_text += (
+                            f" (95% CI {corr['ci_low']:.2f} to {corr['ci_high']:.2f}, "
+                            f"{format_p_value(corr['p_value'])})\n"
+                            f"Spearman: {corr['spearman']:.3f}"
+                        )
             
             # Create scatter plot
             scatter = ax.scatter(
@@ -207,15 +315,18 @@ class ChartGenerator:
                 cmap=cmap,
                 alpha=0.7,
                 s=70,
-                edgecolor='k'
+                edgecolor='k',
+                rasterized=self.chart_format == VECTOR_FORMAT and len(pivot_df) > VECTOR_POINT_LIMIT
             )
             
             # Add trend line
             z = np.polyfit(pivot_df[var], pivot_df['kpi_value'], 1)
             p = np.poly1d(z)
+            # A straight line only needs its end points
+            trend_x = np.array([pivot_df[var].min(), pivot_df[var].max()])
             ax.plot(
-                sorted(pivot_df[var]), 
-                p(sorted(pivot_df[var])), 
+                trend_x, 
+                p(trend_x), 
                 "r--", 
                 linewidth=2,
                 alpha=0.8
@@ -224,7 +335,7 @@ class ChartGenerator:
             # Add correlation information
             ax.text(
                 0.05, 0.95, 
-                f'Correlation: {corr_val:.3f}', 
+                corr_text, 
                 transform=ax.transAxes,
                 fontsize=12,
                 verticalalignment='top', 
@@ -258,14 +369,7 @@ class ChartGenerator:
         
         plt.tight_layout()
         
-        if save_path:
-            plt.savefig(save_path, bbox_inches='tight', dpi=300)
-            self.chart_paths['variable_comparison'] = save_path
-            plt.close()
-            return save_path
-        else:
-            plt.close()
-            return None
+        return self._save_figure('variable_comparison', save_path, cache_key)
     
     def generate_top_scenarios(self, save_path: str = None, top_n: int = 5) -> str:
         """Generate a bar chart of top performing scenarios"""
@@ -274,8 +378,16 @@ class ChartGenerator:
         if pivot_df is None or pivot_df.empty:
             return None
         
-        # Get top N scenarios by KPI value
-        top_scenarios = pivot_df.sort_values('kpi_value', ascending=False).head(top_n)
+        cache_key = self._chart_key('top_scenarios', pivot_df[['scenario', 'kpi_value']], top_n)
+        if self._from_cache('top_scenarios', save_path, cache_key):
+            return save_path
+        
+        # Get top N scenarios by KPI value, from the shared ranking when there is one
+        kpi_ranking = self.data.get('kpi_ranking')
+        if kpi_ranking is not None and len(kpi_ranking) == len(pivot_df):
+            top_scenarios = pivot_df.iloc[kpi_ranking[:top_n]]
+        else:
+            top_scenarios = pivot_df.sort_values('kpi_value', ascending=False, kind='stable').head(top_n)
         
         plt.figure(figsize=(12, 7))
         bars = plt.bar(
@@ -316,23 +428,81 @@ class ChartGenerator:
         
         plt.tight_layout()
         
-        if save_path:
-            plt.savefig(save_path, bbox_inches='tight', dpi=300)
-            self.chart_paths['top_scenarios'] = save_path
-            plt.close()
-            return save_path
-        else:
-            plt.close()
-            return None
+        return self._save_figure('top_scenarios', save_path, cache_key)
+    
+    def _chart_file(self, directory: str, name: str) -> str:
+        return os.path.join(directory, f"{name}.{self.chart_format}")
     
-    def save_charts_to_files(self, directory: str = './charts') -> Dict:
-        """Generate all charts and save them to files"""
+    def chart_inputs(self) -> Dict:
+        """The subset of processed data the charts read, with unused pivot columns dropped"""
+        inputs = {
+            key: self.data.get(key)
+            for key in ('impact_df', 'setpoint_impact_df', 'top_variables_df', 'correlations', 'kpi_stats', 'kpi_ranking')
+        }
+        pivot_df = self.data.get('scenarios_pivot_df')
+        top_vars_df = self.data.get('top_variables_df')
+        if pivot_df is not None:
+            columns = [col for col in ('scenario', 'kpi_value') if col in pivot_df.columns]
+            if top_vars_df is not None and not top_vars_df.empty:
+                key_vars = (top_vars_df['equipment'] + '.' + top_vars_df['name']).tolist()
+                columns += [var for var in key_vars if var in pivot_df.columns and var not in columns]
+            pivot_df = pivot_df[columns]
+        inputs['scenarios_pivot_df'] = pivot_df
+        return inputs
+    
+    def save_charts_to_files(self, directory: str = './charts', parallel: Optional[bool] = None,
+                             max_workers: Optional[int] = None) -> Dict:
+        """
+        Generate all charts and save them to files.
+        
+        With `parallel`, each chart is drawn by a worker of the shared process
+        pool. The chart inputs are pickled once to a file in `directory`, which
+        every worker reads, and removed when the charts are done.
+        """
         os.makedirs(directory, exist_ok=True)
-        
-        self.generate_top_impact_pie(os.path.join(directory, 'top_impact_pie.png'))
-        self.generate_setpoint_impact_bar(os.path.join(directory, 'setpoint_impact_bar.png'))
-        self.generate_kpi_distribution(os.path.join(directory, 'kpi_distribution.png'))
-        self.generate_variable_comparison(os.path.join(directory, 'variable_comparison.png'))
-        self.generate_top_scenarios(os.path.join(directory, 'top_scenarios.png'))
+        parallel = CHART_PARALLEL if parallel is None else parallel
+        max_workers = max_workers or CHART_WORKERS or min(len(CHARTS), os.cpu_count() or 1)
+        
+        if parallel and max_workers > 1:
+            inputs_path = os.path.join(directory, CHART_INPUTS_FILE)
+            with open(inputs_path, 'wb') as f:
+                pickle.dump(self.chart_inputs(), f, protocol=pickle.HIGHEST_PROTOCOL)
+            pool = shared_pool(min(max_workers, len(CHARTS)))
+            futures = {}
+            try:
+                # Start the tall multi-subplot chart first; it dominates wall time
+                ordered = sorted(CHARTS, key=lambda chart: chart[0] != 'generate_variable_comparison')
+                futures = {
+                    method_name: pool.submit(
+                        _render_chart, inputs_path, self.dpi, self.chart_format, self.cache is not None,
+                        method_name, self._chart_file(directory, name)
+                    )
+                    for method_name, name in ordered
+                }
+                results = {}
+                for method_name, future in futures.items():
+                    results[method_name], seconds = future.result()
+                    CHART_RENDER_SECONDS.observe(seconds, chart=method_name[len('generate_'):])
+            except BrokenProcessPool:
+                discard_pool(pool)
+                raise
+            finally:
+                # After a failure, let the charts already drawing finish with the inputs file
+                for future in futures.values():
+                    future.cancel()
+                wait(futures.values())
+                os.remove(inputs_path)
+        else:
+            results = {}
+            with RENDER_LOCK:
+                self.setup_styles()
+                for method_name, name in CHARTS:
+                    with CHART_RENDER_SECONDS.timer(chart=name):
+                        results[method_name] = getattr(self, method_name)(self._chart_file(directory, name))
+        
+        for method_name, _ in CHARTS:
+            path = results.get(method_name)
+            if path:
+                self.chart_paths[method_name[len('generate_'):]] = path
         
         return self.chart_paths
\ No newline at end of file
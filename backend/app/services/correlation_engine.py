@@ -0,0 +1,231 @@
+"""
+Pearson and Spearman correlation matrices with significance.
+
+All pairs of columns are correlated at once from a few matrix products over
+the NaN-masked data, so each pair uses exactly the rows where both columns
+are defined (pairwise deletion, like `pandas.DataFrame.corr`). p-values are
+two-sided, from the t distribution with n - 2 degrees of freedom; confidence
+intervals use the Fisher z transform.
+"""
+
+import math
+from statistics import NormalDist
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+PEARSON = "pearson"
+SPEARMAN = "spearman"
+METHODS = (PEARSON, SPEARMAN)
+
+DEFAULT_CONFIDENCE = 0.95
+
+
+def rankdata(x: np.ndarray) -> np.ndarray:
+    """1-based ranks of a 1-D array with ties given their average rank; NaN stays NaN"""
+    ranks = np.full(len(x), np.nan)
+    present = np.flatnonzero(~np.isnan(x))
+    if len(present) == 0:
+        return ranks
+    values = x[present]
+    order = np.argsort(values, kind='mergesort')
+    sorted_values = values[order]
+    starts_group = np.r_[True, sorted_values[1:] != sorted_values[:-1]]
+    starts = np.flatnonzero(starts_group)
+    sizes = np.diff(np.r_[starts, len(values)])
+    average = starts + (sizes + 1) / 2.0
+    ranked = np.empty(len(values))
+    ranked[order] = average[np.cumsum(starts_group) - 1]
+    ranks[present] = ranked
+    return ranks
+
+
+def _pearson_matrix(x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Pairwise-complete Pearson correlations and pair counts of the columns of `x`"""
+    mask = ~np.isnan(x)
+    m = mask.astype(np.float64)
+    # Centre each column first so the sums below do not cancel catastrophically
+    means = np.where(mask, x, 0.0).sum(axis=0) / np.maximum(m.sum(axis=0), 1.0)
+    centred = np.where(mask, x - means, 0.0)
+    squared = centred * centred
+
+    n = m.T @ m                    # rows shared by columns i and j
+    sum_i = centred.T @ m          # sum of column i over rows shared with j
+    sum_sq_i = squared.T @ m
+    cross = centred.T @ centred
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = cross - sum_i * sum_i.T / n
+        var_i = sum_sq_i - sum_i * sum_i / n
+        r = cov / np.sqrt(var_i * var_i.T)
+    r = np.clip(r, -1.0, 1.0)
+    r[n < 2] = np.nan
+    return r, n
+
+
+def _spearman_matrix(x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pairwise-complete Spearman correlations: Pearson on ranks. Columns are
+    ranked once; only pairs whose shared rows differ from either column's
+    own rows (both have NaN where the other does not) are re-ranked.
+    """
+    ranks = np.column_stack([rankdata(x[:, col]) for col in range(x.shape[1])]) \
+        if x.shape[1] else x.copy()
+    r, n = _pearson_matrix(ranks)
+    present = (~np.isnan(x)).sum(axis=0)
+    stale = (n < present[:, None]) | (n < present[None, :])
+    for i, j in zip(*np.nonzero(np.triu(stale, k=1))):
+        both = ~np.isnan(x[:, i]) & ~np.isnan(x[:, j])
+        if both.sum() < 2:
+            continue
+        pair = _pearson_matrix(np.column_stack([rankdata(x[both, i]), rankdata(x[both, j])]))[0][0, 1]
+        r[i, j] = r[j, i] = pair
+    return r, n
+
+
+def _betacf(a: np.ndarray, b: np.ndarray, x: np.ndarray, iterations: int = 300) -> np.ndarray:
+    """Continued fraction of the incomplete beta function (modified Lentz), element-wise"""
+    tiny = 1e-300
+    qab = a + b
+    qap = a + 1.0
+    qam = a - 1.0
+    c = np.ones_like(x)
+    d = 1.0 - qab * x / qap
+    d = np.where(np.abs(d) < tiny, tiny, d)
+    d = 1.0 / d
+    h = d.copy()
+    active = np.ones(x.shape, dtype=bool)
+    for m in range(1, iterations + 1):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = np.where(np.abs(d) < tiny, tiny, d)
+        c = 1.0 + aa / c
+        c = np.where(np.abs(c) < tiny, tiny, c)
+        d = 1.0 / d
+        h = np.where(active, h * d * c, h)
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = np.where(np.abs(d) < tiny, tiny, d)
+        c = 1.0 + aa / c
+        c = np.where(np.abs(c) < tiny, tiny, c)
+        d = 1.0 / d
+        delta = d * c
+        h = np.where(active, h * delta, h)
+        active &= np.abs(delta - 1.0) >= 3e-14
+        if not active.any():
+            break
+    return h
+
+
+def betainc(a: np.ndarray, b: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Regularized incomplete beta function I_x(a, b), element-wise"""
+    a, b, x = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (a, b, x)))
+    result = np.full(x.shape, np.nan)
+    valid = (a > 0) & (b > 0) & (x >= 0) & (x <= 1)
+    result[valid & (x == 0)] = 0.0
+    result[valid & (x == 1)] = 1.0
+    inner = valid & (x > 0) & (x < 1)
+    if inner.any():
+        a_, b_, x_ = a[inner], b[inner], x[inner]
+        lgamma = np.vectorize(math.lgamma, otypes=[np.float64])
+        front = np.exp(
+            lgamma(a_ + b_) - lgamma(a_) - lgamma(b_) + a_ * np.log(x_) + b_ * np.log1p(-x_)
+        )
+        # The continued fraction converges fast for x < (a + 1) / (a + b + 2); use symmetry otherwise
+        direct = x_ < (a_ + 1.0) / (a_ + b_ + 2.0)
+        value = np.empty(len(x_))
+        value[direct] = front[direct] * _betacf(a_[direct], b_[direct], x_[direct]) / a_[direct]
+        flip = ~direct
+        value[flip] = 1.0 - front[flip] * _betacf(b_[flip], a_[flip], 1.0 - x_[flip]) / b_[flip]
+        result[inner] = value
+    return result
+
+
+def correlation_p_values(r: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """Two-sided p-values of H0: rho = 0, from t = r * sqrt((n - 2) / (1 - r^2))"""
+    r = np.asarray(r, dtype=np.float64)
+    df = np.asarray(n, dtype=np.float64) - 2.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # P(|T| > |t|) = I_{df / (df + t^2)}(df / 2, 1 / 2), and df / (df + t^2) = 1 - r^2
+        p = betainc(df / 2.0, 0.5, 1.0 - r * r)
+    p[(df <= 0) | np.isnan(r)] = np.nan
+    return np.clip(p, 0.0, 1.0)
+
+
+def fisher_interval(r: np.ndarray, n: np.ndarray, confidence: float = DEFAULT_CONFIDENCE,
+                    method: str = PEARSON) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Confidence interval of the correlation from the Fisher z transform. The
+    Spearman standard error uses the Fieller, Hartley and Pearson factor 1.06.
+    """
+    z_crit = NormalDist().inv_cdf(0.5 + confidence / 2.0)
+    n = np.asarray(n, dtype=np.float64)
+    factor = 1.06 if method == SPEARMAN else 1.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = np.arctanh(np.clip(r, -1.0 + 1e-15, 1.0 - 1e-15))
+        se = np.sqrt(factor / (n - 3.0))
+        low, high = np.tanh(z - z_crit * se), np.tanh(z + z_crit * se)
+    undefined = (n <= 3) | np.isnan(r)
+    low[undefined] = np.nan
+    high[undefined] = np.nan
+    return low, high
+
+
+def format_p_value(p: float) -> str:
+    """`p = 0.012` style, with `p < 0.001` for tiny values"""
+    if p != p:
+        return "p = n/a"
+    return "p < 0.001" if p < 0.001 else f"p = {p:.3f}"
+
+
+class CorrelationMatrix:
+    """
+    Correlations between every pair of `labels`, with pair counts, p-values
+    and confidence intervals as (k x k) arrays in label order.
+    """
+
+    def __init__(self, labels: List[str], method: str, r: np.ndarray, n: np.ndarray,
+                 confidence: float = DEFAULT_CONFIDENCE):
+        self.labels = labels
+        self.method = method
+        self.confidence = confidence
+        self.r = r
+        self.n = n.astype(np.int64)
+        self.p_value = correlation_p_values(r, n)
+        self.ci_low, self.ci_high = fisher_interval(r, n, confidence, method)
+        self.index = {label: i for i, label in enumerate(labels)}
+
+    def against(self, label: str) -> Dict[str, np.ndarray]:
+        """Columns of correlation statistics of every label with `label`"""
+        col = self.index[label]
+        return {
+            'correlation': self.r[:, col],
+            'p_value': self.p_value[:, col],
+            'ci_low': self.ci_low[:, col],
+            'ci_high': self.ci_high[:, col],
+            'n': self.n[:, col]
+        }
+
+    def to_dict(self) -> Dict:
+        def clean(matrix: np.ndarray) -> List[List[Optional[float]]]:
+            return [[None if value != value else value for value in row] for row in matrix.tolist()]
+        return {
+            'method': self.method,
+            'confidence': self.confidence,
+            'labels': self.labels,
+            'correlation': clean(self.r),
+            'p_value': clean(self.p_value),
+            'ci_low': clean(self.ci_low),
+            'ci_high': clean(self.ci_high),
+            'n': self.n.tolist()
+        }
+
+
+def correlation_matrix(values: np.ndarray, labels: List[str], method: str = PEARSON,
+                       confidence: float = DEFAULT_CONFIDENCE) -> CorrelationMatrix:
+    """Correlate every pair of columns of `values` (rows are observations, NaN is missing)"""
+    if method not in METHODS:
+        raise ValueError(f"Unknown correlation method '{method}'. Known methods: {', '.join(METHODS)}")
+    values = np.asarray(values, dtype=np.float64)
+    r, n = _spearman_matrix(values) if method == SPEARMAN else _pearson_matrix(values)
+    return CorrelationMatrix(labels, method, r, n, confidence)
@@ -1,11 +1,38 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Sequence
+from app.core.config import SCENARIO_FLOAT32, SCENARIO_MEMORY_LEAN
+from app.services.correlation_engine import PEARSON, SPEARMAN
+from app.services.scenario_store import ScenarioStore, HEAT_TRANSFER_UNIT
+from app.services.sensitivity_engine import SensitivityResult
+
+def format_values(scenario_df: pd.DataFrame) -> pd.Series:
+    """Display strings of a long-format scenario frame's values, e.g. `360.066K`"""
+    units = scenario_df['unit'].astype(str)
+    return scenario_df['value'].astype(str) + np.where(units == HEAT_TRANSFER_UNIT, ' ', '') + units
+
+def _categorical(labels: Sequence[str], codes: np.ndarray) -> pd.Categorical:
+    """`labels[codes]` as a categorical, without materializing the repeated strings when labels are unique"""
+    categories = pd.Index(list(labels))
+    if categories.is_unique:
+        return pd.Categorical.from_codes(codes, categories=categories)
+    return pd.Categorical(categories.to_numpy()[codes])
 
 class DataProcessor:
-    def __init__(self, json_data: Dict):
+    def __init__(self, json_data: Dict, scenario_store: Optional[ScenarioStore] = None,
+                 sensitivity: Optional[SensitivityResult] = None,
+                 lean: Optional[bool] = None, float32: Optional[bool] = None):
+        """
+        `sensitivity`, when given, replaces the file's precomputed impacts.
+        `lean` and `float32` default to SCENARIO_MEMORY_LEAN and SCENARIO_FLOAT32.
+        """
         self.raw_data = json_data
         self.data = json_data.get('data', {})
+        self.scenario_store = scenario_store
+        self.sensitivity = sensitivity
+        self.lean = SCENARIO_MEMORY_LEAN if lean is None else lean
+        float32 = SCENARIO_FLOAT32 if float32 is None else float32
+        self.value_dtype = np.float32 if float32 else np.float64
         self.processed_data = {}
     
     def process_summaries(self) -> Dict:
@@ -27,7 +54,10 @@ class DataProcessor:
     
     def process_impacts(self) -> Dict:
         """Process the impact data"""
-        top_impact = self.data.get('top_impact', {})
+        if self.sensitivity is not None:
+            top_impact = self.sensitivity.top_impact()
+        else:
+            top_impact = self.data.get('top_impact', {})
         
         impact_items = [(k, v) for k, v in top_impact.items()]
         impact_df = pd.DataFrame(impact_items, columns=['Variable', 'Impact'])
@@ -39,7 +69,10 @@ class DataProcessor:
     
     def process_setpoint_impact(self) -> pd.DataFrame:
         """Process the setpoint impact summary data"""
-        setpoint_impact = self.data.get('setpoint_impact_summary', [])
+        if self.sensitivity is not None:
+            setpoint_impact = self.sensitivity.setpoint_impact_summary()
+        else:
+            setpoint_impact = self.data.get('setpoint_impact_summary', [])
         setpoint_df = pd.DataFrame(setpoint_impact)
         
         # Sort by weightage
@@ -49,75 +82,108 @@ class DataProcessor:
         self.processed_data['setpoint_impact_df'] = setpoint_df
         return setpoint_df
     
+    def build_scenario_store(self) -> ScenarioStore:
+        """Build the columnar scenario store in one pass over the simulated data"""
+        if self.scenario_store is None:
+            simulated_data = self.raw_data['data']['simulated_summary']['simulated_data']
+            self.scenario_store = ScenarioStore.from_scenarios(simulated_data)
+        self.processed_data['scenario_store'] = self.scenario_store
+        return self.scenario_store
+    
     def prepare_scenario_data(self) -> pd.DataFrame:
-        """Convert scenario data to DataFrame format"""
-        simulated_data = self.raw_data['data']['simulated_summary']['simulated_data']
-        scenario_data = []
-        
-        for scenario in simulated_data:
-            scenario_id = scenario['scenario']
-            kpi_value = scenario['kpi_value']
-            
-            for equipment_spec in scenario['equipment_specification']:
-                equipment = equipment_spec['equipment']
-                
-                for variable in equipment_spec['variables']:
-                    var_name = f"{equipment}.{variable['name']}"
-                    if var_name == "Fuel.Fuel - temperature":
-                        var_name = "Fuel.temperature"
-                    
-                    if 'heat_transfer_coefficient' in variable['name']:
-                        formatted_value = f"{variable['value']} W/m²·K"
-                        raw_value = variable['value']
-                        unit = "W/m²·K"
-                    else:
-                        formatted_value = f"{variable['value']}K"
-                        raw_value = variable['value']
-                        unit = "K"
-                    
-                    scenario_data.append({
-                        'scenario': scenario_id,
-                        'equipment': equipment,
-                        'variable': var_name,
-                        'type': variable['type'],
-                        'value': raw_value,  
-                        'formatted_value': formatted_value,
-                        'unit': unit,
-                        'kpi_value': kpi_value
-                    })
-        
-        return pd.DataFrame(scenario_data)
+        """
+        Expand the scenario store into a long-format DataFrame (one row per value).
+        In lean mode the string columns are categoricals and there is no
+        `formatted_value` column; use `format_values` when display strings are needed.
+        """
+        store = self.build_scenario_store()
+        n_scenarios, n_variables = store.values.shape
+        
+        present = ~np.isnan(store.values).ravel()
+        rows = np.repeat(np.arange(n_scenarios), n_variables)[present]
+        cols = np.tile(np.arange(n_variables), n_scenarios)[present]
+        values = store.values.ravel()[present].astype(self.value_dtype, copy=False)
+        
+        if self.lean:
+            return pd.DataFrame({
+                'scenario': _categorical(store.scenario_ids, rows),
+                'equipment': _categorical(store.equipment, store.var_equipment[cols]),
+                'variable': _categorical(store.variables, cols),
+                'type': _categorical(store.types, store.var_type[cols]),
+                'value': values,
+                'unit': _categorical(store.units, store.var_unit[cols]),
+                'kpi_value': store.kpi[rows]
+            })
+        
+        variables = np.asarray(store.variables, dtype=object)
+        units = np.asarray(store.units, dtype=object)[store.var_unit]
+        
+        scenario_df = pd.DataFrame({
+            'scenario': np.asarray(list(store.scenario_ids), dtype=object)[rows],
+            'equipment': np.asarray(store.equipment, dtype=object)[store.var_equipment][cols],
+            'variable': variables[cols],
+            'type': np.asarray(store.types, dtype=object)[store.var_type][cols],
+            'value': values,
+            'unit': units[cols],
+            'kpi_value': store.kpi[rows]
+        })
+        scenario_df.insert(5, 'formatted_value', format_values(scenario_df))
+        return scenario_df
     
-    def process_scenarios(self) -> Dict:
-        """Process the scenario data using prepare_scenario_data and calculate statistics"""
-        scenario_df = self.prepare_scenario_data()
-        self.processed_data['scenario_df'] = scenario_df
+    def build_pivot_frame(self, variables: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Wide scenario x variable frame built straight from the store, limited to `variables` if given"""
+        store = self.build_scenario_store()
+        columns = range(len(store.variables))
+        if variables is not None:
+            wanted = set(variables)
+            columns = [col for col in columns if store.variables[col] in wanted]
+        order = sorted(columns, key=lambda col: store.variables[col])
         
-        pivot_df = scenario_df.pivot_table(
-            index='scenario', 
-            columns='variable', 
-            values='value',
-            aggfunc='first'
-        ).reset_index()
+        pivot_df = pd.DataFrame(
+            store.values[:, order].astype(self.value_dtype, copy=False),
+            columns=[store.variables[col] for col in order]
+        )
+        pivot_df.insert(0, 'scenario', list(store.scenario_ids))
+        pivot_df['kpi_value'] = store.kpi
+        return pivot_df
+    
+    def report_variables(self) -> List[str]:
+        """`equipment.name` of the top variables, the only variable columns the report charts read"""
+        top_vars_df = self.processed_data.get('top_variables_df')
+        if top_vars_df is None:
+            top_vars_df = self.process_top_variables()
+        if top_vars_df.empty:
+            return []
+        return (top_vars_df['equipment'] + '.' + top_vars_df['name']).tolist()
+    
+    def process_scenarios(self) -> Dict:
+        """
+        Process the scenario data from the columnar store and calculate statistics.
+        Everything here is derived from the store, so lean mode skips the
+        long-format `scenario_df` (`prepare_scenario_data` builds it on demand),
+        keeps only the report's variables in the pivot frame and leaves out
+        `top_scenarios`, which the report ranks from `kpi_ranking` itself.
+        """
+        store = self.build_scenario_store()
         
-        kpi_values = scenario_df[['scenario', 'kpi_value']].drop_duplicates()
-        pivot_df = pd.merge(pivot_df, kpi_values, on='scenario')
+        scenario_df = None if self.lean else self.prepare_scenario_data()
+        if scenario_df is not None:
+            self.processed_data['scenario_df'] = scenario_df
         
+        pivot_df = self.build_pivot_frame(self.report_variables() if self.lean else None)
         self.processed_data['scenarios_pivot_df'] = pivot_df
         
-        kpi_stats = {
-            'min': pivot_df['kpi_value'].min(),
-            'max': pivot_df['kpi_value'].max(),
-            'mean': pivot_df['kpi_value'].mean(),
-            'std': pivot_df['kpi_value'].std(),
-            'range': pivot_df['kpi_value'].max() - pivot_df['kpi_value'].min(),
-            'median': pivot_df['kpi_value'].median()
-        }
+        kpi_stats = store.kpi_stats()
         self.processed_data['kpi_stats'] = kpi_stats
         
+        # Shared KPI ranking, sorted once per dataset version
+        kpi_ranking = store.kpi_ranking
+        self.processed_data['kpi_ranking'] = kpi_ranking
+        
         # Get top performing scenarios
-        top_scenarios = pivot_df.sort_values('kpi_value', ascending=False).head(5)
-        self.processed_data['top_scenarios'] = top_scenarios
+        top_scenarios = None if self.lean else pivot_df.iloc[kpi_ranking[:5]]
+        if top_scenarios is not None:
+            self.processed_data['top_scenarios'] = top_scenarios
         
         return {
             'scenario_df': scenario_df,
@@ -127,18 +193,28 @@ class DataProcessor:
         }
     
     def calculate_correlations(self) -> pd.DataFrame:
-        """Calculate correlations between variables and KPI"""
-        pivot_df = self.processed_data.get('scenarios_pivot_df')
+        """
+        Pearson and Spearman correlation of each variable with the KPI, with
+        p-values and 95% confidence intervals, sorted by Pearson r. The
+        full matrices are cached on the scenario store.
+        """
+        store = self.scenario_store
         
-        if pivot_df is None or pivot_df.empty:
+        if store is None or len(store) == 0:
             return pd.DataFrame()
         
-        numeric_cols = pivot_df.select_dtypes(include=[np.number]).columns.tolist()
-        numeric_cols = [col for col in numeric_cols if col != 'kpi_value']
-        
+        n_variables = len(store.variables)
+        pearson = store.correlations(PEARSON).against('kpi_value')
+        spearman = store.correlations(SPEARMAN).against('kpi_value')
         correlations = pd.DataFrame({
-            'variable': numeric_cols,
-            'correlation': [pivot_df[col].corr(pivot_df['kpi_value']) for col in numeric_cols]
+            'variable': store.variables,
+            'correlation': pearson['correlation'][:n_variables],
+            'p_value': pearson['p_value'][:n_variables],
+            'ci_low': pearson['ci_low'][:n_variables],
+            'ci_high': pearson['ci_high'][:n_variables],
+            'spearman': spearman['correlation'][:n_variables],
+            'spearman_p_value': spearman['p_value'][:n_variables],
+            'n': pearson['n'][:n_variables]
         }).sort_values('correlation', ascending=False)
         
         self.processed_data['correlations'] = correlations
@@ -153,4 +229,39 @@ class DataProcessor:
         self.process_scenarios()
         self.calculate_correlations()
         
-        return self.processed_data
\ No newline at end of file
+        return self.processed_data
+
+
+def scenario_memory_report(store: ScenarioStore, document: Optional[Dict] = None) -> Dict:
+    """
+    Bytes per scenario of the scenario frames `process_scenarios` keeps in
+    processed_data, standard vs. lean (and lean with float32 values), from
+    pandas' deep memory usage. `scenario_df_on_demand` is the long frame
+    lean mode builds only when asked for. The lean pivot frame holds the
+    top variables of `document` (the results file header), so its size
+    depends on how many the file lists; `report_variables` gives the count.
+    """
+    n_scenarios = max(len(store), 1)
+    modes = {"standard": (False, False), "lean": (True, False), "lean_float32": (True, True)}
+    report = {
+        "scenarios": len(store),
+        "variables": len(store.variables),
+        "report_variables": len(DataProcessor(document or {}, scenario_store=store).report_variables()),
+        "modes": {}
+    }
+    for mode, (lean, float32) in modes.items():
+        processor = DataProcessor(document or {}, scenario_store=store, lean=lean, float32=float32)
+        frames = processor.process_scenarios()
+        sizes = {
+            name: int(frame.memory_usage(deep=True).sum())
+            for name, frame in frames.items() if isinstance(frame, pd.DataFrame)
+        }
+        if lean:
+            sizes['scenario_df_on_demand'] = int(processor.prepare_scenario_data().memory_usage(deep=True).sum())
+        entry = {name: round(size / n_scenarios, 1) for name, size in sizes.items()}
+        entry['total'] = round(sum(size for name, size in sizes.items() if name != 'scenario_df_on_demand') / n_scenarios, 1)
+        report["modes"][mode] = entry
+    standard = report["modes"]["standard"]["total"]
+    for mode, entry in report["modes"].items():
+        entry['reduction'] = round(standard / entry['total'], 2) if entry['total'] else None
+    return report
@@ -0,0 +1,344 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.core.config import STREAMING_MIN_BYTES
+from app.core.metrics import DATASET_LOAD_SECONDS
+from app.models.schemas import ProcessResponse
+from app.services.binary_store import BINARY_EXTENSION, load_binary
+from app.services.scenario_store import ScenarioStore
+from app.services.streaming_loader import load_streaming
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+
+# Decides whether a derived value survives an append: keep(old_store, new_store)
+KeepRule = Callable[[ScenarioStore, ScenarioStore], bool]
+
+# Python object overhead of a parsed results file, measured on a 17 MB file:
+# the JSON tree takes about 5x the file size and the validated model 8x
+JSON_TREE_FACTOR = 5
+MODEL_FACTOR = 8
+# Model bytes per (scenario, variable) cell when it is rebuilt from a store
+MODEL_BYTES_PER_VALUE = 1120
+
+
+def estimate_bytes(value: Any) -> int:
+    """
+    Rough size of a derived value: exact for arrays, encoded JSON and
+    DataFrames, recursive over dicts and sequences, shallow otherwise
+    """
+    if hasattr(value, "memory_usage"):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_bytes(key) + estimate_bytes(item) for key, item in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_bytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def _check_blocking_allowed(operation: str):
+    """
+    Loads and derived builds wait on threading locks for as long as another
+    thread's build takes, which would stall every request on an event loop.
+    Route handlers that reach them must be sync (`def`) so they run in the
+    thread pool; calling them from a coroutine is a bug, reported here.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    raise RuntimeError(f"{operation} may block; call it from a worker thread, not the event loop")
+
+
+def journal_path(path: str) -> str:
+    """Where scenarios appended to the dataset at `path` are recorded"""
+    return path + JOURNAL_SUFFIX
+
+
+def read_journal(path: str) -> List[Dict]:
+    """Scenarios recorded in a journal, skipping a torn last line"""
+    scenarios = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                scenarios.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return scenarios
+
+
+class DatasetSnapshot:
+    """
+    One loaded version of a dataset file.
+
+    A snapshot is never replaced in place. Fields that are expensive and not
+    always needed (the columnar store, or the full model of a streamed file)
+    are derived on first access, once, under the snapshot's own lock.
+    Appending scenarios produces a new snapshot (see `appended`).
+    """
+
+    def __init__(self, path: str, signature: Tuple[int, ...], version: int,
+                 raw: Dict, model: Optional[ProcessResponse] = None,
+                 store: Optional[ScenarioStore] = None, streamed: bool = False):
+        self.path = path
+        self.signature = signature
+        self.version = version
+        self.raw = raw
+        self.streamed = streamed
+        self._model = model
+        self._store = store
+        self._lock = threading.Lock()
+        self._derived: Dict[Hashable, Any] = {}
+        self._keep: Dict[Hashable, KeepRule] = {}
+        self._sizes: Dict[Hashable, int] = {}
+        self._derived_locks: Dict[Hashable, threading.Lock] = {}
+        self._derived_lock = threading.Lock()
+
+    @property
+    def store(self) -> ScenarioStore:
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    simulated_data = self.raw['data']['simulated_summary']['simulated_data']
+                    self._store = ScenarioStore.from_scenarios(simulated_data)
+        return self._store
+
+    @property
+    def model(self) -> ProcessResponse:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = ProcessResponse(**self._document())
+        return self._model
+
+    def derived(self, key: Hashable, build: Callable[["DatasetSnapshot"], Any],
+                keep: Optional[KeepRule] = None) -> Any:
+        """
+        Value computed from this snapshot by `build`, built once and kept for
+        as long as the snapshot is current, so it never outlives its version.
+        `keep` says when appended scenarios leave the value unchanged, so
+        the next version reuses it instead of rebuilding it.
+        """
+        try:
+            return self._derived[key]
+        except KeyError:
+            pass
+        _check_blocking_allowed("Building a derived dataset value")
+        # One lock per key: concurrent callers of the same key wait for a
+        # single build, while builds of different keys run independently
+        with self._derived_lock:
+            lock = self._derived_locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._derived:
+                value = build(self)
+                self._sizes[key] = estimate_bytes(value)
+                self._derived[key] = value
+                if keep is not None:
+                    self._keep[key] = keep
+            return self._derived[key]
+
+    def appended(self, store: ScenarioStore, signature: Tuple[int, ...],
+                 version: int) -> "DatasetSnapshot":
+        """
+        The next version, serving `store` (this store with rows appended).
+        Derived values whose keep rule holds are carried over; the rest
+        are rebuilt on first use.
+        """
+        snapshot = DatasetSnapshot(
+            self.path, signature, version, self.raw, store=store, streamed=True
+        )
+        old_store = self.store
+        with self._derived_lock:
+            items = [(key, value, self._keep.get(key)) for key, value in self._derived.items()]
+        for key, value, keep in items:
+            if keep is not None and keep(old_store, store):
+                snapshot._derived[key] = value
+                snapshot._keep[key] = keep
+                snapshot._sizes[key] = self._sizes.get(key, 0)
+        return snapshot
+
+    def estimated_bytes(self) -> int:
+        """Approximate memory held by this snapshot: parsed file, store and derived values"""
+        total = self._store.estimated_bytes() if self._store is not None else 0
+        file_size = self.signature[1]
+        if not self.streamed:
+            total += JSON_TREE_FACTOR * file_size
+            if self._model is not None:
+                total += MODEL_FACTOR * file_size
+        elif self._model is not None:
+            total += MODEL_BYTES_PER_VALUE * int(self._store.values.size)
+        for key, value in list(self._derived.items()):
+            # Encoded responses grow when their gzip variant is first built
+            nbytes = getattr(value, "nbytes", None)
+            total += nbytes if isinstance(nbytes, int) else self._sizes.get(key, 0)
+        return total
+
+    def _document(self) -> Dict:
+        """Full document; for streamed files and appended versions the scenarios are rebuilt from the store"""
+        if not self.streamed:
+            return self.raw
+        data = dict(self.raw['data'])
+        data['simulated_summary'] = {'simulated_data': list(self._store.iter_scenarios())}
+        return {**self.raw, 'data': data}
+
+
+class DatasetCache:
+    """
+    In-process cache of a parsed and validated dataset file.
+
+    The file is only re-read when its mtime or size changes. A reload builds a
+    complete new snapshot before swapping it in, so readers always see either
+    the old or the new version, never a half-loaded one. Binary `.pfsc` files
+    are memory-mapped, and JSON files of at least `streaming_min_bytes` are
+    parsed incrementally straight into the columnar store instead of being
+    loaded as one JSON tree.
+
+    Scenarios added with `append` are recorded in a JSONL journal next to
+    the file and replayed on top of it whenever the file is (re)loaded; fold
+    them into the file and delete the journal to compact it.
+    """
+
+    def __init__(self, path: str, streaming_min_bytes: int = STREAMING_MIN_BYTES):
+        self.path = path
+        self.journal_path = journal_path(path)
+        self.streaming_min_bytes = streaming_min_bytes
+        self._snapshot: Optional[DatasetSnapshot] = None
+        self._version = 0
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def loading(self) -> bool:
+        """Whether the dataset has not been loaded yet or is being reloaded or appended to"""
+        return self._snapshot is None or self._load_lock.locked()
+
+    def _signature(self) -> Tuple[int, int, int]:
+        stat = os.stat(self.path)
+        try:
+            journal_size = os.path.getsize(self.journal_path)
+        except FileNotFoundError:
+            journal_size = 0
+        return (stat.st_mtime_ns, stat.st_size, journal_size)
+
+    def _record(self, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _load(self, signature: Tuple[int, int, int]) -> DatasetSnapshot:
+        snapshot = self._load_file(signature)
+        if signature[2]:
+            with DATASET_LOAD_SECONDS.timer(format="journal"):
+                store = snapshot.store.append(read_journal(self.journal_path))
+            snapshot = DatasetSnapshot(
+                self.path, signature, snapshot.version, snapshot.raw, store=store, streamed=True
+            )
+        return snapshot
+
+    def _load_file(self, signature: Tuple[int, int, int]) -> DatasetSnapshot:
+        self._version += 1
+        if self.path.endswith(BINARY_EXTENSION):
+            with DATASET_LOAD_SECONDS.timer(format="binary"):
+                header, store = load_binary(self.path)
+            return DatasetSnapshot(
+                self.path, signature, self._version, header, store=store, streamed=True
+            )
+        if signature[1] >= self.streaming_min_bytes:
+            with DATASET_LOAD_SECONDS.timer(format="streaming"):
+                header, store = load_streaming(self.path)
+            return DatasetSnapshot(
+                self.path, signature, self._version, header, store=store, streamed=True
+            )
+
+        with DATASET_LOAD_SECONDS.timer(format="json"):
+            with open(self.path, "r") as f:
+                raw = json.load(f)
+            model = ProcessResponse(**raw)
+        return DatasetSnapshot(self.path, signature, self._version, raw, model=model)
+
+    def get(self) -> DatasetSnapshot:
+        """Return the current snapshot, reloading the file if it has changed"""
+        _check_blocking_allowed("Loading a dataset")
+        signature = self._signature()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.signature == signature:
+            self._record(hit=True)
+            return snapshot
+
+        # Only one thread reloads; the others wait and then reuse its result
+        with self._load_lock:
+            return self._current(signature)
+
+    def _current(self, signature: Tuple[int, int, int]) -> DatasetSnapshot:
+        # Caller holds _load_lock
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.signature == signature:
+            self._record(hit=True)
+            return snapshot
+        self._record(hit=False)
+        snapshot = self._load(signature)
+        self._snapshot = snapshot
+        return snapshot
+
+    def append(self, scenarios: List[Dict]) -> DatasetSnapshot:
+        """
+        Add scenarios (dicts in the `Scenario` schema) as a new version.
+
+        The batch is written to the journal, then the current store is
+        extended in memory, so the cost grows with the batch, not with the
+        dataset. Appends are serialized with each other and with reloads.
+        """
+        _check_blocking_allowed("Appending to a dataset")
+        with self._load_lock:
+            current = self._current(self._signature())
+            with DATASET_LOAD_SECONDS.timer(format="append"):
+                store = current.store.append(scenarios)
+                with open(self.journal_path, "a") as f:
+                    f.write("".join(json.dumps(scenario) + "\n" for scenario in scenarios))
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._version += 1
+                snapshot = current.appended(store, self._signature(), self._version)
+            self._snapshot = snapshot
+            return snapshot
+
+    def invalidate(self):
+        """Drop the current snapshot so the next access reloads the file"""
+        with self._load_lock:
+            self._snapshot = None
+
+    def estimated_bytes(self) -> int:
+        snapshot = self._snapshot
+        return snapshot.estimated_bytes() if snapshot else 0
+
+    def stats(self) -> Dict:
+        """Return cache hit/miss counters, the loaded dataset version and its estimated size"""
+        snapshot = self._snapshot
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "path": self.path,
+            "version": snapshot.version if snapshot else None,
+            "estimated_bytes": snapshot.estimated_bytes() if snapshot else 0,
+            "streamed": snapshot.streamed if snapshot else None,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total else 0.0
+        }
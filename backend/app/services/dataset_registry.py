@@ -0,0 +1,171 @@
+"""
+Datasets served by the API, addressed by dataset ID.
+
+A dataset ID is the file name of a results file in the datasets directory
+without its extension (`.pfsc` is preferred over `.json`); the configured
+DATA_FILE is always available under its own ID and is the default. Each
+dataset gets its own DatasetCache, so versions, journals and derived values
+stay per dataset, and a cold dataset is loaded once however many requests
+ask for it at the same time.
+
+Loaded datasets are kept in least-recently-used order and evicted, oldest
+first, once their estimated sizes add up to more than `max_bytes`. The
+dataset being used is never evicted, even when it alone is over budget.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set
+
+from app.core.config import STREAMING_MIN_BYTES
+from app.services.binary_store import BINARY_EXTENSION
+from app.services.dataset_cache import DatasetCache, DatasetSnapshot
+
+DATASET_EXTENSIONS = [BINARY_EXTENSION, ".json"]
+DATASET_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,127}$")
+
+
+def dataset_id(path: str) -> str:
+    """The ID of the dataset stored at `path`"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class UnknownDatasetError(LookupError):
+    """No results file exists for the requested dataset ID"""
+
+
+class DatasetRegistry:
+    """Per-dataset caches under one memory budget (see the module docstring)"""
+
+    def __init__(self, directory: str, default_path: str, max_bytes: int,
+                 streaming_min_bytes: int = STREAMING_MIN_BYTES):
+        self.directory = directory
+        self.default_path = default_path
+        self.default_id = dataset_id(default_path)
+        self.max_bytes = max_bytes
+        self.streaming_min_bytes = streaming_min_bytes
+        self._caches: "OrderedDict[str, DatasetCache]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._uploading: Set[str] = set()
+        self.evictions = 0
+
+    def path(self, dataset_id: Optional[str] = None) -> Optional[str]:
+        """Results file of a dataset, or None when there is none"""
+        dataset_id = dataset_id or self.default_id
+        if dataset_id == self.default_id:
+            return self.default_path if os.path.isfile(self.default_path) else None
+        if not DATASET_ID_PATTERN.match(dataset_id):
+            return None
+        for extension in DATASET_EXTENSIONS:
+            candidate = os.path.join(self.directory, dataset_id + extension)
+            if os.path.isfile(candidate):
+                return candidate
+        return None
+
+    def upload_path(self, dataset_id: str) -> str:
+        """Where a dataset uploaded under `dataset_id` is written"""
+        if not DATASET_ID_PATTERN.match(dataset_id) or dataset_id == self.default_id:
+            raise ValueError(f"Invalid dataset ID: {dataset_id}")
+        return os.path.join(self.directory, dataset_id + BINARY_EXTENSION)
+
+    @contextmanager
+    def reserve_upload(self, dataset_id: str, overwrite: bool = False) -> Iterator[str]:
+        """
+        Hold `dataset_id` for one upload and yield the path to write it to.
+        Raises FileExistsError while another upload holds the ID, or when the
+        dataset already exists and `overwrite` is not set.
+        """
+        path = self.upload_path(dataset_id)
+        with self._lock:
+            if dataset_id in self._uploading:
+                raise FileExistsError(f"Dataset {dataset_id} is already being uploaded")
+            if not overwrite and self.path(dataset_id) is not None:
+                raise FileExistsError(f"Dataset {dataset_id} already exists")
+            self._uploading.add(dataset_id)
+        try:
+            yield path
+        finally:
+            with self._lock:
+                self._uploading.discard(dataset_id)
+
+    def forget(self, dataset_id: str):
+        """Drop a dataset's cache so the next request loads it from its current file"""
+        with self._lock:
+            self._caches.pop(dataset_id, None)
+
+    def ids(self) -> List[str]:
+        """Every dataset ID that currently has a results file, default first"""
+        found = set()
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                stem, extension = os.path.splitext(name)
+                if extension in DATASET_EXTENSIONS and DATASET_ID_PATTERN.match(stem):
+                    found.add(stem)
+        found.discard(self.default_id)
+        default = [self.default_id] if self.path() else []
+        return default + sorted(found)
+
+    def cache(self, dataset_id: Optional[str] = None) -> DatasetCache:
+        """The cache of a dataset, marked as most recently used"""
+        dataset_id = dataset_id or self.default_id
+        with self._lock:
+            cache = self._caches.get(dataset_id)
+            if cache is not None:
+                self._caches.move_to_end(dataset_id)
+                return cache
+        path = self.path(dataset_id)
+        if path is None:
+            raise UnknownDatasetError(f"Dataset {dataset_id} not found")
+        with self._lock:
+            # Creating a cache does no I/O; racing callers all get the first one
+            cache = self._caches.setdefault(dataset_id, DatasetCache(path, self.streaming_min_bytes))
+            self._caches.move_to_end(dataset_id)
+            return cache
+
+    def get(self, dataset_id: Optional[str] = None) -> DatasetSnapshot:
+        """The current snapshot of a dataset, loading it if needed"""
+        cache = self.cache(dataset_id)
+        snapshot = cache.get()
+        self.evict(keep=cache)
+        return snapshot
+
+    def append(self, scenarios: List[Dict], dataset_id: Optional[str] = None) -> DatasetSnapshot:
+        cache = self.cache(dataset_id)
+        snapshot = cache.append(scenarios)
+        self.evict(keep=cache)
+        return snapshot
+
+    def evict(self, keep: Optional[DatasetCache] = None):
+        """
+        Drop least recently used datasets until the rest fit in `max_bytes`.
+        Requests still holding an evicted snapshot keep using it; the next
+        request for that dataset loads it again. Datasets that are still
+        loading are skipped, so requests waiting on them share one load.
+        """
+        with self._lock:
+            sizes = {key: cache.estimated_bytes() for key, cache in self._caches.items()}
+            total = sum(sizes.values())
+            for key in list(self._caches):
+                if total <= self.max_bytes:
+                    break
+                if self._caches[key] is keep or self._caches[key].loading:
+                    continue
+                del self._caches[key]
+                total -= sizes[key]
+                self.evictions += 1
+
+    def stats(self) -> Dict:
+        """Loaded datasets, most recently used last, with their estimated sizes"""
+        with self._lock:
+            caches = list(self._caches.items())
+            evictions = self.evictions
+        loaded = [{"id": key, **cache.stats()} for key, cache in caches]
+        return {
+            "max_bytes": self.max_bytes,
+            "estimated_bytes": sum(entry["estimated_bytes"] for entry in loaded),
+            "evictions": evictions,
+            "loaded": loaded
+        }
@@ -0,0 +1,46 @@
+import gzip
+import hashlib
+import threading
+from typing import Any, Optional
+
+import orjson
+from pydantic import BaseModel
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class EncodedJSON:
+    """
+    A response body serialized once with orjson, with a strong ETag and a
+    gzip variant that is compressed on first request.
+    """
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        # Strong ETags identify exact bytes, so the gzip variant gets its own
+        self.gzip_etag = self.etag[:-1] + '-gzip"'
+        self._gzip_body: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def encode(cls, value: Any) -> "EncodedJSON":
+        return cls(orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY))
+
+    @property
+    def nbytes(self) -> int:
+        gzip_body = self._gzip_body
+        return len(self.body) + (len(gzip_body) if gzip_body is not None else 0)
+
+    @property
+    def gzip_body(self) -> bytes:
+        if self._gzip_body is None:
+            with self._lock:
+                if self._gzip_body is None:
+                    # mtime=0 keeps the compressed bytes identical across processes
+                    self._gzip_body = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzip_body
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+LLMCall = Callable[[], Awaitable[Any]]
+
+
+async def _run_call(call: LLMCall, semaphore: asyncio.Semaphore, timeout: float) -> Any:
+    async with semaphore:
+        return await asyncio.wait_for(call(), timeout=timeout)
+
+
+async def arun_llm_batch(calls: Dict[str, LLMCall], max_concurrency: int, timeout: float) -> Dict[str, Any]:
+    """
+    Run LLM calls concurrently, at most `max_concurrency` at a time.
+
+    Each call gets `timeout` seconds once it starts. The result dict maps
+    every name to the call's return value, or to the exception it raised
+    (asyncio.TimeoutError on timeout) so one failure does not sink the batch.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    names = list(calls)
+    results = await asyncio.gather(
+        *(_run_call(calls[name], semaphore, timeout) for name in names),
+        return_exceptions=True
+    )
+    return dict(zip(names, results))
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _batch_loop() -> asyncio.AbstractEventLoop:
+    """
+    Event loop shared by all batches, running in a daemon thread.
+
+    The pooled async HTTP client keeps connections bound to the loop that
+    opened them, so every batch must run on the same loop for them to be
+    reused across reports.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-batch", daemon=True).start()
+        return _loop
+
+
+def run_llm_batch(calls: Dict[str, LLMCall], max_concurrency: int, timeout: float) -> Dict[str, Any]:
+    """Blocking wrapper around arun_llm_batch for code running off the event loop"""
+    future = asyncio.run_coroutine_threadsafe(
+        arun_llm_batch(calls, max_concurrency, timeout), _batch_loop()
+    )
+    return future.result()
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from app.core.config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_ENTRIES
+)
+
+if TYPE_CHECKING:
+    from langchain_core.messages import AIMessage
+
+
+def cache_key(model: str, temperature: Optional[float], prompt: str) -> str:
+    """Hash of everything that determines an LLM response"""
+    payload = json.dumps([model, temperature, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent LLM response cache in a sqlite file.
+
+    Entries older than `ttl_seconds` are treated as misses and dropped.
+    After every insert the least recently used entries are deleted until at
+    most `max_entries` remain. Each entry remembers how long the original
+    call took, so hits can report the latency they saved.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " latency REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for `key`, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at, latency FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            self.latency_saved += row[2]
+            return row[0]
+
+    def put(self, key: str, response: str, latency: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, last_used, latency)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, response, now, now, latency)
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def discard(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "latency_saved_seconds": round(self.latency_saved, 3)
+            }
+
+
+def _message(content: str) -> "AIMessage":
+    # Imported on first hit so the API can start without loading langchain
+    from langchain_core.messages import AIMessage
+    return AIMessage(content=content)
+
+
+class CachedLLM:
+    """
+    Wraps a chat model so identical prompts are answered from an LLMCache.
+
+    Only `invoke` and `ainvoke` with a plain string prompt are cached; hits
+    never touch the wrapped model.
+    """
+
+    def __init__(self, llm: Any, cache: LLMCache):
+        self.llm = llm
+        self.cache = cache
+        self.model_name = getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+        self.temperature = getattr(llm, "temperature", None)
+
+    def key(self, prompt: str) -> str:
+        return cache_key(str(self.model_name), self.temperature, prompt)
+
+    def invoke(self, prompt: str, **kwargs) -> "AIMessage":
+        key = self.key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return _message(cached)
+        start = time.perf_counter()
+        response = self.llm.invoke(prompt, **kwargs)
+        self._store(key, response, time.perf_counter() - start)
+        return response
+
+    async def ainvoke(self, prompt: str, **kwargs) -> "AIMessage":
+        key = self.key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return _message(cached)
+        start = time.perf_counter()
+        response = await self.llm.ainvoke(prompt, **kwargs)
+        self._store(key, response, time.perf_counter() - start)
+        return response
+
+    def forget(self, prompt: str):
+        """Drop the cached response for `prompt`, e.g. when it failed to parse"""
+        self.cache.discard(self.key(prompt))
+
+    def _store(self, key: str, response: Any, latency: float):
+        content = response.content if hasattr(response, "content") else str(response)
+        if isinstance(content, str):
+            self.cache.put(key, content, latency)
+
+
+_llm_cache: Optional[LLMCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Process-wide LLM cache from the settings, or None when disabled"""
+    global _llm_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache(LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES)
+        return _llm_cache
+
+
+def cached_llm(llm: Any) -> Any:
+    """Wrap `llm` with the shared response cache if caching is enabled"""
+    cache = get_llm_cache()
+    return CachedLLM(llm, cache) if cache is not None else llm
@@ -0,0 +1,131 @@
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+import httpx
+
+from app.core.config import (
+    LLM_BASE_URL,
+    LLM_MAX_CONNECTIONS,
+    LLM_MODEL,
+    LLM_TEMPERATURE,
+    LLM_TIMEOUT_SECONDS
+)
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+
+class ConnectionStats:
+    """Counts requests and newly opened connections seen by the pooled transports"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_connection(self):
+        with self._lock:
+            self.connections_opened += 1
+
+    def trace(self, event_name: str, info: Dict):
+        # httpcore emits this once per new TCP connection, never for a pooled one
+        if event_name == "connection.connect_tcp.complete":
+            self.record_connection()
+
+    async def atrace(self, event_name: str, info: Dict):
+        self.trace(event_name, info)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            reused = max(0, self.requests - self.connections_opened)
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "connections_reused": reused,
+                "reuse_ratio": reused / self.requests if self.requests else 0.0
+            }
+
+
+class _TracedTransport(httpx.HTTPTransport):
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        super().__init__(**kwargs)
+        self._stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._stats.record_request()
+        request.extensions["trace"] = self._stats.trace
+        return super().handle_request(request)
+
+
+class _AsyncTracedTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        super().__init__(**kwargs)
+        self._stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self._stats.record_request()
+        request.extensions["trace"] = self._stats.atrace
+        return await super().handle_async_request(request)
+
+
+connection_stats = ConnectionStats()
+
+_clients: Dict[Tuple[Optional[str], Optional[str]], Any] = {}
+_override: Optional[Any] = None
+_clients_lock = threading.Lock()
+
+
+def _build_chat_model(api_key: Optional[str]) -> "ChatOpenAI":
+    # Imported on first use; langchain_openai costs over a second at startup
+    from langchain_openai import ChatOpenAI
+
+    limits = httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS
+    )
+    timeout = httpx.Timeout(LLM_TIMEOUT_SECONDS)
+    return ChatOpenAI(
+        temperature=LLM_TEMPERATURE,
+        model_name=LLM_MODEL,
+        api_key=api_key,
+        base_url=LLM_BASE_URL,
+        timeout=LLM_TIMEOUT_SECONDS,
+        http_client=httpx.Client(
+            transport=_TracedTransport(connection_stats, limits=limits), timeout=timeout
+        ),
+        http_async_client=httpx.AsyncClient(
+            transport=_AsyncTracedTransport(connection_stats, limits=limits), timeout=timeout
+        )
+    )
+
+
+def get_chat_model(api_key: Optional[str] = None) -> Any:
+    """
+    Process-wide chat model for report prompts.
+
+    One client is built per API key and reused by every report, so its
+    keep-alive connection pool (at most LLM_MAX_CONNECTIONS connections)
+    survives between requests. A model installed with set_chat_model takes
+    precedence.
+    """
+    with _clients_lock:
+        if _override is not None:
+            return _override
+        key = (api_key, LLM_BASE_URL)
+        if key not in _clients:
+            _clients[key] = _build_chat_model(api_key)
+        return _clients[key]
+
+
+def set_chat_model(model: Optional[Any]):
+    """Serve `model` from get_chat_model (e.g. a fake or local stand-in); None restores the default"""
+    global _override
+    with _clients_lock:
+        _override = model
+
+
+def get_connection_stats() -> Dict:
+    return connection_stats.to_dict()
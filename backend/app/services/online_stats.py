@@ -0,0 +1,200 @@
+"""
+Streaming summary statistics, updated in time proportional to each batch.
+
+`KPIStats` keeps count, mean and variance with Welford's algorithm (batches
+are merged with Chan et al.'s pairwise update), running min and max, and
+the median. Up to EXACT_MEDIAN_MAX_COUNT values the median is exact; beyond
+that it is a P² estimate (Jain & Chlamtac, 1985) that needs five markers of
+state instead of the data. P² moves each marker by at most one position per
+value, so on a small sample a few outliers can pull it away from the true
+median (even in the wrong direction); seeded from the exact order statistics
+of a large sample it stays close.
+"""
+
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Values kept for an exact median (8 bytes each) before switching to P²
+EXACT_MEDIAN_MAX_COUNT = 100_000
+
+
+class P2Quantile:
+    """P² estimate of one quantile `p` of a stream"""
+
+    def __init__(self, p: float = 0.5):
+        self.p = p
+        self._initial: List[float] = []
+        # Marker heights, actual positions (1-based) and desired positions
+        self.heights: Optional[List[float]] = None
+        self.positions: Optional[List[int]] = None
+        self.desired: Optional[List[float]] = None
+        self._increments = [0.0, p / 2.0, p, (1.0 + p) / 2.0, 1.0]
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, p: float = 0.5) -> "P2Quantile":
+        """
+        Sketch of existing data, with markers placed on its exact order
+        statistics (one partial sort) instead of replaying every value
+        """
+        sketch = cls(p)
+        n = len(values)
+        if n < 5:
+            for value in values.tolist():
+                sketch.add(value)
+            return sketch
+        positions = [int(round(1 + (n - 1) * dp)) for dp in sketch._increments]
+        positions[1:4] = sorted(min(max(pos, 2 + i), n - 3 + i) for i, pos in enumerate(positions[1:4]))
+        heights = np.partition(values, [pos - 1 for pos in positions])[[pos - 1 for pos in positions]]
+        sketch.heights = heights.tolist()
+        sketch.positions = positions
+        sketch.desired = [1 + (n - 1) * dp for dp in sketch._increments]
+        return sketch
+
+    def copy(self) -> "P2Quantile":
+        other = P2Quantile(self.p)
+        other._initial = list(self._initial)
+        if self.heights is not None:
+            other.heights = list(self.heights)
+            other.positions = list(self.positions)
+            other.desired = list(self.desired)
+        return other
+
+    def add(self, x: float):
+        if self.heights is None:
+            self._initial.append(x)
+            if len(self._initial) == 5:
+                self.heights = sorted(self._initial)
+                self.positions = [1, 2, 3, 4, 5]
+                self.desired = [1 + 4 * dp for dp in self._increments]
+                self._initial = []
+            return
+
+        q, n = self.heights, self.positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self._increments[i]
+
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if d > 0 else -1
+                candidate = self._parabolic(i, step)
+                if not q[i - 1] < candidate < q[i + 1]:
+                    candidate = q[i] + step * (q[i + step] - q[i]) / (n[i + step] - n[i])
+                q[i] = candidate
+                n[i] += step
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self) -> float:
+        if self.heights is not None:
+            return self.heights[2]
+        if not self._initial:
+            return float('nan')
+        return float(np.quantile(self._initial, self.p))
+
+
+class KPIStats:
+    """
+    Running KPI statistics with the same keys as `ScenarioStore.kpi_stats`.
+    Statistics of the data it was built from are exact, including the
+    median. Later batches keep the median exact while the count is at most
+    EXACT_MEDIAN_MAX_COUNT and update a P² estimate after that.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.median = P2Quantile(0.5)
+        self._exact_median: Optional[float] = None
+        # Every value so far while the count is small enough for an exact median
+        self._values: Optional[np.ndarray] = np.empty(0)
+
+    @classmethod
+    def from_values(cls, values: np.ndarray) -> "KPIStats":
+        stats = cls()
+        if len(values) == 0:
+            return stats
+        stats.count = len(values)
+        stats.mean = float(values.mean())
+        centred = values - values.mean()
+        stats.m2 = float((centred * centred).sum())
+        stats.min = float(values.min())
+        stats.max = float(values.max())
+        stats._exact_median = float(np.median(values))
+        if len(values) <= EXACT_MEDIAN_MAX_COUNT:
+            stats._values = np.array(values, dtype=np.float64)
+        else:
+            stats.median = P2Quantile.from_values(values)
+            stats._values = None
+        return stats
+
+    def copy(self) -> "KPIStats":
+        other = KPIStats()
+        other.count, other.mean, other.m2 = self.count, self.mean, self.m2
+        other.min, other.max = self.min, self.max
+        other.median = self.median.copy()
+        other._exact_median = self._exact_median
+        # Batches replace the array rather than change it, so it can be shared
+        other._values = self._values
+        return other
+
+    def update(self, values: np.ndarray):
+        """Fold a batch in: O(len(values)) once the median is a P² estimate, O(count) before"""
+        if len(values) == 0:
+            return
+        batch_count = len(values)
+        batch_mean = float(values.mean())
+        centred = values - batch_mean
+        batch_m2 = float((centred * centred).sum())
+        total = self.count + batch_count
+        delta = batch_mean - self.mean
+        self.mean += delta * batch_count / total
+        self.m2 += batch_m2 + delta * delta * self.count * batch_count / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        if self._values is not None:
+            kept = np.concatenate([self._values, np.asarray(values, dtype=np.float64)])
+            if len(kept) <= EXACT_MEDIAN_MAX_COUNT:
+                self._values = kept
+                self._exact_median = float(np.median(kept))
+                return
+            # Seed P² from the exact order statistics of everything so far
+            self.median = P2Quantile.from_values(kept)
+            self._values = None
+        else:
+            for value in values.tolist():
+                self.median.add(value)
+        self._exact_median = None
+
+    def to_dict(self) -> Dict:
+        if self.count == 0:
+            return {}
+        return {
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean,
+            'std': math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else float('nan'),
+            'range': self.max - self.min,
+            'median': self._exact_median if self._exact_median is not None else self.median.value()
+        }
@@ -1,24 +1,53 @@
+import io
 import os
 import tempfile
-from typing import Dict
+from typing import Dict, Optional
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from langchain_openai import ChatOpenAI
+
+from app.core.metrics import REPORT_STAGE_SECONDS
+from app.services.llm_client import get_chat_model
+from app.services.llm_cache import cached_llm
+
+try:
+    from svglib.svglib import svg2rlg
+except ImportError:  # Vector charts are optional; ChartGenerator falls back to PNG
+    svg2rlg = None
 
 class PDFService:
-    def __init__(self, report_content: Dict, chart_paths: Dict, processed_data: Dict):
+    def __init__(self, report_content: Dict, chart_paths: Dict, processed_data: Dict,
+                 section_summaries: Optional[Dict[str, str]] = None):
         self.report_content = report_content
         self.chart_paths = chart_paths
         self.data = processed_data
+        # Summaries generated ahead of time (see section_summary_inputs); missing ones are generated inline
+        self.section_summaries = section_summaries or {}
         self.api_key = os.environ.get("OPENAI_API_KEY")
-        self.llm = ChatOpenAI(temperature=0.2, model_name="gpt-4-turbo", api_key=self.api_key)
+        self.llm = cached_llm(get_chat_model(api_key=self.api_key))
         
-    def generate_section_summary(self, section_name: str, content: str, context: Dict) -> str:
-        """Generate an AI summary for a specific section of the report"""
+    def chart_flowable(self, path: str, width: float, height: float):
+        """Embed a chart: SVG files as native vector drawings, anything else as an image"""
+        if path.endswith('.svg') and svg2rlg is not None:
+            drawing = svg2rlg(path)
+            # Stretch to the same box an Image would fill
+            drawing.scale(width / drawing.width, height / drawing.height)
+            drawing.width, drawing.height = width, height
+            return drawing
+        return Image(path, width=width, height=height)
+    
+    def section_summary_inputs(self) -> Dict[str, str]:
+        """Sections that get an AI insight in the PDF, mapped to the content they summarise"""
+        kpi_stats = self.data.get('kpi_stats', {})
+        return {
+            "KPI Statistics": f"KPI statistics: Min={kpi_stats.get('min', 'N/A')}K, Max={kpi_stats.get('max', 'N/A')}K, Mean={kpi_stats.get('mean', 'N/A')}K"
+        }
+    
+    def section_summary_prompt(self, section_name: str, content: str, context: Dict) -> str:
+        """Format the summary prompt for one section of the report"""
         prompt_template = """
         You are an expert process engineer specializing in thermal systems analysis for the chemical industry.
         
@@ -61,20 +90,48 @@ class PDFService:
             kpi_max=kpi_max,
             kpi_mean=kpi_mean
         )
-        
+        return prompt
+    
+    def generate_section_summary(self, section_name: str, content: str, context: Dict) -> str:
+        """Generate an AI summary for a specific section of the report"""
+        prompt = self.section_summary_prompt(section_name, content, context)
         try:
             response = self.llm.invoke(prompt)
             summary = response.content if hasattr(response, 'content') else str(response)
             return summary
         except Exception as e:
             print(f"Error generating summary for {section_name}: {e}")
-            return f"Summary for {section_name} could not be generated."
+            return self.summary_fallback(section_name)
+    
+    async def agenerate_section_summary(self, section_name: str, content: str, context: Dict) -> str:
+        """Async variant of generate_section_summary, for batching with other LLM calls"""
+        prompt = self.section_summary_prompt(section_name, content, context)
+        response = await self.llm.ainvoke(prompt)
+        return response.content if hasattr(response, 'content') else str(response)
+    
+    def summary_fallback(self, section_name: str) -> str:
+        return f"Summary for {section_name} could not be generated."
+    
+    def section_summary(self, section_name: str) -> str:
+        """Precomputed summary for a section, generating it now if it was not batched"""
+        if section_name in self.section_summaries:
+            return self.section_summaries[section_name]
+        content = self.section_summary_inputs()[section_name]
+        return self.generate_section_summary(section_name, content, self.data)
         
     def generate_pdf(self, output_path: str = "process_analysis_report.pdf") -> str:
-        """Generate the PDF report using reportlab"""
+        """Generate the PDF report using reportlab and write it to output_path"""
+        pdf_bytes = self.build_pdf()
+        with open(output_path, 'wb') as f:
+            f.write(pdf_bytes)
+        return os.path.abspath(output_path)
+    
+    def build_pdf(self) -> bytes:
+        """Generate the PDF report in memory and return its bytes"""
+        buffer = io.BytesIO()
         with tempfile.TemporaryDirectory() as temp_dir:
             doc = SimpleDocTemplate(
-                output_path,
+                buffer,
                 pagesize=letter,
                 rightMargin=72,
                 leftMargin=72,
@@ -171,7 +228,7 @@ class PDFService:
             if top_impact_pie and os.path.exists(top_impact_pie):
                 story.append(Paragraph("Top Variable Impact", heading3_style))
                 story.append(Spacer(1, 0.1*inch))
-                img = Image(top_impact_pie, width=6*inch, height=4*inch)
+                img = self.chart_flowable(top_impact_pie, width=6*inch, height=4*inch)
                 story.append(img)
                 story.append(Spacer(1, 0.2*inch))
             
@@ -187,7 +244,7 @@ class PDFService:
             if setpoint_impact_bar and os.path.exists(setpoint_impact_bar):
                 story.append(Paragraph("Setpoint Impact Analysis", heading3_style))
                 story.append(Spacer(1, 0.1*inch))
-                img = Image(setpoint_impact_bar, width=6*inch, height=4*inch)
+                img = self.chart_flowable(setpoint_impact_bar, width=6*inch, height=4*inch)
                 story.append(img)
                 story.append(Spacer(1, 0.2*inch))
             
@@ -203,13 +260,11 @@ class PDFService:
             # KPI distribution chart
             kpi_distribution = self.chart_paths.get('kpi_distribution', '')
             if kpi_distribution and os.path.exists(kpi_distribution):
-                img = Image(kpi_distribution, width=6*inch, height=4*inch)
+                img = self.chart_flowable(kpi_distribution, width=6*inch, height=4*inch)
                 story.append(img)
                 story.append(Spacer(1, 0.2*inch))
                 
-                kpi_stats = self.data.get('kpi_stats', {})
-                kpi_summary = f"KPI statistics: Min={kpi_stats.get('min', 'N/A')}K, Max={kpi_stats.get('max', 'N/A')}K, Mean={kpi_stats.get('mean', 'N/A')}K"
-                kpi_ai_summary = self.generate_section_summary("KPI Statistics", kpi_summary, self.data)
+                kpi_ai_summary = self.section_summary("KPI Statistics")
                 story.append(Paragraph("Insight:", heading3_style))
                 story.append(Paragraph(kpi_ai_summary, styles["Insights"]))
                 story.append(Spacer(1, 0.2*inch))
@@ -226,7 +281,7 @@ class PDFService:
             # Variable Comparison Chart
             variable_comparison = self.chart_paths.get('variable_comparison', '')
             if variable_comparison and os.path.exists(variable_comparison):
-                img = Image(variable_comparison, width=6*inch, height=6.*inch)
+                img = self.chart_flowable(variable_comparison, width=6*inch, height=6.*inch)
                 story.append(img)
                 story.append(Spacer(1, 0.2*inch))
             
@@ -242,7 +297,7 @@ class PDFService:
             # Top Scenarios Chart
             top_scenarios = self.chart_paths.get('top_scenarios', '')
             if top_scenarios and os.path.exists(top_scenarios):
-                img = Image(top_scenarios, width=6*inch, height=4*inch)
+                img = self.chart_flowable(top_scenarios, width=6*inch, height=4*inch)
                 story.append(img)
                 story.append(Spacer(1, 0.2*inch))
             
@@ -263,6 +318,7 @@ class PDFService:
             conclusion = self.report_content.get('conclusion', '')
             story.append(Paragraph(conclusion, normal_style))
             
-            doc.build(story)
+            with REPORT_STAGE_SECONDS.timer(stage="pdf.doc_build"):
+                doc.build(story)
             
-            return os.path.abspath(output_path)
\ No newline at end of file
+            return buffer.getvalue()
\ No newline at end of file
@@ -1,23 +1,149 @@
-import json
 import os
-from pathlib import Path
-from app.core.config import DATA_DIR
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import (
+    DATA_FILE, DATASET_CACHE_MAX_BYTES, DATASETS_DIR, IMPACT_SOURCE,
+    SENSITIVITY_BINS, SENSITIVITY_BOOTSTRAP, SENSITIVITY_WORKERS, UPLOAD_MAX_BYTES
+)
 from app.models.schemas import ProcessResponse
+from app.services.dataset_cache import DatasetSnapshot, KeepRule, journal_path
+from app.services.dataset_registry import DatasetRegistry
+from app.services.encoded_json import EncodedJSON
+from app.services.scenario_store import ScenarioStore, format_value
+from app.services.sensitivity_engine import SensitivityResult
+from app.services.upload_ingest import ingest_upload
+
+_registry = DatasetRegistry(DATASETS_DIR, DATA_FILE, DATASET_CACHE_MAX_BYTES)
+
+def get_dataset(dataset_id: Optional[str] = None) -> DatasetSnapshot:
+    """Current snapshot of a dataset, the DATA_FILE one by default"""
+    return _registry.get(dataset_id)
+
+def get_dataset_path(dataset_id: Optional[str] = None) -> Optional[str]:
+    return _registry.path(dataset_id)
+
+def get_data(dataset: Optional[DatasetSnapshot] = None) -> ProcessResponse:
+    return (dataset or get_dataset()).model
+
+def get_raw_data(dataset_id: Optional[str] = None) -> dict:
+    """
+    The returned dict is shared between requests and must not be mutated.
+    For streamed datasets the scenario list is empty; use `get_dataset().store`.
+    """
+    return get_dataset(dataset_id).raw
+
+def get_cache_stats(dataset_id: Optional[str] = None) -> dict:
+    return _registry.cache(dataset_id).stats()
+
+def list_datasets() -> dict:
+    """Available dataset IDs and the loaded datasets with their estimated sizes"""
+    return {
+        "default": _registry.default_id,
+        "datasets": _registry.ids(),
+        **_registry.stats()
+    }
+
+async def upload_dataset(body: AsyncIterator[bytes], content_type: str,
+                         dataset_id: Optional[str] = None, overwrite: bool = False) -> Dict:
+    """
+    Stream an uploaded results file into a new dataset and return its ID with
+    ingestion stats. Raises FileExistsError for an existing ID unless
+    `overwrite`, ValueError for an invalid ID or upload.
+    """
+    dataset_id = dataset_id or uuid.uuid4().hex[:12]
+    with _registry.reserve_upload(dataset_id, overwrite) as path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        stats = await ingest_upload(body, content_type, path, max_bytes=UPLOAD_MAX_BYTES,
+                                    exclusive=not overwrite)
+        # Appends journaled against a replaced file do not apply to the new one
+        if os.path.exists(journal_path(path)):
+            os.remove(journal_path(path))
+        _registry.forget(dataset_id)
+    return {"dataset_id": dataset_id, **stats}
+
+def get_processed(dataset: Optional[DatasetSnapshot] = None) -> Dict:
+    """
+    `DataProcessor.process_all` output for a dataset version, built once and
+    shared by every report of that version; it must not be mutated.
+    """
+    dataset = dataset or get_dataset()
+
+    def build(snapshot: DatasetSnapshot) -> Dict:
+        # Imported here so the API starts without pandas (see report_pipeline)
+        from app.services.data_processor import DataProcessor
+        sensitivity = get_sensitivity(snapshot) if uses_computed_impact(snapshot) else None
+        return DataProcessor(snapshot.raw, scenario_store=snapshot.store, sensitivity=sensitivity).process_all()
+
+    return dataset.derived("processed", build)
 
-def get_data() -> ProcessResponse:
-    json_path = os.path.join(DATA_DIR, "mock_results.json")
-    with open(json_path, "r") as f:
-        data = json.load(f)
-    return ProcessResponse(**data)
+def unaffected_by_appends(old: ScenarioStore, new: ScenarioStore) -> bool:
+    """Keep rule for values that do not depend on the scenarios"""
+    return True
 
-def get_raw_data() -> dict:
-    json_path = os.path.join(DATA_DIR, "mock_results.json")
-    with open(json_path, "r") as f:
-        data = json.load(f)
-    return data
+def top_rows_unchanged(n: int) -> KeepRule:
+    """Keep rule for values built from the `n` best scenarios only"""
+    def keep(old: ScenarioStore, new: ScenarioStore) -> bool:
+        if n == 0:
+            return True
+        if len(old) < n:
+            return False
+        # Ties keep file order, so a new row must beat the n-th best to enter
+        threshold = old.kpi[old.top_indices(n)[-1]]
+        return not (new.kpi[len(old):] > threshold).any()
+    return keep
 
-def get_top_impact_variables():
-    data = get_data()
+def get_encoded(name: str, build: Callable[[DatasetSnapshot], Any],
+                dataset: Optional[DatasetSnapshot] = None,
+                keep: Optional[KeepRule] = None) -> EncodedJSON:
+    """
+    The JSON encoding of `build(dataset)` for the current dataset version,
+    serialized once per version and shared by all requests. `keep` lets
+    versions created by appends reuse it (see DatasetSnapshot.derived).
+    """
+    dataset = dataset or get_dataset()
+    return dataset.derived(("json", name), lambda snapshot: EncodedJSON.encode(build(snapshot)), keep)
+
+def append_scenarios(scenarios: List[Dict], dataset_id: Optional[str] = None) -> Dict:
+    """Append scenarios in the `Scenario` schema and return the new version's summary"""
+    dataset = _registry.append(scenarios, dataset_id)
+    return {
+        "version": dataset.version,
+        "appended": len(scenarios),
+        "total": len(dataset.store),
+        "kpi_stats": dataset.store.kpi_stats()
+    }
+
+def get_kpi_stats(dataset: Optional[DatasetSnapshot] = None) -> Dict:
+    return (dataset or get_dataset()).store.kpi_stats()
+
+def get_sensitivity(dataset: Optional[DatasetSnapshot] = None) -> SensitivityResult:
+    """KPI sensitivity to every variable, computed once per dataset version"""
+    dataset = dataset or get_dataset()
+    return dataset.derived("sensitivity", lambda snapshot: snapshot.store.sensitivity(
+        SENSITIVITY_BINS, SENSITIVITY_BOOTSTRAP, SENSITIVITY_WORKERS
+    ))
+
+def uses_computed_impact(dataset: Optional[DatasetSnapshot] = None) -> bool:
+    """
+    Whether `top_impact` and `setpoint_impact_summary` come from the
+    sensitivity engine: always with IMPACT_SOURCE=computed, otherwise only
+    when the results file does not provide them
+    """
+    if IMPACT_SOURCE == "computed":
+        return True
+    data = get_data(dataset).data
+    return not data.top_impact and not data.setpoint_impact_summary
+
+def impact_keep_rule(dataset: Optional[DatasetSnapshot] = None) -> Optional[KeepRule]:
+    """Impacts read from the file survive appends; computed ones do not"""
+    return None if uses_computed_impact(dataset) else unaffected_by_appends
+
+def get_top_impact_variables(dataset: Optional[DatasetSnapshot] = None):
+    dataset = dataset or get_dataset()
+    data = get_data(dataset)
+    computed = uses_computed_impact(dataset)
+    top_impact = get_sensitivity(dataset).top_impact() if computed else data.data.top_impact
     cleaned_impact = {}
     key_mapping = {
         "HEX-100.cold_fluid_temperature": "HEX-100 - Cold Fluid Temperature",
@@ -26,92 +152,129 @@ def get_top_impact_variables():
         "Others": "Others"
     }
     for old_key, new_key in key_mapping.items():
-        if old_key in data.data.top_impact:
-            cleaned_impact[new_key] = data.data.top_impact[old_key]
+        if old_key in top_impact:
+            cleaned_impact[new_key] = top_impact[old_key]
+    if computed:
+        # Computed impacts may cover setpoints the display names above do not
+        for key, value in top_impact.items():
+            cleaned_impact.setdefault(key_mapping.get(key, key), value)
     return {
         "top_summary_text": data.data.top_summary_text,
         "top_impact": cleaned_impact
     }
 
-def get_scenarios():
-    data = get_raw_data()
-    scenarios = data['data']['simulated_summary']['simulated_data']
+def get_scenarios(offset: int = 0, limit: Optional[int] = None, variables: Optional[List[str]] = None,
+                  kpi_min: Optional[float] = None, kpi_max: Optional[float] = None,
+                  sort: Optional[str] = None,
+                  dataset: Optional[DatasetSnapshot] = None) -> Tuple[dict, int]:
+    """
+    One page of scenarios and the number of scenarios matching the filter.
+
+    Keys are the scenarios' row indices in the results file, so pages and
+    filtered views line up with the unfiltered response. `variables`
+    restricts the elements to those names; `sort` is "kpi" or "-kpi".
+    Only the rows and columns of the page are read and formatted.
+    """
+    store = (dataset or get_dataset()).store
+    if sort not in (None, "kpi", "-kpi"):
+        raise ValueError(f"Unsupported sort order: {sort}")
+    if variables is None:
+        cols = list(range(len(store.variables)))
+    else:
+        unknown = [name for name in variables if name not in store.variable_index]
+        if unknown:
+            raise ValueError(f"Unknown variables: {', '.join(unknown)}")
+        cols = [store.variable_index[name] for name in dict.fromkeys(variables)]
+
+    total, rows = store.select(
+        kpi_min=kpi_min,
+        kpi_max=kpi_max,
+        descending=None if sort is None else sort == "-kpi",
+        offset=offset,
+        limit=limit
+    )
     result = {
         "scenario": {},
         "kpi_value": {},
         "elements": {}
     }
     
-    for idx, scenario in enumerate(scenarios):
+    groups = [
+        "Condition" if store.variable_type(col) == 'Condition' else "Setpoint"
+        for col in cols
+    ]
+    names = [store.variables[col] for col in cols]
+    units = [store.variable_unit(col) for col in cols]
+    page_values = store.values[rows][:, cols].tolist()
+    
+    for idx, row_values in zip(rows.tolist(), page_values):
         str_idx = str(idx)
         
-        result["scenario"][str_idx] = scenario['scenario']
+        result["scenario"][str_idx] = store.scenario_ids[idx]
         
-        result["kpi_value"][str_idx] = scenario['kpi_value']
+        result["kpi_value"][str_idx] = float(store.kpi[idx])
         
-        result["elements"][str_idx] = {
+        elements = {
             "Condition": {},
             "Setpoint": {}
         }
-        for equipment_spec in scenario['equipment_specification']:
-            equipment = equipment_spec['equipment']
-            
-            for variable in equipment_spec['variables']:
-                var_name = f"{equipment}.{variable['name']}"
-                if var_name == "Fuel.Fuel - temperature":
-                    var_name = "Fuel.temperature"
-                
-                if 'heat_transfer_coefficient' in variable['name']:
-                    formatted_value = f"{variable['value']} W/m²·K"
-                else:
-                    formatted_value = f"{variable['value']}K"
-                
-                if variable['type'] == 'Condition':
-                    result["elements"][str_idx]["Condition"][var_name] = formatted_value
-                else:
-                    result["elements"][str_idx]["Setpoint"][var_name] = formatted_value
+        for group, name, unit, value in zip(groups, names, units, row_values):
+            if value != value:
+                continue
+            elements[group][name] = format_value(value, unit)
+        result["elements"][str_idx] = elements
 
-    return result
+    return result, total
 
-def get_top_scenarios_temperatures():
+def get_top_scenarios_temperatures(n: int = 5, families: Optional[List[str]] = None,
+                                   dataset: Optional[DatasetSnapshot] = None):
     """
-    Extract only the temperature values from the top performing scenarios.
-    Returns a simplified data structure with just the temperature values.
+    Extract variable values (temperatures by default) from the `n` top
+    performing scenarios. `families` selects other variable families, e.g.
+    `heat_transfer_coefficient`.
+    Returns a simplified data structure with just those values.
     """
-    data = get_raw_data()
-    scenarios = data['data']['simulated_summary']['simulated_data']
-    sorted_scenarios = sorted(scenarios, key=lambda x: x['kpi_value'], reverse=True)
-    top_scenarios = sorted_scenarios[:5]
+    store = (dataset or get_dataset()).store
+    families = families or ["temperature"]
+    unknown = [family for family in families if family not in store.families]
+    if unknown:
+        raise ValueError(f"Unknown variable families: {', '.join(unknown)}")
+    family_cols = store.family_columns(families)
+    units = [store.variable_unit(col) for col in family_cols]
     
     result = {
         "top_scenarios": []
     }
     
-    for scenario in top_scenarios:
+    for idx in store.top_indices(n).tolist():
         scenario_data = {
-            "scenario": scenario['scenario'],
-            "kpi_value": scenario['kpi_value'],
+            "scenario": store.scenario_ids[idx],
+            "kpi_value": float(store.kpi[idx]),
             "temperatures": {}
         }
         
-        for equipment_spec in scenario['equipment_specification']:
-            equipment = equipment_spec['equipment']
-            
-            for variable in equipment_spec['variables']:
-                if 'temperature' in variable['name'].lower() and 'heat_transfer_coefficient' not in variable['name'].lower():
-                    var_name = f"{equipment}.{variable['name']}"
-                    if var_name == "Fuel.Fuel - temperature":
-                        var_name = "Fuel.temperature"
-                    
-                    scenario_data["temperatures"][var_name] = {
-                        "value": variable['value'],
-                        "formatted": f"{variable['value']}K"
-                    }
+        row = store.values[idx]
+        for col, unit in zip(family_cols, units):
+            value = float(row[col])
+            if value != value:
+                continue
+            scenario_data["temperatures"][store.variables[col]] = {
+                "value": value,
+                "formatted": format_value(value, unit)
+            }
         
         result["top_scenarios"].append(scenario_data)
     
     return result
 
-def get_setpoint_impacts():
-    data = get_data()
-    return data.data.setpoint_impact_summary
\ No newline at end of file
+def get_setpoint_impacts(dataset: Optional[DatasetSnapshot] = None):
+    dataset = dataset or get_dataset()
+    if uses_computed_impact(dataset):
+        return get_sensitivity(dataset).setpoint_impact_summary()
+    data = get_data(dataset)
+    return data.data.setpoint_impact_summary
+
+def get_correlations(method: str = "pearson", dataset: Optional[DatasetSnapshot] = None):
+    """Correlation matrix of all variables and the KPI, with p-values and confidence intervals"""
+    dataset = dataset or get_dataset()
+    return dataset.store.correlations(method).to_dict()
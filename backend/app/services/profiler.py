@@ -0,0 +1,136 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+PROFILE_EXTENSION = ".prof"
+_PROFILE_ID = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+class _Capture:
+    """A running capture: the thread it started on and profiles of other threads to merge"""
+
+    def __init__(self):
+        self.thread_id = threading.get_ident()
+        self.profilers: List[cProfile.Profile] = []
+        self.lock = threading.Lock()
+
+
+# Set while a capture runs; copied into threads started with the request's context
+_capture: ContextVar[Optional[_Capture]] = ContextVar("profile_capture", default=None)
+
+
+@contextmanager
+def profile_thread() -> Iterator[None]:
+    """
+    Profile the block into the capture running in the caller's context, if
+    any. cProfile only sees the thread that enabled it, so work handed to
+    another thread (e.g. a sync route in the thread pool) is profiled here
+    and merged into the capture when it is saved.
+    """
+    capture = _capture.get()
+    if capture is None or capture.thread_id == threading.get_ident():
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        with capture.lock:
+            capture.profilers.append(profiler)
+
+
+class ProfileStore:
+    """
+    cProfile captures saved as pstats files, newest `max_files` kept.
+
+    Only one capture runs at a time per process (requests share the event
+    loop thread, which runs one profiler at a time), so `capture` yields None
+    instead of waiting when another one is in progress. Threads that work
+    for the captured block join it through `profile_thread`.
+    """
+
+    def __init__(self, directory: str, max_files: int = 100):
+        self.directory = directory
+        self.max_files = max_files
+        self._active = threading.Lock()
+
+    def path(self, profile_id: str) -> Optional[str]:
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.directory, profile_id + PROFILE_EXTENSION)
+        return path if os.path.exists(path) else None
+
+    @contextmanager
+    def capture(self, label: str) -> Iterator[Optional[str]]:
+        """Profile the block, saving it under the yielded ID (None if another capture is running)"""
+        if not self._active.acquire(blocking=False):
+            yield None
+            return
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{_slug(label)}-{uuid.uuid4().hex[:8]}"
+        capture = _Capture()
+        token = _capture.set(capture)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                yield profile_id
+            finally:
+                profiler.disable()
+                stats = pstats.Stats(profiler)
+                with capture.lock:
+                    for thread_profiler in capture.profilers:
+                        stats.add(thread_profiler)
+                os.makedirs(self.directory, exist_ok=True)
+                stats.dump_stats(os.path.join(self.directory, profile_id + PROFILE_EXTENSION))
+                self._prune()
+        finally:
+            _capture.reset(token)
+            self._active.release()
+
+    def list(self) -> List[Dict]:
+        """Saved profiles, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(PROFILE_EXTENSION):
+                    stat = entry.stat()
+                    entries.append({
+                        "profile_id": entry.name[:-len(PROFILE_EXTENSION)],
+                        "bytes": stat.st_size,
+                        "created_at": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc).isoformat()
+                    })
+        return sorted(entries, key=lambda entry: entry["created_at"], reverse=True)
+
+    def summary(self, profile_id: str, sort: str = "cumulative", limit: int = 50) -> Optional[str]:
+        """pstats text report of the top `limit` functions"""
+        path = self.path(profile_id)
+        if path is None:
+            return None
+        out = io.StringIO()
+        stats = pstats.Stats(path, stream=out)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def _prune(self):
+        for entry in self.list()[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.directory, entry["profile_id"] + PROFILE_EXTENSION))
+            except FileNotFoundError:
+                pass
+
+
+def _slug(label: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-")[:60] or "profile"
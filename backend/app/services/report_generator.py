@@ -1,4 +1,3 @@
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
@@ -6,6 +5,10 @@ from typing import Dict, List, Optional
 import json
 import os
 
+from app.services.correlation_engine import format_p_value
+from app.services.llm_client import get_chat_model
+from app.services.llm_cache import CachedLLM, cached_llm
+
 class ProcessAnalysisReport(BaseModel):
     executive_summary: str = Field(description="A concise executive summary of the overall process analysis")
     technical_summary: str = Field(description="A detailed technical summary of the findings")
@@ -17,15 +20,27 @@ class ReportGenerator:
     def __init__(self, processed_data: Dict, api_key: Optional[str] = None):
         self.data = processed_data
         self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
-        self.llm = ChatOpenAI(temperature=0.2, model_name="gpt-4-turbo", api_key=self.api_key)
+        self.llm = cached_llm(get_chat_model(api_key=self.api_key))
         self.report_content = {}
         self.parser = PydanticOutputParser(pydantic_object=ProcessAnalysisReport)
     
-    def generate_report_content(self) -> Dict:
-        """
-        Generate the report content using LLM
-        """
-
+    def correlation_summary(self, limit: int = 10) -> str:
+        """The variables most correlated with the KPI, one line each, strongest first"""
+        correlations = self.data.get('correlations')
+        if correlations is None or correlations.empty or 'p_value' not in correlations:
+            return "Not available"
+        strongest = correlations.reindex(
+            correlations['correlation'].abs().sort_values(ascending=False).index
+        ).head(limit)
+        return "\n".join(
+            f"- {row.variable}: Pearson r = {row.correlation:.3f} "
+            f"(95% CI {row.ci_low:.3f} to {row.ci_high:.3f}, {format_p_value(row.p_value)}), "
+            f"Spearman rho = {row.spearman:.3f} ({format_p_value(row.spearman_p_value)}), n = {row.n}"
+            for row in strongest.itertuples()
+        )
+    
+    def build_prompt(self) -> str:
+        """Format the report prompt from the processed data"""
         summaries = self.data['summaries']
         top_variables = self.data['top_variables_df'].to_dict(orient='records')
         setpoint_impact = self.data['setpoint_impact_df'].to_dict(orient='records')
@@ -55,6 +70,9 @@ class ReportGenerator:
         SETPOINT IMPACT SUMMARY:
         {setpoint_impact}
         
+        CORRELATION WITH KPI (strongest first):
+        {kpi_correlations}
+        
         KPI STATISTICS:
         - Minimum: {kpi_min} K
         - Maximum: {kpi_max} K
@@ -81,7 +99,7 @@ class ReportGenerator:
         prompt = PromptTemplate(
             template=prompt_template,
             input_variables=["main_summary", "top_summary", "impact_summary", "top_variables", 
-                            "setpoint_impact", "kpi_min", "kpi_max", "kpi_mean", "kpi_std", "kpi_range"],
+                            "setpoint_impact", "kpi_correlations", "kpi_min", "kpi_max", "kpi_mean", "kpi_std", "kpi_range"],
             partial_variables={"format_instructions": self.parser.get_format_instructions()}
         )
 
@@ -91,15 +109,31 @@ class ReportGenerator:
             impact_summary=summaries['impact_summary'],
             top_variables=json.dumps(top_variables, indent=2),
             setpoint_impact=json.dumps(setpoint_impact, indent=2),
+            kpi_correlations=self.correlation_summary(),
             kpi_min=kpi_stats['min'],
             kpi_max=kpi_stats['max'],
             kpi_mean=kpi_stats['mean'],
             kpi_std=kpi_stats.get('std', 'N/A'),
             kpi_range=kpi_stats.get('range', kpi_stats['max'] - kpi_stats['min']),
         )
-        
+        return formatted_prompt
+
+    def generate_report_content(self) -> Dict:
+        """
+        Generate the report content using LLM
+        """
+        formatted_prompt = self.build_prompt()
         response = self.llm.invoke(formatted_prompt)
-        
+        return self.parse_response(response, formatted_prompt)
+
+    async def agenerate_report_content(self) -> Dict:
+        """Async variant of generate_report_content, for batching with other LLM calls"""
+        formatted_prompt = self.build_prompt()
+        response = await self.llm.ainvoke(formatted_prompt)
+        return self.parse_response(response, formatted_prompt)
+
+    def parse_response(self, response, formatted_prompt: str) -> Dict:
+        """Parse the LLM response into report content, falling back to generic text"""
         try:
             response_text = response.content if hasattr(response, 'content') else str(response)
             parsed_response = self.parser.parse(response_text)
@@ -107,21 +141,27 @@ class ReportGenerator:
             print(f"✅ Success generating LLM response")
         except Exception as e:
             print(f"❌ Error parsing LLM response: {e}")
-            self.report_content = {"raw_response": response}
-            self.report_content = {
-                "executive_summary": "Analysis of process simulation data identified key variables affecting system performance.",
-                "technical_summary": "The simulation results indicate several variables have significant impact on the heat exchanger output temperature.",
-                "variable_analysis": "Temperature variables showed the strongest correlation with KPI improvements.",
-                "recommendations": [
-                    "Optimize temperature settings based on identified impact factors",
-                    "Focus on variables with highest weightage for maximum improvement",
-                    "Monitor heat transfer coefficients to ensure optimal system operation"
-                ],
-                "conclusion": "By adjusting the identified key variables, significant improvements in system performance can be achieved."
-            }
+            if isinstance(self.llm, CachedLLM):
+                self.llm.forget(formatted_prompt)
+            self.report_content = self.fallback_content()
             
         return self.report_content
     
+    @staticmethod
+    def fallback_content() -> Dict:
+        """Generic report content used when the LLM response is unusable"""
+        return {
+            "executive_summary": "Analysis of process simulation data identified key variables affecting system performance.",
+            "technical_summary": "The simulation results indicate several variables have significant impact on the heat exchanger output temperature.",
+            "variable_analysis": "Temperature variables showed the strongest correlation with KPI improvements.",
+            "recommendations": [
+                "Optimize temperature settings based on identified impact factors",
+                "Focus on variables with highest weightage for maximum improvement",
+                "Monitor heat transfer coefficients to ensure optimal system operation"
+            ],
+            "conclusion": "By adjusting the identified key variables, significant improvements in system performance can be achieved."
+        }
+    
     def get_report_content(self) -> Dict:
         """Get the report content"""
         if not self.report_content:
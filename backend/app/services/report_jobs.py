@@ -0,0 +1,171 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+from app.core.metrics import REPORT_JOBS
+from app.services.report_store import ReportArtifact
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+PENDING = "pending"
+DONE = "done"
+
+
+def _timestamp(value: Optional[float]) -> Optional[str]:
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, tz=timezone.utc).isoformat()
+
+
+class ReportJob:
+    """State of one background report build"""
+
+    def __init__(self, stages: List[str], profile: bool = False, dataset_id: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.dataset_id = dataset_id
+        self.profile = profile
+        self.profile_id: Optional[str] = None
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.artifact: Optional[ReportArtifact] = None
+        self.stages: Dict[str, Dict] = OrderedDict(
+            (name, {"status": PENDING, "started_at": None, "seconds": None}) for name in stages
+        )
+        self.future: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Mark a pipeline stage as running for the duration of the block"""
+        entry = self.stages.setdefault(name, {"status": PENDING, "started_at": None, "seconds": None})
+        start = time.time()
+        with self._lock:
+            entry["status"] = RUNNING
+            entry["started_at"] = start
+        try:
+            yield
+        except BaseException:
+            with self._lock:
+                entry["status"] = FAILED
+                entry["seconds"] = time.time() - start
+            raise
+        with self._lock:
+            entry["status"] = DONE
+            entry["seconds"] = time.time() - start
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            stages = [
+                {
+                    "name": name,
+                    "status": entry["status"],
+                    "started_at": _timestamp(entry["started_at"]),
+                    "seconds": round(entry["seconds"], 3) if entry["seconds"] is not None else None
+                }
+                for name, entry in self.stages.items()
+            ]
+        completed = sum(1 for entry in stages if entry["status"] == DONE)
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": completed / len(stages) if stages else 0.0,
+            "stages": stages,
+            "created_at": _timestamp(self.created_at),
+            "started_at": _timestamp(self.started_at),
+            "finished_at": _timestamp(self.finished_at),
+            "error": self.error,
+            "profile_id": self.profile_id,
+            "dataset_id": self.dataset_id
+        }
+
+
+class ReportJobManager:
+    """
+    Runs report builds on a bounded worker pool.
+
+    At most `max_concurrent_jobs` reports are built at once; further
+    submissions wait in the pool's queue. Only the most recent `history`
+    jobs are remembered; `discard` is called with the artifact of each job
+    that is forgotten, except the latest successful one.
+    """
+
+    def __init__(self, run_job: Callable[[ReportJob], ReportArtifact], stages: List[str],
+                 max_concurrent_jobs: int = 2, history: int = 100,
+                 discard: Optional[Callable[[ReportArtifact], None]] = None):
+        self._run_job = run_job
+        self._discard = discard
+        self._stages = stages
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_jobs, thread_name_prefix="report-job"
+        )
+        self._jobs: "OrderedDict[str, ReportJob]" = OrderedDict()
+        self._history = history
+        self._lock = threading.Lock()
+        self.latest_succeeded: Optional[ReportJob] = None
+
+    def submit(self, profile: bool = False, dataset_id: Optional[str] = None) -> ReportJob:
+        """Queue a build of a dataset; with `profile`, `run_job` is expected to profile it"""
+        job = ReportJob(self._stages, profile=profile, dataset_id=dataset_id)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self._executor.submit(self._execute, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[ReportJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _prune(self):
+        while len(self._jobs) > self._history:
+            oldest_id = next(
+                (job_id for job_id, job in self._jobs.items() if job.finished), None
+            )
+            if oldest_id is None:
+                return
+            job = self._jobs.pop(oldest_id)
+            if self._discard is not None and job.artifact is not None and job is not self.latest_succeeded:
+                self._discard(job.artifact)
+
+    def _execute(self, job: ReportJob) -> ReportArtifact:
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.artifact = self._run_job(job)
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+            REPORT_JOBS.inc(status=FAILED)
+            raise
+        finally:
+            job.finished_at = time.time()
+        job.status = SUCCEEDED
+        REPORT_JOBS.inc(status=SUCCEEDED)
+        with self._lock:
+            previous, self.latest_succeeded = self.latest_succeeded, job
+            # Kept on disk only while it was the latest; drop it once superseded
+            if previous is not None and previous.id not in self._jobs and self._discard is not None:
+                self._discard(previous.artifact)
+        return job.artifact
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,123 @@
+"""
+Report pipeline: dataset -> processed data -> charts -> LLM text -> PDF.
+
+The report stack (pandas, matplotlib/seaborn, langchain, reportlab) takes
+seconds to import, so it is loaded on the first build, or ahead of time by
+`prewarm`, instead of when the API starts.
+"""
+
+import importlib
+import time
+from contextlib import contextmanager, nullcontext
+from functools import partial
+from typing import TYPE_CHECKING, Callable, ContextManager, Dict, Iterator, Optional, Tuple
+
+from app.core.config import LLM_MAX_CONCURRENCY, LLM_TIMEOUT_SECONDS
+from app.core.metrics import REPORT_STAGE_SECONDS
+from app.services.llm_batch import run_llm_batch
+from app.services.process_data import get_dataset, get_processed
+
+if TYPE_CHECKING:
+    from app.services.pdf_service import PDFService
+    from app.services.report_generator import ReportGenerator
+
+REPORT_STAGES = ["load", "process", "charts", "llm", "pdf"]
+
+# Imported by the first report build or by prewarm()
+REPORT_MODULES = [
+    "app.services.data_processor",
+    "app.services.chart_generator",
+    "app.services.report_generator",
+    "app.services.pdf_service"
+]
+
+StageTracker = Callable[[str], ContextManager]
+
+
+def _no_tracking(stage: str) -> ContextManager:
+    return nullcontext()
+
+
+def _timed(stage: StageTracker) -> StageTracker:
+    """Wrap a stage tracker so every stage is also recorded in the stage histogram"""
+    @contextmanager
+    def tracked(name: str) -> Iterator[None]:
+        with stage(name), REPORT_STAGE_SECONDS.timer(stage=name):
+            yield
+    return tracked
+
+
+def prewarm() -> float:
+    """Import the report stack and the default chat model, returning the seconds it took"""
+    start = time.perf_counter()
+    for module in REPORT_MODULES:
+        importlib.import_module(module)
+    from langchain_openai import ChatOpenAI  # noqa: F401  (imported by the chat model on first use)
+    return time.perf_counter() - start
+
+
+def generate_llm_content(report_generator: "ReportGenerator",
+                         pdf_service: "PDFService") -> Tuple[Dict, Dict[str, str]]:
+    """
+    Run the report prompt and every section summary prompt as one concurrent
+    batch, returning (report_content, section_summaries). A call that fails
+    or times out gets the same fallback text as the sequential path.
+    """
+    calls = {"report": report_generator.agenerate_report_content}
+    sections = pdf_service.section_summary_inputs()
+    for name, content in sections.items():
+        calls[name] = partial(pdf_service.agenerate_section_summary, name, content, pdf_service.data)
+
+    results = run_llm_batch(calls, LLM_MAX_CONCURRENCY, LLM_TIMEOUT_SECONDS)
+
+    report_content = results.pop("report")
+    if isinstance(report_content, BaseException):
+        print(f"❌ Error generating LLM response: {report_content!r}")
+        report_content = report_generator.fallback_content()
+
+    section_summaries = {}
+    for name, summary in results.items():
+        if isinstance(summary, BaseException):
+            print(f"Error generating summary for {name}: {summary!r}")
+            summary = pdf_service.summary_fallback(name)
+        section_summaries[name] = summary
+    return report_content, section_summaries
+
+
+def run_report_pipeline(charts_dir: str, api_key: Optional[str] = None,
+                        stage: StageTracker = _no_tracking,
+                        dataset_id: Optional[str] = None) -> bytes:
+    """
+    Build the PDF report for the current version of a dataset (DATA_FILE by
+    default) and return its bytes. Processed data is shared by all reports
+    of a version, so only the first one pays for the "process" stage.
+
+    This is blocking, CPU-heavy work (pandas, matplotlib, LLM calls and
+    reportlab) and must not run on the event loop. Charts are written to
+    `charts_dir`, which should be private to this build. `stage` is entered
+    around each step in REPORT_STAGES so callers can track progress.
+    """
+    from app.services.chart_generator import ChartGenerator
+    from app.services.pdf_service import PDFService
+    from app.services.report_generator import ReportGenerator
+
+    stage = _timed(stage)
+    with stage("load"):
+        dataset = get_dataset(dataset_id)
+
+    with stage("process"):
+        processed_data = get_processed(dataset)
+
+    with stage("charts"):
+        chart_generator = ChartGenerator(processed_data)
+        chart_paths = chart_generator.save_charts_to_files(directory=charts_dir)
+
+    with stage("llm"):
+        report_generator = ReportGenerator(processed_data, api_key=api_key)
+        pdf_service = PDFService({}, chart_paths, processed_data)
+        report_content, section_summaries = generate_llm_content(report_generator, pdf_service)
+
+    with stage("pdf"):
+        pdf_service.report_content = report_content
+        pdf_service.section_summaries = section_summaries
+        return pdf_service.build_pdf()
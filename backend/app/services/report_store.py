@@ -0,0 +1,81 @@
+import hashlib
+import os
+import shutil
+import uuid
+
+
+class ReportArtifact:
+    """A finished report PDF on disk, with a strong ETag over its content"""
+
+    def __init__(self, path: str, size: int, etag: str):
+        self.path = path
+        self.size = size
+        self.etag = etag
+
+
+class ReportStore:
+    """
+    Report PDFs stored one file per report ID.
+
+    Reports are built in memory and published with a single atomic rename,
+    so concurrent builds never see or overwrite each other's partial files.
+    Reports are only reachable through the in-memory jobs of the process
+    that built them, so each process writes to its own `<root>/<pid>`
+    directory and `remove_stale` clears those of earlier runs.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    @property
+    def directory(self) -> str:
+        # Resolved per call, so a process forked after import gets its own
+        return os.path.join(self.root, str(os.getpid()))
+
+    def remove_stale(self):
+        """
+        Delete the report directories of processes that are no longer running,
+        and this process's own, left by an earlier run that had the same PID.
+        Called once at application start-up, never while reports are served.
+        """
+        if not os.path.isdir(self.root):
+            return
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.isdigit() and os.path.isdir(path) and (int(name) == os.getpid() or not _running(int(name))):
+                shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def path(self, report_id: str) -> str:
+        return os.path.join(self.directory, f"{report_id}.pdf")
+
+    def save(self, report_id: str, data: bytes) -> ReportArtifact:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(report_id)
+        tmp_path = os.path.join(self.directory, f".{report_id}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        etag = '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+        return ReportArtifact(path, len(data), etag)
+
+    def delete(self, artifact: ReportArtifact):
+        """Remove a stored report; requests already streaming it keep their open file"""
+        self._remove(artifact.path)
+
+
+def _running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Running under another user
+        return True
+    return True
@@ -0,0 +1,525 @@
+import math
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.correlation_engine import PEARSON, CorrelationMatrix, correlation_matrix
+from app.services.online_stats import KPIStats
+from app.services.sensitivity_engine import SensitivityResult, analyze_sensitivity
+
+TEMPERATURE_UNIT = "K"
+HEAT_TRANSFER_UNIT = "W/m²·K"
+
+
+def variable_name(equipment: str, name: str) -> str:
+    """Build the `equipment.variable` key used across the API and reports"""
+    var_name = f"{equipment}.{name}"
+    if var_name == "Fuel.Fuel - temperature":
+        var_name = "Fuel.temperature"
+    return var_name
+
+
+def variable_unit(name: str) -> str:
+    """Display unit for a raw variable name"""
+    if 'heat_transfer_coefficient' in name:
+        return HEAT_TRANSFER_UNIT
+    return TEMPERATURE_UNIT
+
+
+# Known variable families, most specific first
+VARIABLE_FAMILIES = ["heat_transfer_coefficient", "temperature"]
+
+
+def variable_family(raw_name: str) -> str:
+    """
+    Family of a raw variable name, e.g. `cold_fluid_temperature` and
+    `Fuel - temperature` are both `temperature`. Names outside the known
+    families form a family of their own.
+    """
+    normalized = raw_name.lower().replace(" - ", "_").replace(" ", "_")
+    for family in VARIABLE_FAMILIES:
+        if family in normalized:
+            return family
+    return normalized
+
+
+def format_value(value: float, unit: str) -> str:
+    """Format a value the way the API has always shown it, e.g. `305.88K`"""
+    if unit == HEAT_TRANSFER_UNIT:
+        return f"{value} {unit}"
+    return f"{value}{unit}"
+
+
+class _Lookup:
+    """Small string table that hands out stable integer codes"""
+
+    def __init__(self, labels: Iterable[str] = ()):
+        self.labels: List[str] = []
+        self._codes: Dict[str, int] = {}
+        for label in labels:
+            self.code(label)
+
+    def code(self, label: str) -> int:
+        code = self._codes.get(label)
+        if code is None:
+            code = len(self.labels)
+            self._codes[label] = code
+            self.labels.append(label)
+        return code
+
+
+class AppendedLabels:
+    """
+    Read-only view of a base sequence of labels followed by the first rows
+    of a tail that later appends keep extending. Views taken before an
+    append keep their length, so they never see rows added after them.
+    """
+
+    def __init__(self, base: Sequence[str], tail: List[str], length: int):
+        self.base = base
+        self.tail = tail
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.length))]
+        index = int(index)
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("label index out of range")
+        split = len(self.base)
+        return self.base[index] if index < split else self.tail[index - split]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.base
+        yield from self.tail[:self.length - len(self.base)]
+
+    def tolist(self) -> List[str]:
+        return list(self)
+
+
+def labels_nbytes(labels: Sequence[str], sample: int = 256) -> int:
+    """Approximate memory held by a sequence of labels, from an evenly spaced sample"""
+    if hasattr(labels, "nbytes"):
+        return int(labels.nbytes)
+    if isinstance(labels, AppendedLabels):
+        tail = labels.tail[:labels.length - len(labels.base)]
+        return labels_nbytes(labels.base, sample) + labels_nbytes(tail, sample)
+    n = len(labels)
+    if n == 0:
+        return 0
+    step = max(1, n // sample)
+    picked = [labels[i] for i in range(0, n, step)]
+    # One list slot per label plus the string object itself
+    return int(n * (8 + sum(sys.getsizeof(label) for label in picked) / len(picked)))
+
+
+class _RowBuffer:
+    """
+    Over-allocated (rows x columns) value matrix and KPI vector that stores
+    append into. Cells past the used area are NaN, so rows and columns can
+    be added by writing only the new values.
+    """
+
+    def __init__(self, row_capacity: int, col_capacity: int):
+        self.values = np.full((row_capacity, col_capacity), np.nan)
+        self.kpi = np.full(row_capacity, np.nan)
+        self.rows = 0
+        self.cols = 0
+
+    @classmethod
+    def grown(cls, store: "ScenarioStore", rows: int, cols: int) -> "_RowBuffer":
+        """A buffer holding a copy of `store` with room for at least `rows` x `cols`, doubling capacity"""
+        n, k = store.values.shape
+        buffer = cls(max(rows, 2 * n, 1024), max(cols, k + 8))
+        buffer.values[:n, :k] = store.values
+        buffer.kpi[:n] = store.kpi
+        buffer.rows, buffer.cols = n, k
+        return buffer
+
+
+class ScenarioStore:
+    """
+    Struct-of-arrays view of `simulated_summary.simulated_data`.
+
+    `values` is a (scenarios x variables) matrix with NaN where a scenario
+    does not define a variable. Per-variable equipment, type and unit are
+    stored as integer codes into the `equipment`, `types` and `units` tables;
+    `raw_names` and `raw_units` keep each variable's name and unit exactly as
+    they appeared in the source file.
+    """
+
+    def __init__(self, scenario_ids: List[str], kpi: np.ndarray, values: np.ndarray,
+                 variables: List[str], var_equipment: np.ndarray, var_type: np.ndarray,
+                 var_unit: np.ndarray, equipment: List[str], types: List[str],
+                 units: List[str], raw_names: Optional[List[str]] = None,
+                 raw_units: Optional[List[str]] = None, kpi_name: str = ""):
+        self.scenario_ids = scenario_ids
+        self.kpi = kpi
+        self.values = values
+        self.variables = variables
+        self.var_equipment = var_equipment
+        self.var_type = var_type
+        self.var_unit = var_unit
+        self.equipment = equipment
+        self.types = types
+        self.units = units
+        self.raw_names = raw_names if raw_names is not None else list(variables)
+        self.raw_units = raw_units if raw_units is not None else [units[code] for code in var_unit]
+        self.kpi_name = kpi_name
+        self.variable_index = {name: i for i, name in enumerate(variables)}
+        self.families = [variable_family(name) for name in self.raw_names]
+        self._kpi_ranking: Optional[np.ndarray] = None
+        self._correlations: Dict[str, CorrelationMatrix] = {}
+        self._kpi_stats: Optional[KPIStats] = None
+        self._sensitivity: Dict[Tuple[int, int], SensitivityResult] = {}
+        self._base_bytes: Optional[int] = None
+        # Set on stores produced by append()
+        self._buffer: Optional[_RowBuffer] = None
+        self._parent_ranking: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_scenarios(cls, scenarios: Iterable[Dict]) -> "ScenarioStore":
+        """Build a store in a single pass over raw scenario dicts"""
+        builder = ScenarioStoreBuilder()
+        for scenario in scenarios:
+            builder.add(scenario)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.kpi)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.kpi.nbytes
+
+    def column(self, variable: str) -> np.ndarray:
+        return self.values[:, self.variable_index[variable]]
+
+    def variable_type(self, col: int) -> str:
+        return self.types[self.var_type[col]]
+
+    def variable_unit(self, col: int) -> str:
+        return self.units[self.var_unit[col]]
+
+    def variable_equipment(self, col: int) -> str:
+        return self.equipment[self.var_equipment[col]]
+
+    def iter_scenarios(self) -> Iterator[Dict]:
+        """
+        Rebuild scenarios in the `Scenario` schema, one equipment entry per
+        variable
+        """
+        catalog = [
+            (self.variable_equipment(col), self.raw_names[col],
+             self.variable_type(col), self.raw_units[col])
+            for col in range(len(self.variables))
+        ]
+        for row, scenario_id in enumerate(self.scenario_ids):
+            equipment_specification = []
+            for (equipment, name, var_type, unit), value in zip(catalog, self.values[row].tolist()):
+                if value != value:
+                    continue
+                equipment_specification.append({
+                    'equipment': equipment,
+                    'variables': [{'name': name, 'type': var_type, 'value': value, 'unit': unit}]
+                })
+            yield {
+                'scenario': scenario_id,
+                'equipment_specification': equipment_specification,
+                'kpi': self.kpi_name,
+                'kpi_value': float(self.kpi[row])
+            }
+
+    def kpi_stats(self) -> Dict:
+        """
+        Summary statistics of the KPI vector (sample std, like pandas).
+        Computed once per store; stores produced by append() update their
+        parent's statistics with the new rows only.
+        """
+        if self._kpi_stats is None:
+            self._kpi_stats = KPIStats.from_values(self.kpi)
+        return self._kpi_stats.to_dict()
+
+    def family_columns(self, families: Iterable[str]) -> List[int]:
+        wanted = set(families)
+        return [col for col, family in enumerate(self.families) if family in wanted]
+
+    @property
+    def kpi_ranking(self) -> np.ndarray:
+        """
+        Row indices ordered by KPI, best first (ties in file order). Sorted
+        once per store, i.e. once per dataset version, and read-only.
+        """
+        if self._kpi_ranking is None:
+            if self._parent_ranking is not None:
+                ranking = self._merge_ranking(self._parent_ranking)
+            else:
+                ranking = np.argsort(-self.kpi, kind='stable')
+            ranking.flags.writeable = False
+            self._kpi_ranking = ranking
+            self._parent_ranking = None
+        return self._kpi_ranking
+
+    def _merge_ranking(self, parent: np.ndarray) -> np.ndarray:
+        """Insert the rows appended after `parent` was ranked into it, without re-sorting"""
+        n = len(parent)
+        new_rows = n + np.argsort(-self.kpi[n:], kind='stable')
+        # side='right' puts new rows after existing rows with an equal KPI, i.e. in file order
+        positions = np.searchsorted(-self.kpi[parent], -self.kpi[new_rows], side='right')
+        return np.insert(parent, positions, new_rows)
+
+    def top_indices(self, n: int) -> np.ndarray:
+        """
+        Row indices of the `n` highest KPI values, best first. Uses the
+        ranking once it exists, otherwise a partial selection of `n` rows.
+        """
+        if self._kpi_ranking is not None or self._parent_ranking is not None:
+            return self.kpi_ranking[:n]
+        return self.select(descending=True, limit=n)[1]
+
+    def select(self, kpi_min: Optional[float] = None, kpi_max: Optional[float] = None,
+               descending: Optional[bool] = None, offset: int = 0,
+               limit: Optional[int] = None) -> Tuple[int, np.ndarray]:
+        """
+        Row indices of one page of scenarios, plus the number matching the
+        KPI range. Rows keep file order unless `descending` is given, in
+        which case they are sorted by KPI (ties in file order). Only the
+        first `offset + limit` rows are ever sorted.
+        """
+        rows = np.arange(len(self.kpi))
+        if kpi_min is not None or kpi_max is not None:
+            mask = np.ones(len(self.kpi), dtype=bool)
+            if kpi_min is not None:
+                mask &= self.kpi >= kpi_min
+            if kpi_max is not None:
+                mask &= self.kpi <= kpi_max
+            rows = np.flatnonzero(mask)
+        total = len(rows)
+        end = total if limit is None else min(total, offset + limit)
+        if offset >= end:
+            return total, rows[:0]
+
+        if descending and total == len(self.kpi) and self._kpi_ranking is not None:
+            rows = self._kpi_ranking[:end]
+        elif descending is not None:
+            keys = -self.kpi[rows] if descending else self.kpi[rows]
+            if end < total:
+                # Everything up to the end-th smallest key, ties included
+                kth = np.partition(keys, end - 1)[end - 1]
+                candidates = np.flatnonzero(keys <= kth)
+            else:
+                candidates = np.arange(total)
+            order = candidates[np.lexsort((candidates, keys[candidates]))]
+            rows = rows[order[:end]]
+        return total, rows[offset:end]
+
+    def estimated_bytes(self) -> int:
+        """
+        Approximate memory held by the store, its labels and its memos. Appended stores
+        count their whole over-allocated buffer; memory-mapped arrays count
+        at full size even though the OS pages them in on demand.
+        """
+        if self._base_bytes is None:
+            data = self._buffer if self._buffer is not None else self
+            self._base_bytes = data.values.nbytes + data.kpi.nbytes + labels_nbytes(self.scenario_ids)
+        total = self._base_bytes
+        if self._kpi_ranking is not None:
+            total += self._kpi_ranking.nbytes
+        for matrix in list(self._correlations.values()):
+            total += matrix.r.nbytes + matrix.n.nbytes + matrix.p_value.nbytes
+            total += matrix.ci_low.nbytes + matrix.ci_high.nbytes
+        return total
+
+    def correlations(self, method: str = PEARSON) -> CorrelationMatrix:
+        """
+        Correlations between every pair of variables and the KPI (labelled
+        `kpi_value`, the last column), computed once per store, i.e. once
+        per dataset version, for each method.
+        """
+        matrix = self._correlations.get(method)
+        if matrix is None:
+            matrix = correlation_matrix(
+                np.column_stack([self.values, self.kpi]), self.variables + ['kpi_value'], method
+            )
+            self._correlations[method] = matrix
+        return matrix
+
+    def sensitivity(self, bins: int = 0, bootstrap: int = 200, workers: int = 1) -> SensitivityResult:
+        """
+        Sensitivity of the KPI to every variable (see sensitivity_engine),
+        computed once per store and settings. Results do not depend on
+        `workers`, so it is not part of the memo key.
+        """
+        result = self._sensitivity.get((bins, bootstrap))
+        if result is None:
+            result = analyze_sensitivity(self, bins=bins, bootstrap=bootstrap, workers=workers)
+            self._sensitivity[(bins, bootstrap)] = result
+        return result
+
+    def append(self, scenarios: Iterable[Dict]) -> "ScenarioStore":
+        """
+        A new store with `scenarios` added after the existing rows; this
+        store is left unchanged.
+
+        The new store writes into an over-allocated buffer shared with this
+        one, so appending costs time proportional to the batch (plus an
+        occasional capacity doubling, amortized). The KPI statistics and
+        ranking are carried over and updated with the new rows only.
+        """
+        batch = ScenarioStore.from_scenarios(scenarios)
+        if len(batch) == 0:
+            return self
+
+        variables, raw_names, raw_units = self.variables, self.raw_names, self.raw_units
+        var_equipment, var_type, var_unit = self.var_equipment, self.var_type, self.var_unit
+        equipment, types, units = self.equipment, self.types, self.units
+        new_cols = [col for col, name in enumerate(batch.variables) if name not in self.variable_index]
+        if new_cols:
+            equipment_lookup, type_lookup, unit_lookup = _Lookup(equipment), _Lookup(types), _Lookup(units)
+            variables = variables + [batch.variables[col] for col in new_cols]
+            raw_names = raw_names + [batch.raw_names[col] for col in new_cols]
+            raw_units = raw_units + [batch.raw_units[col] for col in new_cols]
+            var_equipment = np.concatenate([var_equipment, np.asarray(
+                [equipment_lookup.code(batch.variable_equipment(col)) for col in new_cols], dtype=np.int32)])
+            var_type = np.concatenate([var_type, np.asarray(
+                [type_lookup.code(batch.variable_type(col)) for col in new_cols], dtype=np.int32)])
+            var_unit = np.concatenate([var_unit, np.asarray(
+                [unit_lookup.code(batch.variable_unit(col)) for col in new_cols], dtype=np.int32)])
+            equipment, types, units = equipment_lookup.labels, type_lookup.labels, unit_lookup.labels
+
+        n, b, k = len(self), len(batch), len(variables)
+        buffer = self._buffer
+        # Only the newest store of a buffer may write past its rows
+        if buffer is None or buffer.rows != n or buffer.cols != len(self.variables) \
+                or n + b > len(buffer.kpi) or k > buffer.values.shape[1]:
+            buffer = _RowBuffer.grown(self, n + b, k)
+        index = {name: col for col, name in enumerate(variables)}
+        buffer.values[n:n + b, [index[name] for name in batch.variables]] = batch.values
+        buffer.kpi[n:n + b] = batch.kpi
+        buffer.rows, buffer.cols = n + b, k
+
+        ids = self.scenario_ids
+        if isinstance(ids, AppendedLabels) and len(ids.base) + len(ids.tail) == n:
+            ids.tail.extend(batch.scenario_ids)
+            ids = AppendedLabels(ids.base, ids.tail, n + b)
+        else:
+            ids = AppendedLabels(ids, list(batch.scenario_ids), n + b)
+
+        store = ScenarioStore(
+            scenario_ids=ids,
+            kpi=buffer.kpi[:n + b],
+            values=buffer.values[:n + b, :k],
+            variables=variables,
+            var_equipment=var_equipment,
+            var_type=var_type,
+            var_unit=var_unit,
+            equipment=equipment,
+            types=types,
+            units=units,
+            raw_names=raw_names,
+            raw_units=raw_units,
+            kpi_name=self.kpi_name or batch.kpi_name
+        )
+        store._buffer = buffer
+        if self._kpi_stats is not None:
+            store._kpi_stats = self._kpi_stats.copy()
+            store._kpi_stats.update(batch.kpi)
+        store._parent_ranking = self._kpi_ranking if self._kpi_ranking is not None else self._parent_ranking
+        return store
+
+
+class ScenarioStoreBuilder:
+    """
+    Accumulates scenarios one at a time into typed column buffers.
+
+    Memory grows with the number of values, not with the size of the raw
+    JSON objects, so it can be fed from a streaming parser.
+    """
+
+    def __init__(self):
+        self._ids: List[str] = []
+        self._kpi = array('d')
+        self._columns: List[array] = []
+        self._variables: List[str] = []
+        self._raw_names: List[str] = []
+        self._raw_units: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._var_equipment = array('i')
+        self._var_type = array('i')
+        self._var_unit = array('i')
+        self._equipment = _Lookup()
+        self._types = _Lookup()
+        self._units = _Lookup()
+        self._kpi_name: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _add_variable(self, name: str, raw_name: str, equipment: str, var_type: str,
+                      raw_unit: str, n_rows: int) -> int:
+        col = len(self._variables)
+        self._variables.append(name)
+        self._raw_names.append(raw_name)
+        self._raw_units.append(raw_unit)
+        self._index[name] = col
+        self._columns.append(array('d', [math.nan]) * n_rows)
+        self._var_equipment.append(self._equipment.code(equipment))
+        self._var_type.append(self._types.code(var_type))
+        self._var_unit.append(self._units.code(variable_unit(raw_name)))
+        return col
+
+    def add(self, scenario: Dict):
+        """Append one scenario in the `Scenario` schema"""
+        row = len(self._ids)
+        self._ids.append(scenario['scenario'])
+        self._kpi.append(scenario['kpi_value'])
+        if self._kpi_name is None:
+            self._kpi_name = scenario.get('kpi', '')
+
+        for equipment_spec in scenario['equipment_specification']:
+            equipment = equipment_spec['equipment']
+
+            for variable in equipment_spec['variables']:
+                name = variable_name(equipment, variable['name'])
+                col = self._index.get(name)
+                if col is None:
+                    col = self._add_variable(
+                        name, variable['name'], equipment, variable['type'],
+                        variable.get('unit', ''), row
+                    )
+                column = self._columns[col]
+                # The first value wins if a scenario repeats a variable
+                if len(column) == row:
+                    column.append(variable['value'])
+
+        for column in self._columns:
+            if len(column) == row:
+                column.append(math.nan)
+
+    def build(self) -> ScenarioStore:
+        n_rows = len(self._ids)
+        values = np.empty((n_rows, len(self._columns)), dtype=np.float64)
+        for col, column in enumerate(self._columns):
+            values[:, col] = np.frombuffer(column, dtype=np.float64)
+        return ScenarioStore(
+            scenario_ids=self._ids,
+            kpi=np.frombuffer(self._kpi, dtype=np.float64).copy(),
+            values=values,
+            variables=list(self._variables),
+            var_equipment=np.frombuffer(self._var_equipment, dtype=np.int32).copy(),
+            var_type=np.frombuffer(self._var_type, dtype=np.int32).copy(),
+            var_unit=np.frombuffer(self._var_unit, dtype=np.int32).copy(),
+            equipment=list(self._equipment.labels),
+            types=list(self._types.labels),
+            units=list(self._units.labels),
+            raw_names=list(self._raw_names),
+            raw_units=list(self._raw_units),
+            kpi_name=self._kpi_name or ""
+        )
@@ -0,0 +1,276 @@
+"""
+Variance-based sensitivity of the KPI to each simulated variable.
+
+Two estimates are computed from the scenario store in a few vectorized
+passes:
+
+- standardized regression coefficients (SRC) of a linear fit of the KPI on
+  all variables, over the scenarios that define every variable;
+- first-order Sobol indices S_i = Var(E[KPI | X_i]) / Var(KPI), estimated
+  by binning X_i (by value when it takes few distinct values, by quantile
+  otherwise) with the usual between/within bin-variance bias correction.
+
+Weightages are the Sobol indices normalized to 100. Confidence intervals
+come from a Poisson bootstrap: each replicate reweights the rows instead of
+resampling them, so bins are assigned once and every replicate is a handful
+of weighted bincounts and one (k x k) solve. With more than one worker the
+replicates run in worker processes, since the per-column bincount loop holds
+the GIL; the binned inputs are pickled once per worker on start-up.
+"""
+
+import math
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.worker_processes import worker_context
+
+MAX_BINS = 100
+SETPOINT_TYPE = "Setpoint"
+
+
+def auto_bins(n: int) -> int:
+    """About sqrt(n) bins, between 2 and MAX_BINS"""
+    return int(min(MAX_BINS, max(2, math.isqrt(max(n, 0)))))
+
+
+def bin_indices(values: np.ndarray, bins: int) -> np.ndarray:
+    """
+    (columns x rows) bin of every value; columns with at most `bins`
+    distinct values get one bin per value. Missing values get bin `bins`.
+    """
+    n, k = values.shape
+    dtype = np.int16 if bins < np.iinfo(np.int16).max else np.int32
+    result = np.full((k, n), bins, dtype=dtype)
+    for col in range(k):
+        column = values[:, col]
+        present = ~np.isnan(column)
+        if not present.any():
+            continue
+        observed = column[present]
+        distinct, inverse = np.unique(observed, return_inverse=True)
+        if len(distinct) <= bins:
+            result[col, present] = inverse
+            continue
+        edges = np.quantile(observed, np.linspace(0.0, 1.0, bins + 1)[1:-1])
+        result[col, present] = np.searchsorted(edges, observed, side='right')
+    return result
+
+
+def _first_order(bins: np.ndarray, y: np.ndarray, weights: np.ndarray, n_bins: int) -> np.ndarray:
+    """Bias-corrected first-order index of every column of `bins` under row `weights`"""
+    k = bins.shape[0]
+    indices = np.full(k, np.nan)
+    wy = weights * y
+    wyy = wy * y
+    for col in range(k):
+        column = bins[col]
+        counts = np.bincount(column, weights=weights, minlength=n_bins + 1)[:n_bins]
+        sums = np.bincount(column, weights=wy, minlength=n_bins + 1)[:n_bins]
+        squares = np.bincount(column, weights=wyy, minlength=n_bins + 1)[:n_bins]
+        occupied = counts > 0
+        n_eff = counts.sum()
+        groups = int(occupied.sum())
+        if groups < 2 or n_eff <= groups:
+            continue
+        mean_term = sums.sum() ** 2 / n_eff
+        total = squares.sum() - mean_term
+        if total <= 0:
+            continue
+        between = (sums[occupied] ** 2 / counts[occupied]).sum() - mean_term
+        within_mean_square = (total - between) / (n_eff - groups)
+        indices[col] = max(0.0, (between - (groups - 1) * within_mean_square) / total)
+    return indices
+
+
+def _src(z: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Standardized regression coefficients and R² of a weighted linear fit of
+    the last column of `z` on the others; `z` should be roughly centred
+    """
+    k = z.shape[1] - 1
+    total = weights.sum()
+    if k == 0 or total <= k + 1:
+        return np.full(k, np.nan), float('nan')
+    mean = (weights @ z) / total
+    cov = z.T @ (z * weights[:, None]) / total - np.outer(mean, mean)
+    cxx, cxy, cyy = cov[:k, :k], cov[:k, k], cov[k, k]
+    if cyy <= 0:
+        return np.full(k, np.nan), float('nan')
+    beta = np.linalg.lstsq(cxx, cxy, rcond=None)[0]
+    scale = np.sqrt(np.clip(np.diag(cxx), 0.0, None))
+    return beta * scale / math.sqrt(cyy), float(cxy @ beta / cyy)
+
+
+def _weightages(indices: np.ndarray) -> np.ndarray:
+    clean = np.nan_to_num(indices, nan=0.0)
+    total = clean.sum()
+    return clean / total * 100.0 if total > 0 else np.zeros_like(clean)
+
+
+# Set in each bootstrap worker process by _init_bootstrap_worker
+_worker_inputs: Optional[Tuple] = None
+
+
+def _init_bootstrap_worker(*inputs):
+    global _worker_inputs
+    _worker_inputs = inputs
+
+
+def _replicate_chunk(seed_sequence: np.random.SeedSequence, count: int,
+                     inputs: Optional[Tuple] = None) -> np.ndarray:
+    """`count` bootstrap replicates, each a (3 x k) stack of Sobol indices, weightages and SRC"""
+    binned, y, z, complete, n_bins = inputs or _worker_inputs
+    rng = np.random.default_rng(seed_sequence)
+    out = []
+    for _ in range(count):
+        weights = rng.poisson(1.0, len(y)).astype(np.float64)
+        replicate_sobol = _first_order(binned, y, weights, n_bins)
+        replicate_src = _src(z, weights[complete])[0]
+        out.append(np.stack([replicate_sobol, _weightages(replicate_sobol), replicate_src]))
+    return np.stack(out)
+
+
+class SensitivityResult:
+    """Per-variable SRC, first-order index and weightage, with bootstrap intervals"""
+
+    def __init__(self, variables: List[Dict], src: np.ndarray, sobol: np.ndarray,
+                 r_squared: float, intervals: Dict[str, np.ndarray], rows: int,
+                 complete_rows: int, bins: int, bootstrap: int, confidence: float):
+        self.variables = variables
+        self.src = src
+        self.sobol = sobol
+        self.weightage = _weightages(sobol)
+        self.r_squared = r_squared
+        self.intervals = intervals
+        self.rows = rows
+        self.complete_rows = complete_rows
+        self.bins = bins
+        self.bootstrap = bootstrap
+        self.confidence = confidence
+
+    def _interval(self, name: str, col: int) -> Optional[List[Optional[float]]]:
+        bounds = self.intervals.get(name)
+        if bounds is None:
+            return None
+        return [_clean(bounds[0, col]), _clean(bounds[1, col])]
+
+    def rows_by_weightage(self) -> List[Dict]:
+        rows = []
+        for col, meta in enumerate(self.variables):
+            rows.append({
+                **meta,
+                "weightage": _clean(self.weightage[col]),
+                "weightage_ci": self._interval("weightage", col),
+                "sobol_first_order": _clean(self.sobol[col]),
+                "sobol_ci": self._interval("sobol", col),
+                "src": _clean(self.src[col]),
+                "src_ci": self._interval("src", col)
+            })
+        return sorted(rows, key=lambda row: row["weightage"] or 0.0, reverse=True)
+
+    def top_impact(self) -> Dict[str, float]:
+        """Setpoint weightages keyed like the file's `top_impact`, with the rest as `Others`"""
+        impact = {}
+        others = 0.0
+        for meta, weightage in zip(self.variables, self.weightage.tolist()):
+            if meta["type"] == SETPOINT_TYPE:
+                impact[meta["variable"]] = round(weightage, 3)
+            else:
+                others += weightage
+        impact["Others"] = round(others, 3)
+        return impact
+
+    def setpoint_impact_summary(self) -> List[Dict]:
+        """Setpoint weightages in the file's `setpoint_impact_summary` shape, highest first"""
+        return [
+            {"equipment": row["equipment"], "setpoint": row["name"],
+             "weightage": round(row["weightage"], 3), "unit": row["unit"]}
+            for row in self.rows_by_weightage() if row["type"] == SETPOINT_TYPE
+        ]
+
+    def to_dict(self) -> Dict:
+        return {
+            "rows": self.rows,
+            "complete_rows": self.complete_rows,
+            "bins": self.bins,
+            "bootstrap": self.bootstrap,
+            "confidence": self.confidence,
+            "r_squared": _clean(self.r_squared),
+            "variables": self.rows_by_weightage(),
+            "top_impact": self.top_impact(),
+            "setpoint_impact_summary": self.setpoint_impact_summary()
+        }
+
+
+def _clean(value: float) -> Optional[float]:
+    value = float(value)
+    return None if value != value else value
+
+
+def analyze_sensitivity(store, bins: int = 0, bootstrap: int = 200, confidence: float = 0.95,
+                        workers: int = 1, seed: int = 0) -> SensitivityResult:
+    """
+    Sensitivity of `store.kpi` to every column of `store.values`. `bins`
+    of 0 picks about sqrt(rows); `bootstrap` of 0 skips the intervals.
+    Results are reproducible for a given `seed` and number of replicates,
+    whatever the number of `workers`.
+    """
+    values = np.asarray(store.values, dtype=np.float64)
+    y = np.asarray(store.kpi, dtype=np.float64)
+    n, k = values.shape
+    y = y - y.mean() if n else y
+    n_bins = bins or auto_bins(n)
+    binned = bin_indices(values, n_bins)
+    complete = ~np.isnan(values).any(axis=1)
+    z = np.column_stack([values[complete], y[complete]])
+    if len(z):
+        z -= z.mean(axis=0)
+
+    variables = []
+    for col in range(k):
+        variable, equipment = store.variables[col], store.variable_equipment(col)
+        prefix = f"{equipment}."
+        variables.append({
+            "variable": variable,
+            "equipment": equipment,
+            # Setpoint names as the results file spells them, e.g. "temperature"
+            "name": variable[len(prefix):] if variable.startswith(prefix) else store.raw_names[col],
+            "type": store.variable_type(col),
+            "unit": store.raw_units[col]
+        })
+    ones = np.ones(n)
+    sobol = _first_order(binned, y, ones, n_bins)
+    src, r_squared = _src(z, ones[complete])
+
+    intervals: Dict[str, np.ndarray] = {}
+    if bootstrap > 0 and n > 1 and k > 0:
+        # Fixed chunking keeps the random streams independent of the worker count
+        chunk_size = max(1, math.ceil(bootstrap / 16))
+        counts = [min(chunk_size, bootstrap - start) for start in range(0, bootstrap, chunk_size)]
+        seeds = np.random.SeedSequence(seed).spawn(len(counts))
+        inputs = (binned, y, z, complete, n_bins)
+        if workers > 1:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(counts)),
+                mp_context=worker_context(),
+                initializer=_init_bootstrap_worker,
+                initargs=inputs
+            ) as pool:
+                chunks = list(pool.map(_replicate_chunk, seeds, counts))
+        else:
+            chunks = [_replicate_chunk(chunk_seed, count, inputs) for chunk_seed, count in zip(seeds, counts)]
+        replicates = np.concatenate(chunks)
+        alpha = (1.0 - confidence) / 2.0
+        with warnings.catch_warnings():
+            # Variables without an estimate in any replicate stay NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            bounds = np.nanquantile(replicates, [alpha, 1.0 - alpha], axis=0)
+        intervals = {"sobol": bounds[:, 0], "weightage": bounds[:, 1], "src": bounds[:, 2]}
+
+    return SensitivityResult(
+        variables, src, sobol, r_squared, intervals, rows=n, complete_rows=int(complete.sum()),
+        bins=n_bins, bootstrap=bootstrap, confidence=confidence
+    )
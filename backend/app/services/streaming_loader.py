@@ -0,0 +1,178 @@
+import json
+import re
+from typing import Any, Callable, Dict, IO, Iterator, Optional, Tuple
+
+from app.services.scenario_store import ScenarioStore, ScenarioStoreBuilder
+
+SCENARIO_PATH = ('data', 'simulated_summary', 'simulated_data')
+CHUNK_SIZE = 1 << 20
+# Largest single JSON value (e.g. one scenario) held in the buffer at once
+MAX_VALUE_SIZE = 64 << 20
+# Longest token that can still be valid when cut at the buffer edge ("-Infinity")
+_TOKEN_TAIL = 9
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class _JsonStreamReader:
+    """
+    Pull parser over a text stream.
+
+    Containers on the path to the scenario list are walked token by token;
+    every other value is decoded in one go with the C scanner behind
+    `json.JSONDecoder.raw_decode`, so only one value at a time is held as
+    Python objects.
+    """
+
+    def __init__(self, fp: IO[str], chunk_size: int = CHUNK_SIZE,
+                 max_value_size: int = MAX_VALUE_SIZE):
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._max_value_size = max_value_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.consumed = 0
+
+    def _fill(self) -> bool:
+        """Read more input, dropping what has already been parsed"""
+        if self._eof:
+            return False
+        # Grow reads with the pending buffer so a large value is decoded in
+        # amortized linear time rather than being retried chunk by chunk
+        pending = len(self._buf) - self._pos
+        chunk = self._fp.read(max(self._chunk_size, min(pending, self._max_value_size - pending)))
+        if not chunk:
+            self._eof = True
+            return False
+        self.consumed += self._pos
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _skip_whitespace(self):
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf) or not self._fill():
+                return
+
+    def _error(self, message: str, pos: Optional[int] = None) -> ValueError:
+        pos = self._pos if pos is None else pos
+        return ValueError(f"{message} at offset {self.consumed + pos}")
+
+    def _fill_value(self) -> bool:
+        """Read more input for the value starting at the current position"""
+        if len(self._buf) - self._pos >= self._max_value_size:
+            raise self._error(f"JSON value larger than {self._max_value_size} characters")
+        return self._fill()
+
+    def peek(self) -> str:
+        self._skip_whitespace()
+        if self._pos >= len(self._buf):
+            raise self._error("Unexpected end of JSON input")
+        return self._buf[self._pos]
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise self._error(f"Expected '{char}'")
+        self._pos += 1
+
+    def expect_end(self):
+        self._skip_whitespace()
+        if self._pos < len(self._buf):
+            raise self._error("Extra data after JSON document")
+
+    def value(self) -> Any:
+        """Decode one complete JSON value"""
+        self._skip_whitespace()
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as e:
+                # Only an error at the buffer edge can be fixed by more input:
+                # a string still open there or a token cut short. Anything
+                # earlier is malformed however much more is read.
+                truncated = (e.msg.startswith("Unterminated string")
+                             or e.pos >= len(self._buf) - _TOKEN_TAIL)
+                if truncated and self._fill_value():
+                    continue
+                # "Unterminated string starting at" already ends in "at"
+                raise self._error(e.msg.removesuffix(" at"), e.pos) from e
+            # A number near the buffer edge may be cut short ("1." of "1.5")
+            if (isinstance(obj, (int, float)) and end > len(self._buf) - _TOKEN_TAIL
+                    and self._fill_value()):
+                continue
+            self._pos = end
+            return obj
+
+    def iter_object(self) -> Iterator[str]:
+        """Yield each key of an object; the caller must consume its value"""
+        self.expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise self._error("Expected object key")
+            self.expect(':')
+            yield key
+            separator = self.peek()
+            self._pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise self._error("Expected ',' or '}'")
+
+    def iter_array(self) -> Iterator[None]:
+        """Yield once per array element; the caller must consume the element"""
+        self.expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield None
+            separator = self.peek()
+            self._pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise self._error("Expected ',' or ']'")
+
+
+def _read_value(reader: _JsonStreamReader, path: Tuple[str, ...],
+                on_scenario: Callable[[Dict], None]) -> Any:
+    if path == SCENARIO_PATH and reader.peek() == '[':
+        for _ in reader.iter_array():
+            on_scenario(reader.value())
+        return []
+    if path == SCENARIO_PATH[:len(path)] and reader.peek() == '{':
+        obj = {}
+        for key in reader.iter_object():
+            obj[key] = _read_value(reader, path + (key,), on_scenario)
+        return obj
+    return reader.value()
+
+
+def stream_scenarios(fp: IO[str], on_scenario: Callable[[Dict], None],
+                     chunk_size: int = CHUNK_SIZE, max_value_size: int = MAX_VALUE_SIZE) -> Dict:
+    """
+    Parse a results document, handing each entry of
+    `data.simulated_summary.simulated_data` to `on_scenario` as soon as it is
+    read. Returns the rest of the document with that list left empty.
+    Raises ValueError, with the offset into the stream, for malformed input
+    or a single value longer than `max_value_size` characters.
+    """
+    reader = _JsonStreamReader(fp, chunk_size, max_value_size)
+    document = _read_value(reader, (), on_scenario)
+    reader.expect_end()
+    return document
+
+
+def load_streaming(path: str) -> Tuple[Dict, ScenarioStore]:
+    """Load a results file into its header fields and a columnar scenario store"""
+    builder = ScenarioStoreBuilder()
+    with open(path, "r", encoding="utf-8") as f:
+        header = stream_scenarios(f, builder.add)
+    return header, builder.build()
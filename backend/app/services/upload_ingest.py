@@ -0,0 +1,247 @@
+"""
+Streaming ingestion of uploaded results files.
+
+The request body is read chunk by chunk on the event loop. Multipart framing
+is stripped by python-multipart's push parser, and the file's bytes go
+through a bounded queue to a worker thread. That thread runs the incremental
+JSON parser from streaming_loader, validates each scenario as it is read and
+adds it straight to a ScenarioStoreBuilder. At most QUEUE_CHUNKS chunks are
+in flight, so memory follows the columnar store being built (8 bytes per
+value) rather than the size of the upload. The store is then written as a
+`.pfsc` file, which the dataset registry serves memory-mapped.
+"""
+
+import asyncio
+import codecs
+import queue
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from app.core.metrics import DATASET_LOAD_SECONDS
+from app.models.schemas import ProcessResponse, Scenario
+from app.services.binary_store import write_binary
+from app.services.scenario_store import ScenarioStore, ScenarioStoreBuilder
+from app.services.streaming_loader import stream_scenarios
+
+QUEUE_CHUNKS = 16
+# How often blocked producers and consumers check whether the other side gave up
+POLL_SECONDS = 0.5
+UPLOAD_FIELD = "file"
+
+
+class UploadTooLargeError(ValueError):
+    """The upload is larger than the configured limit"""
+
+
+class _ChunkPipe:
+    """
+    Bytes handed from the event loop to the parser thread, read back as
+    text by `stream_scenarios`. The queue is bounded, so a slow parser
+    slows down reading the request instead of buffering it.
+    """
+
+    def __init__(self, max_chunks: int = QUEUE_CHUNKS):
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=max_chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._eof = False
+        self.aborted = threading.Event()
+
+    async def put(self, chunk: Optional[bytes], worker: "asyncio.Future"):
+        """Queue a chunk (None ends the stream), waiting off the event loop while the queue is full"""
+        loop = asyncio.get_running_loop()
+        while not worker.done():
+            try:
+                self._queue.put_nowait(chunk)
+                return
+            except queue.Full:
+                pass
+            try:
+                await loop.run_in_executor(None, lambda: self._queue.put(chunk, timeout=POLL_SECONDS))
+                return
+            except queue.Full:
+                continue
+
+    def read(self, size: int = -1) -> str:
+        """At least `size` characters unless the stream ends first; "" at the end"""
+        parts: List[str] = []
+        length = 0
+        while not self._eof and (length == 0 or length < size):
+            try:
+                chunk = self._queue.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                if self.aborted.is_set():
+                    raise ValueError("Upload aborted")
+                continue
+            if chunk is None:
+                self._eof = True
+                text = self._decoder.decode(b"", final=True)
+            else:
+                text = self._decoder.decode(chunk)
+            parts.append(text)
+            length += len(text)
+        return "".join(parts)
+
+
+class _MultipartFile:
+    """Pulls the bytes of one file field out of a multipart body as it arrives"""
+
+    def __init__(self, boundary: bytes, field: str = UPLOAD_FIELD):
+        self.field = field.encode("latin-1")
+        self.found = False
+        self._in_file = False
+        self._done = False
+        self._header_field = b""
+        self._header_value = b""
+        self._disposition: Dict[bytes, bytes] = {}
+        self._data: List[bytes] = []
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+
+    def _on_part_begin(self):
+        self._disposition = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header_field.lower() == b"content-disposition":
+            self._disposition = parse_options_header(self._header_value)[1]
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        # The first part that is the named field or carries a file name
+        name = self._disposition.get(b"name")
+        self._in_file = not self._done and (name == self.field or b"filename" in self._disposition)
+        if self._in_file:
+            self.found = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self._data.append(data[start:end])
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._done = True
+        self._in_file = False
+
+    def write(self, chunk: bytes) -> List[bytes]:
+        """Parse a chunk of the body and return the file bytes it contained"""
+        self._parser.write(chunk)
+        data, self._data = self._data, []
+        return data
+
+    def finalize(self):
+        self._parser.finalize()
+
+
+def _build_store(fp: _ChunkPipe) -> Tuple[Dict, ScenarioStore]:
+    """Parse, validate and store a results document read from `fp`"""
+    builder = ScenarioStoreBuilder()
+
+    def on_scenario(obj: Dict):
+        try:
+            scenario = Scenario.model_validate(obj)
+        except ValidationError as e:
+            raise ValueError(f"Invalid scenario at index {len(builder)}: {e}") from e
+        builder.add(scenario.model_dump())
+
+    header = stream_scenarios(fp, on_scenario)
+    try:
+        ProcessResponse(**header)
+    except (TypeError, ValidationError) as e:
+        raise ValueError(f"Invalid results document: {e}") from e
+    if len(builder) == 0:
+        raise ValueError("The upload contains no scenarios")
+    return header, builder.build()
+
+
+def _ingest(fp: _ChunkPipe, path: str, exclusive: bool) -> Dict:
+    start = time.perf_counter()
+    header, store = _build_store(fp)
+    parsed = time.perf_counter()
+    write_binary(header, store, path, exclusive=exclusive)
+    return {
+        "scenarios": len(store),
+        "variables": len(store.variables),
+        "parse_seconds": parsed - start,
+        "write_seconds": time.perf_counter() - parsed
+    }
+
+
+async def ingest_upload(body: AsyncIterator[bytes], content_type: str, path: str,
+                        max_bytes: int = 0, exclusive: bool = False) -> Dict:
+    """
+    Stream a results file from a request body into a `.pfsc` file at `path`.
+
+    `content_type` is either multipart/form-data (the file in the `file`
+    field, or the first file part) or application/json (the raw document).
+    Raises ValueError for malformed or invalid uploads,
+    UploadTooLargeError above `max_bytes` (0 means no limit) and, with
+    `exclusive`, FileExistsError if `path` was created in the meantime.
+    """
+    media_type, options = parse_options_header(content_type or "")
+    if media_type == b"multipart/form-data":
+        boundary = options.get(b"boundary")
+        if not boundary:
+            raise ValueError("Missing multipart boundary")
+        multipart: Optional[_MultipartFile] = _MultipartFile(boundary)
+    elif media_type == b"application/json":
+        multipart = None
+    else:
+        raise ValueError("Upload as multipart/form-data or application/json")
+
+    loop = asyncio.get_running_loop()
+    pipe = _ChunkPipe()
+    start = time.perf_counter()
+    received = 0
+    file_bytes = 0
+    with DATASET_LOAD_SECONDS.timer(format="upload"):
+        worker = loop.run_in_executor(None, _ingest, pipe, path, exclusive)
+        try:
+            async for chunk in body:
+                received += len(chunk)
+                if max_bytes and received > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds the {max_bytes} byte limit")
+                parts = multipart.write(chunk) if multipart is not None else [chunk]
+                for part in parts:
+                    file_bytes += len(part)
+                    await pipe.put(part, worker)
+                if worker.done():
+                    # The parser stopped early, e.g. on an invalid scenario
+                    break
+            if multipart is not None and not worker.done():
+                multipart.finalize()
+                if not multipart.found:
+                    raise ValueError(f"No file in the multipart body (expected field '{UPLOAD_FIELD}')")
+            await pipe.put(None, worker)
+        except BaseException:
+            pipe.aborted.set()
+            # Let the parser thread see the abort before reporting our own error
+            await asyncio.gather(worker, return_exceptions=True)
+            raise
+        result = await worker
+
+    seconds = time.perf_counter() - start
+    return {
+        **result,
+        "bytes_received": received,
+        "file_bytes": file_bytes,
+        "seconds": seconds,
+        "mb_per_second": file_bytes / 1e6 / seconds if seconds else None,
+        "scenarios_per_second": result["scenarios"] / seconds if seconds else None
+    }
@@ -0,0 +1,71 @@
+"""
+Worker process start-up shared by the chart renderer and the sensitivity bootstrap.
+
+The forkserver is one server per interpreter, and its preload list only takes
+effect before it starts, so it is configured once here with every module a
+worker needs instead of by each caller.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+# Imported by the forkserver before it forks any worker
+WORKER_PRELOAD = [
+    "app.services.chart_generator",
+    "app.services.sensitivity_engine",
+]
+
+_context = None
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_lock = threading.Lock()
+
+
+def worker_context():
+    """Fork workers from a clean server process that has already imported the worker modules"""
+    global _context
+    with _lock:
+        if _context is None:
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                _context = multiprocessing.get_context('forkserver')
+                _context.set_forkserver_preload(WORKER_PRELOAD)
+            else:
+                _context = multiprocessing.get_context('spawn')
+        return _context
+
+
+def shared_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    The long-lived worker pool, created on first use. Asking for a different
+    size replaces it; tasks already submitted to the old pool still finish.
+    """
+    global _pool, _pool_workers
+    context = worker_context()
+    with _lock:
+        if _pool is None or _pool_workers != max_workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+            _pool_workers = max_workers
+        return _pool
+
+
+def discard_pool(pool: ProcessPoolExecutor):
+    """Forget a pool whose worker died so the next caller starts a fresh one"""
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pool():
+    """Stop the shared pool's workers; called when the application shuts down"""
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
@@ -0,0 +1,3 @@
+"""
+Benchmarks and synthetic dataset tooling
+"""
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""
+Raster (PNG) vs. vector (SVG) chart output: render time, PDF build time and
+final PDF size, on the sample dataset and on a synthetic one.
+
+    python -m benchmarks.bench_chart_formats --scenarios 50000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-placeholder")
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from app.core.config import DATA_DIR
+from app.services.chart_generator import ChartGenerator
+from app.services.data_processor import DataProcessor
+from app.services.pdf_service import PDFService
+from benchmarks.synthetic import generate_dataset
+
+REPORT_CONTENT = {
+    "executive_summary": "Benchmark executive summary.",
+    "technical_summary": "Benchmark technical summary.",
+    "variable_analysis": "Benchmark variable analysis.",
+    "recommendations": ["First recommendation", "Second recommendation"],
+    "conclusion": "Benchmark conclusion."
+}
+
+
+def _run(processed_data, chart_format: str, dpi: int, directory: str) -> dict:
+    start = time.perf_counter()
+    chart_paths = ChartGenerator(
+        processed_data, dpi=dpi, chart_format=chart_format, use_cache=False
+    ).save_charts_to_files(directory, parallel=False)
+    render_seconds = time.perf_counter() - start
+
+    pdf_service = PDFService(REPORT_CONTENT, chart_paths, processed_data)
+    pdf_service.llm = FakeListChatModel(responses=["Benchmark insight."])
+    pdf_path = os.path.join(directory, "report.pdf")
+    start = time.perf_counter()
+    pdf_service.generate_pdf(output_path=pdf_path)
+    pdf_seconds = time.perf_counter() - start
+
+    return {
+        "format": chart_format,
+        "dpi": dpi,
+        "render_seconds": round(render_seconds, 2),
+        "pdf_seconds": round(pdf_seconds, 2),
+        "chart_kb": round(sum(os.path.getsize(p) for p in chart_paths.values()) / 1024),
+        "pdf_kb": round(os.path.getsize(pdf_path) / 1024),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chart output formats")
+    parser.add_argument("--scenarios", type=int, default=50000)
+    parser.add_argument("--dpi", type=int, nargs="+", default=[300, 150])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        synthetic_path = os.path.join(tmp, "synthetic.json")
+        generate_dataset(synthetic_path, args.scenarios)
+        datasets = [
+            ("sample", os.path.join(DATA_DIR, "mock_results.json")),
+            (f"synthetic-{args.scenarios}", synthetic_path),
+        ]
+        for label, path in datasets:
+            with open(path, "r") as f:
+                processed_data = DataProcessor(json.load(f)).process_all()
+            # In SVG output dpi only applies to rasterized dense scatter layers
+            for chart_format, dpi in [(f, dpi) for f in ("png", "svg") for dpi in args.dpi]:
+                directory = os.path.join(tmp, f"{label}-{chart_format}-{dpi}")
+                os.makedirs(directory)
+                print(json.dumps({"dataset": label, **_run(processed_data, chart_format, dpi, directory)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Sequential vs. process-parallel chart rendering.
+
+    python -m benchmarks.bench_charts --scenarios 100000 --workers 2 5
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from app.services.chart_generator import ChartGenerator
+from app.services.data_processor import DataProcessor
+from benchmarks.synthetic import generate_dataset
+
+
+def _time_charts(processed_data, directory: str, parallel: bool, workers: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ChartGenerator(processed_data).save_charts_to_files(directory, parallel=parallel, max_workers=workers)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chart rendering modes")
+    parser.add_argument("--scenarios", type=int, default=20000)
+    parser.add_argument("--equipment", type=int, default=3)
+    parser.add_argument("--variables", type=int, default=2)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 5])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.json")
+        generate_dataset(path, args.scenarios, args.equipment, args.variables)
+        with open(path, "r") as f:
+            processed_data = DataProcessor(json.load(f)).process_all()
+
+        sequential = _time_charts(processed_data, os.path.join(tmp, "seq"), False, 1, args.repeat)
+        print(json.dumps({"mode": "sequential", "cpus": os.cpu_count(), "seconds": round(sequential, 2)}))
+        for workers in args.workers:
+            seconds = _time_charts(processed_data, os.path.join(tmp, f"par{workers}"), True, workers, args.repeat)
+            print(json.dumps({
+                "mode": "parallel",
+                "workers": workers,
+                "seconds": round(seconds, 2),
+                "speedup": round(sequential / seconds, 2)
+            }))
+
+
+if __name__ == "__main__":
+    main()
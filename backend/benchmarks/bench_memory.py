@@ -0,0 +1,40 @@
+"""
+Memory held by the processed scenario frames, in bytes per scenario, with
+the standard layout and with SCENARIO_MEMORY_LEAN (optionally plus
+SCENARIO_FLOAT32).
+
+    python -m benchmarks.bench_memory --scenarios 200000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks.synthetic import generate_dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", type=int, default=100000)
+    parser.add_argument("--equipment", type=int, default=4)
+    parser.add_argument("--variables", type=int, default=3)
+    parser.add_argument("--path", help="use an existing results file (.json or .pfsc)")
+    args = parser.parse_args()
+
+    from app.services.binary_store import BINARY_EXTENSION, load_binary
+    from app.services.data_processor import scenario_memory_report
+    from app.services.streaming_loader import load_streaming
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.path
+        if path is None:
+            path = os.path.join(tmp, "bench_memory.json")
+            generate_dataset(path, args.scenarios, args.equipment, args.variables)
+        loader = load_binary if path.endswith(BINARY_EXTENSION) else load_streaming
+        header, store = loader(path)
+        print(json.dumps(scenario_memory_report(store, header), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Requests per second of the data endpoints: the previous response path
+(model returned to FastAPI, re-encoded by its standard JSON encoder on
+every request) vs. the pre-encoded orjson bodies cached per dataset
+version, plain, gzip and ETag-revalidated.
+
+    python -m benchmarks.bench_serialization --scenarios 20000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_dataset
+
+
+def _requests_per_second(client, url: str, headers: dict, seconds: float) -> float:
+    client.get(url, headers=headers)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        client.get(url, headers=headers)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark data endpoint serialization")
+    parser.add_argument("--scenarios", type=int, default=20000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.json")
+        generate_dataset(path, args.scenarios)
+        # Settings are read on import, so point the app at the dataset first
+        os.environ["DATA_FILE"] = path
+        os.environ["OUTPUT_DIR"] = os.path.join(tmp, "output")
+
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from app.services.process_data import get_data, get_scenarios
+        from main import app
+
+        legacy = FastAPI()
+        legacy.get("/api/process-data")(lambda: get_data())
+        legacy.get("/api/scenarios")(lambda: get_scenarios()[0])
+
+        fast_client = TestClient(app)
+        legacy_client = TestClient(legacy)
+        for endpoint in ("process-data", "scenarios"):
+            url = f"/api/{endpoint}"
+            etag = fast_client.get(url).headers["etag"]
+            size = len(fast_client.get(url, headers={"Accept-Encoding": "identity"}).content)
+            runs = [
+                ("previous", legacy_client, {"Accept-Encoding": "identity"}),
+                ("orjson", fast_client, {"Accept-Encoding": "identity"}),
+                ("orjson+gzip", fast_client, {"Accept-Encoding": "gzip"}),
+                ("if-none-match", fast_client, {"If-None-Match": etag}),
+            ]
+            for label, client, headers in runs:
+                rps = _requests_per_second(client, url, headers, args.seconds)
+                print(json.dumps({
+                    "endpoint": endpoint,
+                    "scenarios": args.scenarios,
+                    "body_kb": round(size / 1024),
+                    "path": label,
+                    "requests_per_second": round(rps, 1)
+                }))
+                sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
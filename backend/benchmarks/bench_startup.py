@@ -0,0 +1,77 @@
+"""
+API cold start: time to import `main` and to answer the first requests, in
+fresh interpreters.
+
+`eager` imports the report stack before the app, as every start did before
+it was loaded lazily; `lazy` leaves it unloaded (REPORT_PREWARM=false);
+`prewarm` imports it in the background after startup, the default.
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Runs in the child interpreter; prints one JSON line of timings
+_CHILD = """
+import json, os, sys, time
+start = time.perf_counter()
+if os.environ.get("BENCH_EAGER") == "1":
+    import importlib
+    from app.services.report_pipeline import REPORT_MODULES
+    for module in REPORT_MODULES:
+        importlib.import_module(module)
+    import langchain_openai
+from main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    client.get("/")
+    root = time.perf_counter()
+    client.get("/api/top-impact")
+    data = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - start,
+    "first_response_seconds": root - start,
+    "first_data_response_seconds": data - start
+}))
+"""
+
+MODES = {
+    "eager": {"BENCH_EAGER": "1", "REPORT_PREWARM": "false"},
+    "lazy": {"BENCH_EAGER": "0", "REPORT_PREWARM": "false"},
+    "prewarm": {"BENCH_EAGER": "0", "REPORT_PREWARM": "true"},
+}
+
+
+def _run_child(env: dict) -> dict:
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD], cwd=backend, env={**os.environ, **env},
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API import time and time to first response")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        runs = [_run_child(MODES[mode]) for _ in range(args.runs)]
+        print(json.dumps({
+            "mode": mode,
+            "runs": args.runs,
+            **{key: round(statistics.median(run[key] for run in runs), 3) for key in runs[0]}
+        }))
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
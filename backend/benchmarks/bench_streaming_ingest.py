@@ -0,0 +1,91 @@
+"""
+Peak memory and wall time of streaming vs. whole-document JSON ingestion.
+
+Each measurement runs in a fresh interpreter so peak RSS is not polluted by
+earlier runs. The whole-document path is skipped for files larger than
+`--json-max-mb`, since that is exactly the case it cannot handle.
+
+    python -m benchmarks.bench_streaming_ingest --size-gb 2
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_dataset
+
+
+def _measure(mode: str, path: str) -> dict:
+    from app.services.scenario_store import ScenarioStore
+    from app.services.streaming_loader import load_streaming
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == "stream":
+        _, store = load_streaming(path)
+    else:
+        with open(path, "r") as f:
+            data = json.load(f)
+        store = ScenarioStore.from_scenarios(data['data']['simulated_summary']['simulated_data'])
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "mode": mode,
+        "seconds": round(elapsed, 2),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "ingest_rss_mb": round((peak_kb - baseline_kb) / 1024, 1),
+        "store_mb": round(store.nbytes / 2 ** 20, 1),
+        "scenarios": len(store),
+    }
+
+
+def _run(mode: str, path: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_streaming_ingest", "--measure", mode, path],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-gb", type=float, default=2.0)
+    parser.add_argument("--equipment", type=int, default=4)
+    parser.add_argument("--variables", type=int, default=3)
+    parser.add_argument("--json-max-mb", type=float, default=256)
+    parser.add_argument("--path", help="reuse an existing results file")
+    parser.add_argument("--measure", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(_measure(*args.measure)))
+        return
+
+    path = args.path
+    if path is None:
+        # Size one scenario from a small sample, then generate the real file
+        with tempfile.TemporaryDirectory() as tmp:
+            sample = generate_dataset(os.path.join(tmp, "sample.json"), 1000, args.equipment, args.variables)
+        per_scenario = sample["bytes"] / 1000
+        n_scenarios = int(args.size_gb * 2 ** 30 / per_scenario)
+        path = os.path.join(tempfile.gettempdir(), f"bench_streaming_{n_scenarios}.json")
+        if not os.path.exists(path):
+            print(f"Generating {n_scenarios} scenarios into {path} ...", file=sys.stderr)
+            generate_dataset(path, n_scenarios, args.equipment, args.variables)
+
+    size_mb = os.path.getsize(path) / 2 ** 20
+    print(f"file: {path} ({size_mb:.0f} MB)")
+    modes = ["stream"] + (["json"] if size_mb <= args.json_max_mb else [])
+    for mode in modes:
+        result = _run(mode, path)
+        result["mb_of_rss_per_mb_of_json"] = round(result["ingest_rss_mb"] / size_mb, 3)
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
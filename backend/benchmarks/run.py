@@ -0,0 +1,194 @@
+"""
+Benchmark suite covering every stage of the backend, on synthetic datasets.
+
+For each dataset size it times loading and validating the file (`get_data`),
+`get_scenarios`, `DataProcessor.process_all`, every `ChartGenerator` chart,
+the report LLM call and `PDFService.generate_pdf`, with the LLM stubbed and
+the chart and LLM caches disabled. Wall time is measured with tracemalloc
+off; peak Python heap (numpy buffers included) is measured in a second pass
+with tracemalloc on.
+
+    python -m benchmarks.run --sizes 100 1000 10000 --save results.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+
+With `--baseline`, each stage is compared with the stored results and the
+run exits with status 1 if any stage is slower or larger than
+`--tolerance` times its baseline.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-placeholder")
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["CHART_CACHE_ENABLED"] = "false"
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from app.services.chart_generator import CHARTS, ChartGenerator
+from app.services.data_processor import DataProcessor
+from app.services.dataset_cache import DatasetCache
+from app.services.llm_client import set_chat_model
+from app.services.pdf_service import PDFService
+from app.services.process_data import get_data, get_scenarios
+from app.services.report_generator import ReportGenerator
+from benchmarks.synthetic import generate_dataset
+
+STUB_REPORT = json.dumps({
+    "executive_summary": "Benchmark executive summary.",
+    "technical_summary": "Benchmark technical summary.",
+    "variable_analysis": "Benchmark variable analysis.",
+    "recommendations": ["First recommendation", "Second recommendation"],
+    "conclusion": "Benchmark conclusion."
+})
+
+# Slower or larger than this factor of the baseline counts as a regression
+DEFAULT_TOLERANCE = 1.5
+# Stages faster than this are too noisy to compare
+MIN_COMPARABLE_SECONDS = 0.05
+
+
+def _stages(path: str, directory: str) -> List[tuple]:
+    """(name, callable) pairs; each callable reads what earlier stages left in `state`"""
+    state: Dict = {}
+
+    def load():
+        state["dataset"] = DatasetCache(path).get()
+        state["model"] = get_data(state["dataset"])
+
+    def scenarios():
+        get_scenarios(dataset=state["dataset"])
+
+    def process():
+        dataset = state["dataset"]
+        state["processed"] = DataProcessor(dataset.raw, scenario_store=dataset.store).process_all()
+        state["charts"] = ChartGenerator(state["processed"], use_cache=False)
+        state["chart_paths"] = {}
+
+    def chart(method: str, name: str) -> Callable:
+        def run():
+            generator = state["charts"]
+            save_path = os.path.join(directory, f"{name}.{generator.chart_format}")
+            if getattr(generator, method)(save_path=save_path):
+                state["chart_paths"][name] = save_path
+        return run
+
+    def llm():
+        state["report_content"] = ReportGenerator(state["processed"]).get_report_content()
+
+    def pdf():
+        pdf_service = PDFService(state["report_content"], state["chart_paths"], state["processed"])
+        pdf_service.generate_pdf(output_path=os.path.join(directory, "report.pdf"))
+
+    stages = [("get_data", load), ("get_scenarios", scenarios), ("process_all", process)]
+    stages += [(f"chart.{name}", chart(method, name)) for method, name in CHARTS]
+    stages += [("llm", llm), ("generate_pdf", pdf)]
+    return stages
+
+
+def _run_pass(path: str, directory: str, measure_memory: bool) -> Dict[str, Dict]:
+    results = {}
+    for name, stage in _stages(path, directory):
+        if measure_memory:
+            tracemalloc.start()
+            stage()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[name] = {"peak_mb": round(peak / 1024 / 1024, 2)}
+        else:
+            start = time.perf_counter()
+            stage()
+            results[name] = {"seconds": round(time.perf_counter() - start, 4)}
+    return results
+
+
+def run_suite(sizes: List[int], n_equipment: int, n_variables: int, memory: bool) -> Dict:
+    set_chat_model(FakeListChatModel(responses=[STUB_REPORT, "Benchmark insight."]))
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count()
+        },
+        "equipment": n_equipment,
+        "variables": n_variables,
+        "sizes": {}
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f"synthetic-{size}.json")
+            generate_dataset(path, size, n_equipment, n_variables)
+            stages = _run_pass(path, tmp, measure_memory=False)
+            if memory:
+                for name, peak in _run_pass(path, tmp, measure_memory=True).items():
+                    stages[name].update(peak)
+            results["sizes"][str(size)] = {
+                "file_mb": round(os.path.getsize(path) / 1024 / 1024, 2),
+                "stages": stages
+            }
+            total = sum(stage["seconds"] for stage in stages.values())
+            print(f"{size:>10} scenarios  {total:8.2f}s total", file=sys.stderr)
+            os.remove(path)
+    return results
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print a per-stage comparison and return the regressions"""
+    regressions = []
+    for size, entry in results["sizes"].items():
+        base_entry = baseline.get("sizes", {}).get(size)
+        if base_entry is None:
+            continue
+        for name, stage in entry["stages"].items():
+            base = base_entry["stages"].get(name)
+            if base is None:
+                continue
+            for metric in ("seconds", "peak_mb"):
+                if metric not in stage or metric not in base or not base[metric]:
+                    continue
+                ratio = stage[metric] / base[metric]
+                comparable = metric != "seconds" or base[metric] >= MIN_COMPARABLE_SECONDS
+                flag = ""
+                if comparable and ratio > tolerance:
+                    flag = "  REGRESSION"
+                    regressions.append(f"{size} {name} {metric}: {base[metric]} -> {stage[metric]}")
+                print(f"{size:>10} {name:<28} {metric:<8} {base[metric]:>10} -> {stage[metric]:>10}  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every backend stage on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--equipment", type=int, default=3)
+    parser.add_argument("--variables", type=int, default=2)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.equipment, args.variables, memory=not args.no_memory)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if not args.baseline:
+        print(json.dumps(results, indent=2))
+        return
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond x{args.tolerance}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Synthetic dataset generator.
+
+Writes files in the `mock_results.json` schema with a configurable number of
+scenarios, equipment and variables per equipment. The KPI is a noisy linear
+function of the variables, so correlations and impact weightages are
+meaningful. Scenarios are written in chunks, so multi-GB files can be
+generated without holding them in memory.
+
+    python -m benchmarks.synthetic out.json --scenarios 100000 --equipment 5 --variables 4
+"""
+
+import argparse
+import json
+import os
+from typing import Dict, List
+
+import numpy as np
+
+KPI_NAME = "Heater Outlet Temperature"
+BASE_EQUIPMENT = ["HEX-100", "Fuel", "Air"]
+BASE_VARIABLES = [
+    "temperature",
+    "global_heat_transfer_coefficient",
+    "cold_fluid_temperature",
+    "hot_fluid_temperature",
+    "pressure_drop_temperature",
+]
+CHUNK_ROWS = 10000
+
+
+def build_catalog(n_equipment: int, n_variables: int, seed: int = 0) -> List[Dict]:
+    """Describe every synthetic variable: owner, name, type, range and KPI effect"""
+    rng = np.random.default_rng(seed)
+    equipment = BASE_EQUIPMENT[:n_equipment] + [
+        f"EQ-{i}" for i in range(len(BASE_EQUIPMENT), n_equipment)
+    ]
+    catalog = []
+    for equipment_name in equipment:
+        for j in range(n_variables):
+            name = BASE_VARIABLES[j % len(BASE_VARIABLES)]
+            if j >= len(BASE_VARIABLES):
+                name = f"{name}_{j // len(BASE_VARIABLES)}"
+            is_coefficient = 'heat_transfer_coefficient' in name
+            low, high = (10.0, 20.0) if is_coefficient else (290.0, 400.0)
+            catalog.append({
+                'equipment': equipment_name,
+                'name': name,
+                'type': 'Condition' if is_coefficient else 'Setpoint',
+                'low': low,
+                'high': high,
+                # A few variables dominate, the rest barely matter
+                'effect': float(rng.choice([-1, 1]) * rng.pareto(1.5) * 10),
+            })
+    return catalog
+
+
+def _kpi(values: np.ndarray, catalog: List[Dict], rng: np.random.Generator) -> np.ndarray:
+    lows = np.array([v['low'] for v in catalog])
+    highs = np.array([v['high'] for v in catalog])
+    effects = np.array([v['effect'] for v in catalog])
+    scaled = (values - lows) / (highs - lows) - 0.5
+    return 400.0 + scaled @ effects + rng.normal(0.0, 2.0, len(values))
+
+
+def _header(catalog: List[Dict], best_values: np.ndarray) -> Dict:
+    effects = np.abs([v['effect'] for v in catalog])
+    shares = 100.0 * effects / effects.sum()
+    order = np.argsort(-shares)
+    top = order[:3]
+
+    top_impact = {
+        f"{catalog[i]['equipment']}.{catalog[i]['name']}": round(float(shares[i]), 3)
+        for i in top
+    }
+    top_impact["Others"] = round(float(100.0 - sum(top_impact.values())), 3)
+    return {
+        "main_summary_text": "Based on the simulations performed, following variables have the highest impact: "
+                             + ", ".join(f"{catalog[i]['name']} on Equipment {catalog[i]['equipment']}" for i in top)
+                             + ".",
+        "top_summary_text": "Focus on the following variables to achieve top 5% of KPI.",
+        "top_impact": top_impact,
+        "top_variables": [
+            {
+                "equipment": catalog[i]['equipment'],
+                "type": catalog[i]['type'],
+                "name": catalog[i]['name'],
+                "value": round(float(best_values[i]), 3),
+                "unit": "K"
+            }
+            for i in top
+        ],
+        "impact_summary_text": "Based on the simulation, following weightages are assigned based on how each "
+                               "variable impacts the KPI. Prioritize analyzing the variables with higher weightages. ",
+        "setpoint_impact_summary": [
+            {
+                "equipment": catalog[i]['equipment'],
+                "setpoint": catalog[i]['name'],
+                "weightage": round(float(shares[i]), 3),
+                "unit": "K"
+            }
+            for i in order if catalog[i]['type'] == 'Setpoint'
+        ],
+        "condition_impact_summary": [],
+    }
+
+
+def generate_dataset(path: str, n_scenarios: int, n_equipment: int = 3,
+                     n_variables: int = 2, seed: int = 0) -> Dict:
+    """Write a synthetic results file and return a short description of it"""
+    rng = np.random.default_rng(seed)
+    catalog = build_catalog(n_equipment, n_variables, seed)
+    lows = np.array([v['low'] for v in catalog])
+    highs = np.array([v['high'] for v in catalog])
+
+    # Pre-render the constant part of every equipment entry
+    fragments = [
+        (
+            '{"equipment": ' + json.dumps(v['equipment'])
+            + ', "variables": [{"name": ' + json.dumps(v['name'])
+            + ', "type": ' + json.dumps(v['type']) + ', "value": ',
+            ', "unit": "K"}]}'
+        )
+        for v in catalog
+    ]
+    kpi_suffix = '], "kpi": ' + json.dumps(KPI_NAME) + ', "kpi_value": '
+
+    # The header needs the best scenario, which is only known afterwards, so
+    # scenarios go to a temporary file and are spliced in at the end
+    body_path = path + ".body"
+    best_kpi, best_values = -np.inf, None
+    with open(body_path, "w") as body:
+        for start in range(0, n_scenarios, CHUNK_ROWS):
+            rows = min(CHUNK_ROWS, n_scenarios - start)
+            values = np.round(rng.uniform(lows, highs, (rows, len(catalog))), 3)
+            kpi = np.round(_kpi(values, catalog, rng), 3)
+            best = int(np.argmax(kpi))
+            if kpi[best] > best_kpi:
+                best_kpi, best_values = kpi[best], values[best]
+
+            lines = []
+            for i, row in enumerate(values.tolist()):
+                spec = ", ".join(
+                    prefix + repr(value) + suffix
+                    for (prefix, suffix), value in zip(fragments, row)
+                )
+                lines.append(
+                    '{"scenario": "Scenario ' + str(start + i) + '", "equipment_specification": ['
+                    + spec + kpi_suffix + repr(float(kpi[i])) + '}'
+                )
+            if start:
+                body.write(",\n")
+            body.write(",\n".join(lines))
+
+    header = _header(catalog, best_values if best_values is not None else lows)
+    with open(path, "w") as out:
+        out.write('{"data": ' + json.dumps(header)[:-1] + ', "simulated_summary": {"simulated_data": [\n')
+        with open(body_path, "r") as body:
+            while True:
+                chunk = body.read(1 << 24)
+                if not chunk:
+                    break
+                out.write(chunk)
+        out.write("\n]}}}\n")
+    os.remove(body_path)
+
+    return {
+        "path": path,
+        "scenarios": n_scenarios,
+        "variables": len(catalog),
+        "bytes": os.path.getsize(path)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic mock_results.json-style dataset")
+    parser.add_argument("path")
+    parser.add_argument("--scenarios", type=int, default=1000)
+    parser.add_argument("--equipment", type=int, default=3)
+    parser.add_argument("--variables", type=int, default=2, help="variables per equipment")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(generate_dataset(args.path, args.scenarios, args.equipment, args.variables, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
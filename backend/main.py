@@ -1,11 +1,32 @@
+import threading
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routes import router as api_router
+from fastapi.responses import PlainTextResponse
+from app.api.middleware import MetricsMiddleware, ProfilingMiddleware
+from app.api.routes import profile_store, report_store, router as api_router
+from app.core.config import METRICS_ENABLED, PROFILING_ENABLED, REPORT_PREWARM
+from app.core.metrics import render_metrics
+from app.services.report_pipeline import prewarm
+from app.services.worker_processes import shutdown_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Reports are per-process; clear the PDFs of workers that have exited
+    report_store.remove_stale()
+    # The report stack is imported lazily; warm it without delaying startup
+    if REPORT_PREWARM:
+        threading.Thread(target=prewarm, name="report-prewarm", daemon=True).start()
+    yield
+    shutdown_pool()
 
 app = FastAPI(
     title="Process First LLC API",
     description="API for chemical process flow visualization",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 app.include_router(api_router, prefix="/api")
 
@@ -17,6 +38,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Disabled instrumentation adds no middleware at all
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Report endpoints take `profile` as a job option and profile the build instead
+if PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=profile_store,
+        skip_paths=("/api/reports", "/api/generate-report")
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of request, report stage and chart metrics"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     return {
@@ -26,12 +64,25 @@ async def root():
             # Task 3
             "/api/generate-report",
             "/api/download-report",
+            "/api/reports",
+            "/api/reports/{job_id}",
+            "/api/reports/{job_id}/download",
             # Task 4
             "/api/process-data",
             "/api/top-impact",
             "/api/scenarios",
+            "/api/kpi-stats",
             "/api/top-scenarios-temperatures",
-            "/api/setpoint-impacts"
+            "/api/setpoint-impacts",
+            "/api/correlations",
+            "/api/sensitivity",
+            "/api/datasets",
+            "/api/cache-stats",
+            "/api/llm-cache-stats",
+            "/api/llm-client-stats",
+            "/api/profiles",
+            "/api/profiles/{profile_id}",
+            "/metrics"
         ]
     }
 
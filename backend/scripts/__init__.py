@@ -0,0 +1,3 @@
+"""
+Command-line utilities for managing datasets
+"""
\ No newline at end of file
@@ -0,0 +1,30 @@
+"""
+Convert a `mock_results.json`-shaped results file to the binary `.pfsc` format.
+
+    python -m scripts.convert_to_binary data/mock_results.json data/mock_results.pfsc
+"""
+
+import argparse
+import os
+import time
+
+from app.services.binary_store import convert_json_to_binary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a results JSON file to the binary scenario format")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    convert_json_to_binary(args.input, args.output)
+    elapsed = time.perf_counter() - start
+    print(
+        f"Wrote {args.output} ({os.path.getsize(args.output) / 2 ** 20:.1f} MB, "
+        f"from {os.path.getsize(args.input) / 2 ** 20:.1f} MB) in {elapsed:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
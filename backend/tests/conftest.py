@@ -0,0 +1,43 @@
+import copy
+import json
+import os
+import tempfile
+
+import pytest
+
+# Read by app.core.config on import: keep reports and charts out of the tree
+os.environ.setdefault("OUTPUT_DIR", tempfile.mkdtemp(prefix="process-first-tests-"))
+os.environ.setdefault("REPORT_PREWARM", "false")
+
+MOCK_RESULTS = os.path.join(os.path.dirname(__file__), "..", "data", "mock_results.json")
+
+
+@pytest.fixture(scope="session")
+def mock_results_path() -> str:
+    return MOCK_RESULTS
+
+
+@pytest.fixture(scope="session")
+def _mock_results():
+    with open(MOCK_RESULTS, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def mock_results(_mock_results):
+    """The bundled results document; each test gets its own copy"""
+    return copy.deepcopy(_mock_results)
+
+
+@pytest.fixture
+def mock_scenarios(mock_results):
+    return mock_results["data"]["simulated_summary"]["simulated_data"]
+
+
+@pytest.fixture(scope="session")
+def client():
+    """API client serving the bundled data as the default dataset"""
+    from fastapi.testclient import TestClient
+    from main import app
+    with TestClient(app) as test_client:
+        yield test_client
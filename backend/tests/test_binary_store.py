@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.services.binary_store import BINARY_EXTENSION, convert_json_to_binary, load_binary, write_binary
+from app.services.scenario_store import ScenarioStore
+from app.services.streaming_loader import load_streaming
+
+
+def _assert_same_store(got: ScenarioStore, expected: ScenarioStore):
+    assert list(got.scenario_ids) == list(expected.scenario_ids)
+    assert got.variables == expected.variables
+    assert got.raw_names == expected.raw_names and got.raw_units == expected.raw_units
+    assert [got.variable_type(c) for c in range(len(got.variables))] == \
+        [expected.variable_type(c) for c in range(len(expected.variables))]
+    assert [got.variable_equipment(c) for c in range(len(got.variables))] == \
+        [expected.variable_equipment(c) for c in range(len(expected.variables))]
+    assert got.kpi_name == expected.kpi_name
+    np.testing.assert_array_equal(got.values, expected.values)
+    np.testing.assert_array_equal(got.kpi, expected.kpi)
+
+
+def test_round_trip(tmp_path, mock_results_path):
+    header, store = load_streaming(mock_results_path)
+    path = convert_json_to_binary(mock_results_path, str(tmp_path / f"mock{BINARY_EXTENSION}"))
+    loaded_header, loaded = load_binary(path)
+    assert loaded_header == header
+    _assert_same_store(loaded, store)
+    assert list(loaded.iter_scenarios()) == list(store.iter_scenarios())
+
+
+def test_round_trip_with_missing_values_and_unicode_ids(tmp_path):
+    scenarios = [
+        {"scenario": "Scénario α", "kpi": "T", "kpi_value": 1.5, "equipment_specification": [
+            {"equipment": "HEX", "variables": [{"name": "t", "type": "Setpoint", "value": 2.0, "unit": "K"}]}]},
+        {"scenario": "", "kpi": "T", "kpi_value": -3.0, "equipment_specification": [
+            {"equipment": "Air", "variables": [{"name": "t", "type": "Condition", "value": 4.0, "unit": "K"}]}]},
+    ]
+    store = ScenarioStore.from_scenarios(scenarios)
+    path = write_binary({"data": {}}, store, str(tmp_path / "small.pfsc"))
+    header, loaded = load_binary(path)
+    assert header == {"data": {}}
+    _assert_same_store(loaded, store)
+    # Memory-mapped, read-only arrays
+    assert not loaded.values.flags.writeable
+
+
+def test_rejects_other_files(tmp_path, mock_results_path):
+    with pytest.raises(ValueError, match="not a binary scenario file"):
+        load_binary(mock_results_path)
+
+
+def test_write_is_atomic(tmp_path, mock_scenarios):
+    store = ScenarioStore.from_scenarios(mock_scenarios)
+    path = str(tmp_path / "plant.pfsc")
+    write_binary({"version": 1}, store, path)
+    write_binary({"version": 2}, store, path)
+    assert os.listdir(tmp_path) == ["plant.pfsc"]
+    assert load_binary(path)[0] == {"version": 2}
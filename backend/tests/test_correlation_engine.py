@@ -0,0 +1,126 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.correlation_engine import (
+    PEARSON,
+    SPEARMAN,
+    correlation_matrix,
+    correlation_p_values,
+    fisher_interval,
+    rankdata,
+)
+
+Z_95 = 1.959963984540054
+
+
+def _t_two_sided_p(t: float, df: int, steps: int = 20000) -> float:
+    """Reference p-value: Simpson's rule over the Student t density"""
+    log_c = math.lgamma((df + 1) / 2) - math.lgamma(df / 2) - 0.5 * math.log(df * math.pi)
+    x = np.linspace(0.0, abs(t), steps + 1)
+    density = np.exp(log_c - (df + 1) / 2 * np.log1p(x * x / df))
+    h = abs(t) / steps
+    area = h / 3 * (density[0] + density[-1] + 4 * density[1:-1:2].sum() + 2 * density[2:-1:2].sum())
+    return 1.0 - 2.0 * area
+
+
+def _data(rows: int = 200, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    a = rng.normal(size=rows)
+    b = 0.6 * a + rng.normal(size=rows)
+    c = np.exp(b) + rng.normal(scale=0.5, size=rows)
+    d = rng.integers(0, 4, size=rows).astype(float)  # many ties
+    return np.column_stack([a, b, c, d])
+
+
+@pytest.mark.parametrize("method", [PEARSON, SPEARMAN])
+def test_matrix_matches_pandas(method):
+    values = _data()
+    result = correlation_matrix(values, list("abcd"), method=method)
+    expected = pd.DataFrame(values).corr(method=method).to_numpy()
+    np.testing.assert_allclose(result.r, expected, rtol=1e-12, atol=1e-12)
+    assert (result.n == len(values)).all()
+
+
+@pytest.mark.parametrize("method", [PEARSON, SPEARMAN])
+def test_missing_values_use_pairwise_complete_rows(method):
+    values = _data(rows=120)
+    rng = np.random.default_rng(3)
+    values[rng.random(values.shape) < 0.2] = np.nan
+    result = correlation_matrix(values, list("abcd"), method=method)
+
+    frame = pd.DataFrame(values)
+    np.testing.assert_allclose(result.r, frame.corr(method=method).to_numpy(), rtol=1e-12, atol=1e-12)
+    present = frame.notna().astype(int)
+    np.testing.assert_array_equal(result.n, (present.T @ present).to_numpy())
+
+
+def test_rankdata_averages_ties_and_keeps_nan():
+    ranks = rankdata(np.array([3.0, 1.0, np.nan, 3.0, 2.0]))
+    np.testing.assert_array_equal(ranks[[0, 1, 3, 4]], [3.5, 1.0, 3.5, 2.0])
+    assert np.isnan(ranks[2])
+
+
+@pytest.mark.parametrize("r, n", [(0.5, 10), (-0.3, 25), (0.05, 200), (0.9, 6), (0.999, 50)])
+def test_p_values_match_the_t_distribution(r, n):
+    t = r * math.sqrt((n - 2) / (1 - r * r))
+    p = correlation_p_values(np.array([r]), np.array([n]))[0]
+    assert p == pytest.approx(_t_two_sided_p(t, n - 2), rel=1e-6, abs=1e-12)
+
+
+def test_p_values_against_closed_forms_and_table():
+    r = np.array([0.2, 0.7, -0.95])
+    # One degree of freedom is the Cauchy distribution: p = 1 - 2 asin(|r|) / pi
+    np.testing.assert_allclose(correlation_p_values(r, np.full(3, 3)), 1 - 2 * np.arcsin(np.abs(r)) / np.pi,
+                               rtol=1e-10)
+    # With two degrees of freedom p = 1 - |r|
+    np.testing.assert_allclose(correlation_p_values(r, np.full(3, 4)), 1 - np.abs(r), rtol=1e-10)
+    # scipy.stats.pearsonr reports p = 0.1411 for r = 0.5 over 10 pairs
+    assert correlation_p_values(np.array([0.5]), np.array([10]))[0] == pytest.approx(0.1411, abs=1e-4)
+
+
+@pytest.mark.parametrize("method, factor", [(PEARSON, 1.0), (SPEARMAN, 1.06)])
+def test_fisher_interval(method, factor):
+    r = np.array([0.5, -0.2, 0.0])
+    n = np.array([10, 40, 100])
+    low, high = fisher_interval(r, n, 0.95, method)
+    se = np.sqrt(factor / (n - 3))
+    np.testing.assert_allclose(low, np.tanh(np.arctanh(r) - Z_95 * se), rtol=1e-12)
+    np.testing.assert_allclose(high, np.tanh(np.arctanh(r) + Z_95 * se), rtol=1e-12)
+
+
+def test_small_samples():
+    values = np.array([[1.0, 2.0], [2.0, 1.0], [3.0, 5.0], [np.nan, 4.0]])
+    three = correlation_matrix(values, ["x", "y"])
+    # Three pairs: r and p are defined, the interval needs n > 3
+    assert three.n[0, 1] == 3
+    assert three.r[0, 1] == pytest.approx(pd.Series(values[:3, 0]).corr(pd.Series(values[:3, 1])))
+    assert three.p_value[0, 1] == pytest.approx(1 - 2 * math.asin(abs(three.r[0, 1])) / math.pi)
+    assert np.isnan(three.ci_low[0, 1]) and np.isnan(three.ci_high[0, 1])
+
+    two = correlation_matrix(values[:2], ["x", "y"])
+    assert abs(two.r[0, 1]) == pytest.approx(1.0)
+    assert np.isnan(two.p_value[0, 1])
+
+    one = correlation_matrix(values[:1], ["x", "y"])
+    assert np.isnan(one.r).all() and np.isnan(one.p_value).all()
+    assert one.to_dict()["correlation"] == [[None, None], [None, None]]
+
+
+@pytest.mark.parametrize("method", [PEARSON, SPEARMAN])
+def test_constant_column_has_no_correlation(method):
+    values = _data(rows=50)
+    values[:, 2] = 4.2
+    result = correlation_matrix(values, list("abcd"), method=method)
+    expected = pd.DataFrame(values).corr(method=method).to_numpy()
+    assert np.isnan(result.r[2]).all() and np.isnan(expected[2]).all()
+    assert np.isnan(result.p_value[2]).all()
+    assert np.isnan(result.ci_low[2]).all()
+    np.testing.assert_allclose(result.r[:2, :2], expected[:2, :2], rtol=1e-12)
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError, match="kendall"):
+        correlation_matrix(_data(rows=10), list("abcd"), method="kendall")
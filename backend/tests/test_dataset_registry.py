@@ -0,0 +1,60 @@
+import asyncio
+import os
+import shutil
+import threading
+
+import pytest
+
+from app.services.dataset_cache import DatasetCache
+from app.services.dataset_registry import DatasetRegistry
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "mock_results.json")
+
+
+def test_eviction_skips_datasets_that_are_loading(tmp_path, monkeypatch):
+    for name in ("a", "b"):
+        shutil.copy(DATA_FILE, tmp_path / f"{name}.json")
+    registry = DatasetRegistry(str(tmp_path), str(tmp_path / "default.json"), max_bytes=0)
+
+    started = threading.Event()
+    release = threading.Event()
+    loads = []
+    original = DatasetCache._load
+
+    def slow_load(self, signature):
+        loads.append(self.path)
+        if self.path.endswith("a.json"):
+            started.set()
+            release.wait(5)
+        return original(self, signature)
+
+    monkeypatch.setattr(DatasetCache, "_load", slow_load)
+    first = threading.Thread(target=registry.get, args=("a",))
+    first.start()
+    started.wait(5)
+    # Loading and evicting another dataset must not drop the pending one
+    registry.get("b")
+    second = threading.Thread(target=registry.get, args=("a",))
+    second.start()
+    release.set()
+    first.join()
+    second.join()
+    assert sum(path.endswith("a.json") for path in loads) == 1
+
+
+def test_loading_from_the_event_loop_is_refused():
+    cache = DatasetCache(DATA_FILE)
+
+    async def handler():
+        return cache.get()
+
+    with pytest.raises(RuntimeError, match="event loop"):
+        asyncio.run(handler())
+    snapshot = cache.get()
+
+    async def derived_handler():
+        return snapshot.derived("answer", lambda dataset: 42)
+
+    with pytest.raises(RuntimeError, match="event loop"):
+        asyncio.run(derived_handler())
+    assert snapshot.derived("answer", lambda dataset: 42) == 42
@@ -0,0 +1,67 @@
+import gzip
+
+import orjson
+import pytest
+
+from app.services.encoded_json import EncodedJSON
+
+ENDPOINTS = ["/api/process-data", "/api/top-impact", "/api/scenarios",
+             "/api/top-scenarios-temperatures", "/api/setpoint-impacts"]
+
+
+def test_encoded_json_is_stable():
+    value = {"b": [1, 2.5, None], "a": "é"}
+    first, second = EncodedJSON.encode(value), EncodedJSON.encode(value)
+    assert first.body == orjson.dumps(value)
+    assert first.etag == second.etag and first.etag.startswith('"')
+    assert first.gzip_etag != first.etag
+    assert first.gzip_body == second.gzip_body
+    assert gzip.decompress(first.gzip_body) == first.body
+    assert first.nbytes == len(first.body) + len(first.gzip_body)
+    assert EncodedJSON.encode({"a": 1}).etag != EncodedJSON.encode({"a": 2}).etag
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_etag_revalidation(client, path):
+    response = client.get(path, headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    cached = client.get(path, headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+    assert client.get(path, headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+    assert client.get(path, headers={"If-None-Match": "*"}).status_code == 304
+    assert client.get(path, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_gzip_variant_has_its_own_etag(client):
+    plain = client.get("/api/top-impact", headers={"Accept-Encoding": "identity"})
+    compressed = client.get("/api/top-impact", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["ETag"] != plain.headers["ETag"]
+    # Either tag revalidates, since both variants come from the same version
+    for etag in (plain.headers["ETag"], compressed.headers["ETag"]):
+        response = client.get("/api/top-impact", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == compressed.headers["ETag"]
+
+
+@pytest.mark.parametrize("accept_encoding,compressed", [
+    ("gzip", True),
+    ("deflate, gzip;q=0.5", True),
+    ("*", True),
+    ("identity", False),
+    ("gzip;q=0", False),
+    ("br, *;q=0", False),
+])
+def test_gzip_negotiation(client, accept_encoding, compressed):
+    plain = client.get("/api/process-data", headers={"Accept-Encoding": "identity"})
+    response = client.get("/api/process-data", headers={"Accept-Encoding": accept_encoding})
+    assert response.status_code == 200
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert (response.headers.get("Content-Encoding") == "gzip") is compressed
+    # The client decodes gzip, so the JSON must match either way
+    assert response.json() == plain.json()
+    assert (response.headers["ETag"] != plain.headers["ETag"]) is compressed
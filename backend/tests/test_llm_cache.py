@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app.services import llm_cache
+from app.services.llm_cache import CachedLLM, LLMCache, cache_key
+from app.services.llm_client import get_chat_model, set_chat_model
+
+
+class FakeChatModel:
+    def __init__(self, model_name: str = "fake-model", temperature: float = 0.2):
+        self.model_name = model_name
+        self.temperature = temperature
+        self.calls = []
+
+    def invoke(self, prompt: str, **kwargs) -> AIMessage:
+        self.calls.append(prompt)
+        return AIMessage(content=f"answer {len(self.calls)}: {prompt}")
+
+    async def ainvoke(self, prompt: str, **kwargs) -> AIMessage:
+        return self.invoke(prompt, **kwargs)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def fake_model():
+    model = FakeChatModel()
+    set_chat_model(model)
+    yield model
+    set_chat_model(None)
+
+
+def _cached(tmp_path, ttl_seconds: float = 3600, max_entries: int = 100) -> CachedLLM:
+    return CachedLLM(get_chat_model(), LLMCache(str(tmp_path / "llm.sqlite"), ttl_seconds, max_entries))
+
+
+def test_repeated_prompts_are_answered_from_the_cache(tmp_path, fake_model, clock):
+    llm = _cached(tmp_path)
+    first = llm.invoke("summarize")
+    assert llm.invoke("summarize").content == first.content
+    assert asyncio.run(llm.ainvoke("summarize")).content == first.content
+    llm.invoke("other")
+    assert fake_model.calls == ["summarize", "other"]
+    stats = llm.cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 2, 2)
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_cache_survives_reopening(tmp_path, fake_model, clock):
+    _cached(tmp_path).invoke("summarize")
+    assert _cached(tmp_path).invoke("summarize").content == "answer 1: summarize"
+    assert len(fake_model.calls) == 1
+
+
+def test_expired_entries_are_misses(tmp_path, fake_model, clock):
+    llm = _cached(tmp_path, ttl_seconds=60)
+    llm.invoke("summarize")
+    clock.now += 60
+    llm.invoke("summarize")
+    assert len(fake_model.calls) == 1
+    clock.now += 61
+    assert llm.invoke("summarize").content == "answer 2: summarize"
+    assert llm.cache.stats()["misses"] == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, fake_model, clock):
+    llm = _cached(tmp_path, max_entries=2)
+    for prompt in ("a", "b"):
+        llm.invoke(prompt)
+        clock.now += 1
+    llm.invoke("a")  # now "b" is the least recently used
+    clock.now += 1
+    llm.invoke("c")
+    assert llm.cache.stats()["entries"] == 2
+    llm.invoke("a")
+    llm.invoke("b")
+    assert fake_model.calls == ["a", "b", "c", "b"]
+
+
+def test_forget_drops_one_prompt(tmp_path, fake_model, clock):
+    llm = _cached(tmp_path)
+    llm.invoke("a")
+    llm.invoke("b")
+    llm.forget("a")
+    llm.invoke("a")
+    llm.invoke("b")
+    assert fake_model.calls == ["a", "b", "a"]
+
+
+def test_key_covers_model_temperature_and_prompt(tmp_path, fake_model):
+    llm = _cached(tmp_path)
+    assert llm.key("prompt") == cache_key("fake-model", 0.2, "prompt")
+    assert llm.key("prompt") == _cached(tmp_path).key("prompt")
+    keys = {
+        llm.key("prompt"),
+        llm.key("prompt "),
+        cache_key("fake-model", 0.0, "prompt"),
+        cache_key("fake-model", None, "prompt"),
+        cache_key("other-model", 0.2, "prompt"),
+    }
+    assert len(keys) == 5
+
+
+def test_model_name_falls_back_to_model_then_class_name(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite"), 3600, 100)
+
+    class Named:
+        model = "named-model"
+
+    assert CachedLLM(Named(), cache).model_name == "named-model"
+    assert CachedLLM(object(), cache).model_name == "object"
+    assert CachedLLM(object(), cache).temperature is None
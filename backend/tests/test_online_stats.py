@@ -0,0 +1,44 @@
+import json
+import os
+
+import numpy as np
+
+from app.services.online_stats import EXACT_MEDIAN_MAX_COUNT, KPIStats
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "mock_results.json")
+
+
+def _mock_kpi() -> np.ndarray:
+    with open(DATA_FILE, "r", encoding="utf-8") as f:
+        scenarios = json.load(f)["data"]["simulated_summary"]["simulated_data"]
+    return np.array([scenario["kpi_value"] for scenario in scenarios])
+
+
+def test_median_stays_exact_after_small_appends():
+    kpi = _mock_kpi()
+    stats = KPIStats.from_values(kpi)
+    before = stats.to_dict()["median"]
+    batch = np.array([kpi.max() + 1.0, kpi.max() + 2.0])
+    stats.update(batch)
+    median = stats.to_dict()["median"]
+    assert median == np.median(np.concatenate([kpi, batch]))
+    assert median >= before
+
+
+def test_copy_is_independent():
+    stats = KPIStats.from_values(_mock_kpi())
+    other = stats.copy()
+    other.update(np.array([1e6]))
+    assert stats.count + 1 == other.count
+    assert stats.to_dict()["median"] == np.median(_mock_kpi())
+
+
+def test_median_switches_to_p2_for_large_counts():
+    rng = np.random.default_rng(0)
+    values = rng.normal(375.0, 10.0, EXACT_MEDIAN_MAX_COUNT + 50_000)
+    stats = KPIStats.from_values(values[:EXACT_MEDIAN_MAX_COUNT - 10])
+    for start in range(EXACT_MEDIAN_MAX_COUNT - 10, len(values), 10_000):
+        stats.update(values[start:start + 10_000])
+    assert stats._values is None
+    assert abs(stats.to_dict()["median"] - np.median(values)) < 0.1
+    assert stats.count == len(values)
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.middleware import ProfiledRoute, ProfilingMiddleware
+from app.services.profiler import ProfileStore
+
+
+def _pool_work():
+    return sum(i * i for i in range(1000))
+
+
+def _loop_work():
+    return sum(i for i in range(1000))
+
+
+def _app(store: ProfileStore) -> FastAPI:
+    router = APIRouter(route_class=ProfiledRoute)
+
+    @router.get("/sync")
+    def sync_route(n: int = 1):
+        return {"value": _pool_work() * n}
+
+    @router.get("/async")
+    async def async_route():
+        return {"value": _loop_work()}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.add_middleware(ProfilingMiddleware, store=store)
+    return app
+
+
+def test_sync_route_is_profiled_in_its_worker_thread(tmp_path):
+    store = ProfileStore(str(tmp_path))
+    with TestClient(_app(store)) as client:
+        response = client.get("/api/sync", params={"n": 2, "profile": 1})
+        assert response.json() == {"value": 2 * _pool_work()}
+        profile_id = response.headers["x-profile-id"]
+        assert "_pool_work" in store.summary(profile_id, limit=1000)
+
+        response = client.get("/api/async", headers={"X-Profile": "1"})
+        assert "_loop_work" in store.summary(response.headers["x-profile-id"], limit=1000)
+
+
+def test_unprofiled_requests_are_not_captured(tmp_path):
+    store = ProfileStore(str(tmp_path))
+    with TestClient(_app(store)) as client:
+        response = client.get("/api/sync")
+        assert response.json() == {"value": _pool_work()}
+        assert "x-profile-id" not in response.headers
+    assert store.list() == []
@@ -0,0 +1,68 @@
+import os
+import threading
+
+from app.services.report_jobs import ReportJob, ReportJobManager
+from app.services.report_store import ReportStore
+
+
+def _manager(store: ReportStore, history: int, fail=lambda job: False) -> ReportJobManager:
+    def run(job: ReportJob):
+        if fail(job):
+            raise RuntimeError("build failed")
+        return store.save(job.id, b"%PDF-1.4 " + job.id.encode())
+    return ReportJobManager(run, stages=["pdf"], max_concurrent_jobs=1, history=history,
+                            discard=store.delete)
+
+
+def _run(manager: ReportJobManager) -> ReportJob:
+    job = manager.submit()
+    job.future.exception()
+    return job
+
+
+def test_pruned_jobs_delete_their_reports(tmp_path):
+    store = ReportStore(str(tmp_path))
+    manager = _manager(store, history=3)
+    jobs = [_run(manager) for _ in range(10)]
+    manager.shutdown()
+    remembered = {job.id for job in manager.list()}
+    assert len(remembered) == 3
+    assert sorted(os.listdir(store.directory)) == sorted(f"{job_id}.pdf" for job_id in remembered)
+    assert all(not os.path.exists(job.artifact.path) for job in jobs if job.id not in remembered)
+
+
+def test_latest_report_outlives_pruning_until_superseded(tmp_path):
+    store = ReportStore(str(tmp_path))
+    failing = threading.Event()
+    manager = _manager(store, history=2, fail=lambda job: failing.is_set())
+    latest = _run(manager)
+    failing.set()
+    for _ in range(4):
+        _run(manager)
+    assert manager.get(latest.id) is None
+    assert manager.latest_succeeded is latest
+    assert os.path.exists(latest.artifact.path)
+    failing.clear()
+    newest = _run(manager)
+    manager.shutdown()
+    assert not os.path.exists(latest.artifact.path)
+    assert os.listdir(store.directory) == [f"{newest.id}.pdf"]
+
+
+def test_store_removes_reports_of_exited_processes(tmp_path):
+    store = ReportStore(str(tmp_path))
+    store.save("old", b"%PDF-1.4")
+    # A worker that is still running keeps its reports, whatever the others do
+    live = tmp_path / str(os.getppid())
+    live.mkdir()
+    (live / "live.pdf").write_bytes(b"%PDF-1.4")
+    exited = tmp_path / "999999999"
+    exited.mkdir()
+    (exited / "gone.pdf").write_bytes(b"%PDF-1.4")
+    (tmp_path / "notes.txt").write_text("kept")
+
+    ReportStore(str(tmp_path))
+    assert os.path.exists(store.path("old"))
+    store.remove_stale()
+    assert sorted(os.listdir(tmp_path)) == sorted([str(os.getppid()), "notes.txt"])
+    assert os.listdir(live) == ["live.pdf"]
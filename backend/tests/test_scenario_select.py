@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from app.services.scenario_store import ScenarioStore
+
+
+@pytest.fixture
+def store(mock_scenarios):
+    return ScenarioStore.from_scenarios(mock_scenarios)
+
+
+def test_defaults_return_every_row_in_file_order(store):
+    total, rows = store.select()
+    assert total == len(store)
+    np.testing.assert_array_equal(rows, np.arange(len(store)))
+
+
+def test_offset_past_end_and_zero_limit(store):
+    assert store.select(offset=len(store) + 5)[0] == len(store)
+    assert len(store.select(offset=len(store) + 5)[1]) == 0
+    total, rows = store.select(limit=0)
+    assert total == len(store) and len(rows) == 0
+    total, rows = store.select(offset=len(store) - 2, limit=10)
+    np.testing.assert_array_equal(rows, [len(store) - 2, len(store) - 1])
+
+
+def test_kpi_bounds_are_inclusive(store):
+    kpi = np.asarray(store.kpi)
+    low, high = np.sort(kpi)[[5, 20]]
+    total, rows = store.select(kpi_min=low, kpi_max=high)
+    expected = np.flatnonzero((kpi >= low) & (kpi <= high))
+    assert total == len(expected)
+    np.testing.assert_array_equal(rows, expected)
+    assert store.select(kpi_min=high, kpi_max=low)[0] == 0
+    assert store.select(kpi_min=kpi.max() + 1)[0] == 0
+
+
+@pytest.mark.parametrize("descending", [True, False])
+@pytest.mark.parametrize("offset,limit", [(0, 5), (3, 7), (0, None), (40, 100)])
+def test_sorted_pages_match_a_full_stable_sort(store, descending, offset, limit):
+    kpi = np.asarray(store.kpi)
+    order = np.argsort(-kpi if descending else kpi, kind="stable")
+    end = None if limit is None else offset + limit
+    total, rows = store.select(descending=descending, offset=offset, limit=limit)
+    assert total == len(store)
+    np.testing.assert_array_equal(rows, order[offset:end])
+
+
+def test_ties_keep_file_order():
+    kpi = np.array([2.0, 1.0, 2.0, 3.0, 2.0])
+    store = ScenarioStore([str(i) for i in range(5)], kpi, np.zeros((5, 0)), [],
+                          np.zeros(0, np.int32), np.zeros(0, np.int32), np.zeros(0, np.int32), [], [], [])
+    np.testing.assert_array_equal(store.select(descending=True, limit=3)[1], [3, 0, 2])
+    np.testing.assert_array_equal(store.select(descending=False, offset=1, limit=2)[1], [0, 2])
+    # The cached ranking gives the same pages
+    store.kpi_ranking
+    np.testing.assert_array_equal(store.select(descending=True, limit=3)[1], [3, 0, 2])
+
+
+def test_api_paging_headers_and_projection(client, mock_scenarios):
+    response = client.get("/api/scenarios", params={"offset": 2, "limit": 3, "sort": "-kpi"})
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == str(len(mock_scenarios))
+    body = response.json()
+    values = list(body["kpi_value"].values())
+    assert len(values) == 3 and values == sorted(values, reverse=True)
+
+    variable = next(iter(client.get("/api/scenarios", params={"limit": 1}).json()["elements"]["0"]["Setpoint"]))
+    body = client.get("/api/scenarios", params={"limit": 2, "variables": variable}).json()
+    for elements in body["elements"].values():
+        assert [name for group in elements.values() for name in group] == [variable]
+
+    response = client.get("/api/scenarios", params={"limit": 0})
+    assert response.status_code == 200 and response.json()["scenario"] == {}
+    assert client.get("/api/scenarios", params={"limit": -1}).status_code == 422
+    assert client.get("/api/scenarios", params={"sort": "name"}).status_code == 422
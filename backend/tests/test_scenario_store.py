@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from app.services.data_processor import DataProcessor
+from app.services.scenario_store import ScenarioStore
+
+
+def _baseline_pivot(scenarios):
+    """The pivot the original DataProcessor built from the long frame"""
+    rows = []
+    for scenario in scenarios:
+        for spec in scenario["equipment_specification"]:
+            for variable in spec["variables"]:
+                name = f"{spec['equipment']}.{variable['name']}"
+                if name == "Fuel.Fuel - temperature":
+                    name = "Fuel.temperature"
+                rows.append({"scenario": scenario["scenario"], "variable": name,
+                             "value": variable["value"], "kpi_value": scenario["kpi_value"]})
+    long_df = pd.DataFrame(rows)
+    pivot = long_df.pivot_table(index="scenario", columns="variable", values="value",
+                                aggfunc="first").reset_index()
+    kpi = long_df[["scenario", "kpi_value"]].drop_duplicates()
+    return pd.merge(pivot, kpi, on="scenario")
+
+
+def test_pivot_matches_baseline(mock_results, mock_scenarios):
+    expected = _baseline_pivot(mock_scenarios)
+    pivot = DataProcessor(mock_results, lean=False).process_all()["scenarios_pivot_df"]
+    got = pivot.sort_values("scenario").reset_index(drop=True)
+    expected = expected.sort_values("scenario").reset_index(drop=True)
+    assert sorted(got.columns) == sorted(expected.columns)
+    pd.testing.assert_frame_equal(got[expected.columns], expected, check_dtype=False,
+                                  check_names=False)
+
+
+def test_lean_pivot_keeps_only_the_report_columns(mock_results):
+    standard = DataProcessor(mock_results, lean=False).process_all()
+    processor = DataProcessor(mock_results, lean=True)
+    lean = processor.process_all()
+    columns = ["scenario", *sorted(processor.report_variables()), "kpi_value"]
+    assert list(lean["scenarios_pivot_df"].columns) == columns
+    pd.testing.assert_frame_equal(lean["scenarios_pivot_df"], standard["scenarios_pivot_df"][columns])
+    assert "top_scenarios" not in lean and "scenario_df" not in lean
+
+
+def test_store_columns_and_kpi_stats(mock_scenarios):
+    store = ScenarioStore.from_scenarios(mock_scenarios)
+    expected = _baseline_pivot(mock_scenarios).set_index("scenario").loc[store.scenario_ids]
+    assert len(store) == len(mock_scenarios)
+    for variable in store.variables:
+        np.testing.assert_array_equal(store.column(variable), expected[variable].to_numpy())
+    kpi = pd.Series([scenario["kpi_value"] for scenario in mock_scenarios])
+    stats = store.kpi_stats()
+    assert stats["min"] == kpi.min() and stats["max"] == kpi.max()
+    assert np.isclose(stats["mean"], kpi.mean()) and np.isclose(stats["std"], kpi.std())
+    assert stats["median"] == kpi.median()
+
+
+def test_missing_variables_are_nan():
+    scenarios = [
+        {"scenario": "a", "kpi": "T", "kpi_value": 1.0, "equipment_specification": [
+            {"equipment": "HEX", "variables": [{"name": "t", "type": "Setpoint", "value": 2.0, "unit": "K"}]}]},
+        {"scenario": "b", "kpi": "T", "kpi_value": 3.0, "equipment_specification": [
+            {"equipment": "Air", "variables": [{"name": "t", "type": "Condition", "value": 4.0, "unit": "K"}]}]},
+    ]
+    store = ScenarioStore.from_scenarios(scenarios)
+    assert store.variables == ["HEX.t", "Air.t"]
+    np.testing.assert_array_equal(store.values, [[2.0, np.nan], [np.nan, 4.0]])
+    assert [store.variable_type(col) for col in range(2)] == ["Setpoint", "Condition"]
+    rebuilt = list(store.iter_scenarios())
+    assert [len(s["equipment_specification"]) for s in rebuilt] == [1, 1]
+    assert rebuilt[1]["equipment_specification"][0]["variables"][0]["value"] == 4.0
@@ -0,0 +1,54 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+from app.services.scenario_store import ScenarioStore
+from app.services.streaming_loader import load_streaming, stream_scenarios
+
+
+def test_load_streaming_matches_json_load(mock_results_path, mock_results, mock_scenarios):
+    header, store = load_streaming(mock_results_path)
+    expected = ScenarioStore.from_scenarios(mock_scenarios)
+    mock_results["data"]["simulated_summary"]["simulated_data"] = []
+    assert header == mock_results
+    assert store.scenario_ids == expected.scenario_ids
+    assert store.variables == expected.variables
+    np.testing.assert_array_equal(store.values, expected.values)
+    np.testing.assert_array_equal(store.kpi, expected.kpi)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 4096])
+def test_chunk_boundaries_do_not_change_values(chunk_size):
+    document = {
+        "escaped": "a\"b\\u00e9é",
+        "numbers": [1.5e-3, -2, 1e300, 0.1],
+        "literals": [True, False, None],
+        "data": {"simulated_summary": {"simulated_data": [
+            {"scenario": str(i), "v": [i * 0.125, -i, "x" * (i % 5)]} for i in range(50)
+        ]}}
+    }
+    text = json.dumps(document)
+    scenarios = []
+    header = stream_scenarios(io.StringIO(text), scenarios.append, chunk_size=chunk_size)
+    assert scenarios == document["data"]["simulated_summary"]["simulated_data"]
+    document["data"]["simulated_summary"]["simulated_data"] = []
+    assert header == document
+
+
+def test_malformed_value_reports_stream_offset():
+    text = '{"data": {"simulated_summary": {"simulated_data": [' + '{"v": 1},' * 100 + '{"v": tx}]}}}'
+    with pytest.raises(ValueError, match=f"at offset {text.index('tx')}"):
+        stream_scenarios(io.StringIO(text), lambda scenario: None, chunk_size=16)
+
+
+def test_single_value_size_is_capped():
+    text = '{"data": "' + "a" * 5000 + '"}'
+    with pytest.raises(ValueError, match="larger than 1000 characters"):
+        stream_scenarios(io.StringIO(text), lambda scenario: None, chunk_size=100, max_value_size=1000)
+
+
+def test_trailing_data_is_rejected():
+    with pytest.raises(ValueError, match="Extra data"):
+        stream_scenarios(io.StringIO('{"a": 1} 2'), lambda scenario: None)
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+from app.services.binary_store import load_binary, write_binary
+from app.services.dataset_registry import DatasetRegistry
+from app.services.upload_ingest import ingest_upload
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "mock_results.json")
+CHUNK = 64 * 1024
+
+
+def _document_parts(n_scenarios: int, bad_index: int = -1):
+    """A results document as text parts, with scenario `bad_index` malformed"""
+    with open(DATA_FILE, "r", encoding="utf-8") as f:
+        document = json.load(f)
+    scenarios = document["data"]["simulated_summary"]["simulated_data"]
+    document["data"]["simulated_summary"]["simulated_data"] = ["@scenarios@"]
+    prefix, suffix = json.dumps(document).split('"@scenarios@"')
+    yield prefix
+    for i in range(n_scenarios):
+        text = json.dumps(scenarios[i % len(scenarios)])
+        if i == bad_index:
+            text = text.replace(", ", " ", 1)
+        yield ("," if i else "") + text
+    yield suffix
+
+
+class _Body:
+    """Request body as an async chunk iterator that counts the bytes pulled"""
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.sent = 0
+
+    async def __aiter__(self):
+        pending = b""
+        for part in self.parts:
+            pending += part.encode("utf-8")
+            while len(pending) >= CHUNK:
+                chunk, pending = pending[:CHUNK], pending[CHUNK:]
+                self.sent += len(chunk)
+                yield chunk
+        if pending:
+            self.sent += len(pending)
+            yield pending
+
+
+def test_upload_round_trip(tmp_path):
+    path = str(tmp_path / "upload.pfsc")
+    body = _Body(_document_parts(500))
+    stats = asyncio.run(ingest_upload(body.__aiter__(), "application/json", path))
+    assert stats["scenarios"] == 500
+    header, store = load_binary(path)
+    assert len(store) == 500
+    assert header["data"]["simulated_summary"]["simulated_data"] == []
+
+
+def test_malformed_large_upload_stops_reading(tmp_path):
+    """A bad record near the start fails without reading the rest of the body"""
+    path = str(tmp_path / "upload.pfsc")
+    body = _Body(_document_parts(200_000, bad_index=1))
+    with pytest.raises(ValueError, match="at offset"):
+        asyncio.run(ingest_upload(body.__aiter__(), "application/json", path))
+    # The body is roughly 200 MB; only the queue and one reader buffer are read
+    assert body.sent < 8 * 1024 * 1024
+    assert not os.path.exists(path)
+
+
+def test_concurrent_uploads_reserve_the_id(tmp_path):
+    registry = DatasetRegistry(str(tmp_path), str(tmp_path / "default.json"), max_bytes=0)
+    results = []
+    barrier = threading.Barrier(8)
+
+    def upload():
+        barrier.wait()
+        try:
+            with registry.reserve_upload("plant", overwrite=False) as path:
+                # Hold the ID long enough for the others to try it
+                threading.Event().wait(0.2)
+                results.append(path)
+        except FileExistsError:
+            results.append(None)
+
+    threads = [threading.Thread(target=upload) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(result is not None for result in results) == 1
+
+
+def test_exclusive_write_keeps_existing_file(tmp_path):
+    path = str(tmp_path / "plant.pfsc")
+    asyncio.run(ingest_upload(_Body(_document_parts(10)).__aiter__(), "application/json", path))
+    header, store = load_binary(path)
+    with pytest.raises(FileExistsError):
+        write_binary(header, store, path, exclusive=True)
+    assert len(load_binary(path)[1]) == 10
+    assert os.listdir(tmp_path) == ["plant.pfsc"]
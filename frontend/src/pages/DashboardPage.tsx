@@ -15,20 +15,14 @@ export const DashboardPage = () => {
     try {
       setIsGeneratingReport(true);
       
-      const generateResponse = await fetch('http://localhost:8000/api/generate-report');
+      const generateResponse = await fetch('http://localhost:8000/api/generate-report?download=true');
       
       if (!generateResponse.ok) {
         const errorData = await generateResponse.json();
         throw new Error(errorData.detail || 'Failed to generate report');
       }
       
-      const downloadResponse = await fetch('http://localhost:8000/api/download-report');
-      
-      if (!downloadResponse.ok) {
-        throw new Error('Failed to download report');
-      }
-      
-      const blob = await downloadResponse.blob();
+      const blob = await generateResponse.blob();
       const url = window.URL.createObjectURL(blob);
       const a = document.createElement('a');
       a.href = url;